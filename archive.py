@@ -0,0 +1,238 @@
+import argparse
+import os
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
+from typing import Optional, Dict, Any, List
+from database import DatabaseManager
+
+ARCHIVE_ALIAS = 'archive'
+
+TRANSACTION_COLUMNS = (
+    'transaction_id', 'sender_account', 'receiver_account', 'amount', 'currency',
+    'transaction_reason', 'status', 'sender_balance_before', 'sender_balance_after',
+    'receiver_daily_before', 'receiver_daily_after', 'transaction_timestamp',
+)
+
+
+def partition_file_name(month: str) -> str:
+    """Archive file name for a 'YYYY-MM' month."""
+    return f"transactions_{month.replace('-', '_')}.db"
+
+
+def _next_month(month: str) -> str:
+    year, month_number = int(month[:4]), int(month[5:7])
+    if month_number == 12:
+        return f'{year + 1:04d}-01-01'
+    return f'{year:04d}-{month_number + 1:02d}-01'
+
+
+def overlapping_partitions(conn, lower: Optional[str] = None,
+                           upper: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Archive partitions holding timestamps in [lower, upper), newest first."""
+    return [dict(row) for row in conn.execute(
+        '''SELECT * FROM archive_partitions
+           WHERE (? IS NULL OR max_timestamp >= ?)
+             AND (? IS NULL OR min_timestamp < ?)
+           ORDER BY max_timestamp DESC''',
+        (lower, lower, upper, upper)
+    ).fetchall()]
+
+
+@contextmanager
+def attached_archive(conn, db_manager: DatabaseManager, file_path: str):
+    """ATTACH one archive partition to ``conn`` as ``archive`` for the duration of the block."""
+    conn.execute(f'ATTACH DATABASE ? AS {ARCHIVE_ALIAS}', (db_manager.archive_file_path(file_path),))
+    try:
+        yield ARCHIVE_ALIAS
+    finally:
+        conn.execute(f'DETACH DATABASE {ARCHIVE_ALIAS}')
+
+
+class TransactionArchiver:
+    """
+    Moves old transactions out of the hot table into monthly archive files.
+
+    Each month gets its own SQLite file next to the main database (by default
+    in an ``archive/`` directory), with the same columns and history indexes
+    as ``transactions``. Rows move in batches: a batch is first copied into the
+    archive and committed, then deleted from the hot table together with the
+    partition bookkeeping. Copies use INSERT OR IGNORE, so a run interrupted
+    between the two steps is finished by the next run without duplicates.
+
+    Daily rollups are left in place, so the summary APIs keep covering
+    archived days without reading the archives.
+    """
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None, archive_dir: str = 'archive',
+                 max_age_days: int = 90, batch_size: int = 5000):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.db_manager = db_manager or DatabaseManager()
+        # Relative to the main database so the whole set can be moved together
+        self.archive_dir = archive_dir
+        self.max_age_days = max_age_days
+        self.batch_size = batch_size
+
+    def cutoff(self, as_of: Optional[date] = None) -> str:
+        """Transactions stamped before this date are archived."""
+        # transaction_timestamp defaults to CURRENT_TIMESTAMP, which is UTC
+        as_of = as_of or datetime.utcnow().date()
+        return (as_of - timedelta(days=self.max_age_days)).isoformat()
+
+    def archive(self, before: Optional[str] = None, max_batches: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Archive transactions stamped before ``before`` (default: the age cutoff).
+
+        ``max_batches`` bounds the work done in one call; calling again resumes
+        where it stopped. Returns the number of rows moved per month.
+        """
+        before = before or self.cutoff()
+        moved: Dict[str, int] = {}
+        batches = 0
+        conn = self.db_manager.get_connection()
+        try:
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS archive_batch (transaction_id INTEGER PRIMARY KEY)')
+            while max_batches is None or batches < max_batches:
+                oldest = conn.execute(
+                    '''SELECT transaction_timestamp FROM transactions
+                       WHERE transaction_timestamp < ?
+                       ORDER BY transaction_timestamp LIMIT 1''',
+                    (before,)
+                ).fetchone()
+                if oldest is None:
+                    break
+                month = oldest[0][:7]
+                upper = min(_next_month(month), before)
+                file_path = os.path.join(self.archive_dir, partition_file_name(month))
+                os.makedirs(os.path.dirname(self.db_manager.archive_file_path(file_path)), exist_ok=True)
+
+                with attached_archive(conn, self.db_manager, file_path):
+                    try:
+                        self._create_archive_schema(conn)
+                        while max_batches is None or batches < max_batches:
+                            count = self._move_batch(conn, month, file_path, upper)
+                            batches += 1
+                            moved[month] = moved.get(month, 0) + count
+                            if count < self.batch_size:
+                                break
+                    except Exception:
+                        # DETACH is refused while a transaction is open
+                        conn.rollback()
+                        raise
+            conn.execute('PRAGMA optimize')
+        finally:
+            conn.close()
+        return {'before': before, 'batches': batches, 'moved': moved, 'total': sum(moved.values())}
+
+    def _move_batch(self, conn, month: str, file_path: str, upper: str) -> int:
+        columns = ', '.join(TRANSACTION_COLUMNS)
+        conn.execute('DELETE FROM temp.archive_batch')
+        conn.execute(
+            '''INSERT INTO temp.archive_batch
+               SELECT transaction_id FROM main.transactions
+               WHERE transaction_timestamp >= ? AND transaction_timestamp < ?
+               ORDER BY transaction_timestamp, transaction_id LIMIT ?''',
+            (f'{month}-01', upper, self.batch_size)
+        )
+        conn.commit()
+
+        # Step 1: copy into the archive. With WAL, a commit spanning both
+        # files is not atomic, so the copy commits on its own first.
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute(
+            f'''INSERT OR IGNORE INTO {ARCHIVE_ALIAS}.transactions ({columns})
+                SELECT {columns} FROM main.transactions
+                WHERE transaction_id IN (SELECT transaction_id FROM temp.archive_batch)'''
+        )
+        conn.commit()
+
+        # Step 2: drop the copied rows from the hot table and record them
+        conn.execute('BEGIN IMMEDIATE')
+        stats = conn.execute(
+            '''SELECT COUNT(*), MIN(transaction_id), MAX(transaction_id),
+                      MIN(transaction_timestamp), MAX(transaction_timestamp)
+               FROM main.transactions
+               WHERE transaction_id IN (SELECT transaction_id FROM temp.archive_batch)'''
+        ).fetchone()
+        count = stats[0]
+        conn.execute(
+            '''DELETE FROM main.transactions
+               WHERE transaction_id IN (SELECT transaction_id FROM temp.archive_batch)'''
+        )
+        if count:
+            conn.execute(
+                '''INSERT INTO main.archive_partitions
+                   (partition_month, file_path, row_count, min_transaction_id, max_transaction_id,
+                    min_timestamp, max_timestamp)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (partition_month) DO UPDATE SET
+                       row_count = row_count + excluded.row_count,
+                       min_transaction_id = MIN(min_transaction_id, excluded.min_transaction_id),
+                       max_transaction_id = MAX(max_transaction_id, excluded.max_transaction_id),
+                       min_timestamp = MIN(min_timestamp, excluded.min_timestamp),
+                       max_timestamp = MAX(max_timestamp, excluded.max_timestamp),
+                       archived_at = CURRENT_TIMESTAMP''',
+                (month, file_path, count, stats[1], stats[2], stats[3], stats[4])
+            )
+        conn.commit()
+        return count
+
+    @staticmethod
+    def _create_archive_schema(conn) -> None:
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {ARCHIVE_ALIAS}.transactions (
+                transaction_id INTEGER PRIMARY KEY,
+                sender_account TEXT NOT NULL,
+                receiver_account TEXT NOT NULL,
+                amount INTEGER NOT NULL,
+                currency TEXT NOT NULL,
+                transaction_reason TEXT,
+                status TEXT NOT NULL,
+                sender_balance_before INTEGER NOT NULL,
+                sender_balance_after INTEGER NOT NULL,
+                receiver_daily_before INTEGER NOT NULL,
+                receiver_daily_after INTEGER NOT NULL,
+                transaction_timestamp TIMESTAMP
+            )
+        ''')
+        conn.execute(f'''
+            CREATE INDEX IF NOT EXISTS {ARCHIVE_ALIAS}.idx_transactions_sender_history
+            ON transactions(sender_account, transaction_timestamp DESC, transaction_id DESC)
+        ''')
+        conn.execute(f'''
+            CREATE INDEX IF NOT EXISTS {ARCHIVE_ALIAS}.idx_transactions_receiver_history
+            ON transactions(receiver_account, transaction_timestamp DESC, transaction_id DESC)
+        ''')
+        conn.execute(f'''
+            CREATE INDEX IF NOT EXISTS {ARCHIVE_ALIAS}.idx_transactions_timestamp
+            ON transactions(transaction_timestamp)
+        ''')
+        conn.commit()
+
+    def partitions(self) -> List[Dict[str, Any]]:
+        """List archive partitions, newest first."""
+        with self.db_manager.read() as conn:
+            return overlapping_partitions(conn)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move old transactions into monthly archive databases.")
+    parser.add_argument('--db', default='money_transfer.db', help="Path to the SQLite database")
+    parser.add_argument('--archive-dir', default='archive', help="Archive directory, relative to the database")
+    parser.add_argument('--max-age-days', type=int, default=90, help="Archive transactions older than this")
+    parser.add_argument('--before', default=None, help="Archive transactions before this date instead (YYYY-MM-DD)")
+    parser.add_argument('--batch-size', type=int, default=5000, help="Rows moved per batch")
+    parser.add_argument('--max-batches', type=int, default=None, help="Stop after this many batches (resume later)")
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager(args.db)
+    archiver = TransactionArchiver(db_manager, args.archive_dir, args.max_age_days, args.batch_size)
+    result = archiver.archive(args.before, args.max_batches)
+    db_manager.close()
+    for month, count in sorted(result['moved'].items()):
+        print(f"  {month}: {count} transaction(s)")
+    print(f"✅ Archived {result['total']} transaction(s) older than {result['before']}.")
+
+
+if __name__ == "__main__":
+    main()
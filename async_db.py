@@ -0,0 +1,94 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Tuple, List, Callable
+from database import DatabaseManager
+from db_operations import MoneyTransferDB
+
+
+class AsyncMoneyTransferDB:
+    """
+    asyncio facade over MoneyTransferDB.
+
+    sqlite3 calls run on dedicated executors so they never block the event
+    loop. Reads share a pool of ``read_workers`` threads; writes go through a
+    single writer thread, mirroring SQLite's one-writer model, so queued
+    writes never hold up reads.
+    """
+
+    def __init__(self, transfer_db: Optional[MoneyTransferDB] = None, read_workers: int = 8):
+        if read_workers < 1:
+            raise ValueError("read_workers must be at least 1")
+        # One pooled connection per read thread plus one for the writer
+        self.transfer_db = transfer_db or MoneyTransferDB(DatabaseManager(pool_size=read_workers + 1))
+        self._read_executor = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix='mtdb-read')
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mtdb-write')
+
+    async def __aenter__(self) -> 'AsyncMoneyTransferDB':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Wait for in-flight calls, then shut both lanes down."""
+        self._write_executor.shutdown(wait=True)
+        self._read_executor.shutdown(wait=True)
+
+    async def _read(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._read_executor, functools.partial(func, *args))
+
+    async def _write(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._write_executor, functools.partial(func, *args))
+
+    async def get_sender_account(self, account_number: str) -> Optional[Dict[str, Any]]:
+        """Retrieve sender account details."""
+        return await self._read(self.transfer_db.get_sender_account, account_number)
+
+    async def verify_authentication(self, account_number: str, credential: str) -> bool:
+        """Verify authentication credential for sender account."""
+        return await self._read(self.transfer_db.verify_authentication, account_number, credential)
+
+    async def get_receiver_account(self, account_number: str) -> Optional[Dict[str, Any]]:
+        """Retrieve receiver account details."""
+        return await self._read(self.transfer_db.get_receiver_account, account_number)
+
+    async def get_transaction_history(self, account_number: str, account_type: str = 'sender',
+                                      limit: int = 10, cursor: Optional[str] = None,
+                                      start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                      status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get transaction history for an account."""
+        return await self._read(self.transfer_db.get_transaction_history, account_number, account_type,
+                                limit, cursor, start_date, end_date, status)
+
+    async def get_transaction_history_page(self, account_number: str, account_type: str = 'sender',
+                                           limit: int = 10, cursor: Optional[str] = None,
+                                           start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                           status: Optional[str] = None) -> Dict[str, Any]:
+        """Get one keyset-paginated page of transaction history."""
+        return await self._read(self.transfer_db.get_transaction_history_page, account_number, account_type,
+                                limit, cursor, start_date, end_date, status)
+
+    async def get_daily_transaction_summary(self, date_str: Optional[str] = None) -> Dict[str, Any]:
+        """Get transaction summary for a specific date (default: today)."""
+        return await self._read(self.transfer_db.get_daily_transaction_summary, date_str)
+
+    async def check_receiver_daily_limit(self, receiver_account_number: str, amount: float) -> Tuple[bool, float]:
+        """Check if receiver can receive the amount within daily limit."""
+        return await self._read(self.transfer_db.check_receiver_daily_limit, receiver_account_number, amount)
+
+    async def process_transfer(self, sender_account: str, receiver_account: str, amount: float,
+                               currency: str, contact_info: str,
+                               transaction_reason: Optional[str] = None,
+                               idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Process money transfer on the writer lane."""
+        return await self._write(self.transfer_db.process_transfer, sender_account, receiver_account,
+                                 amount, currency, contact_info, transaction_reason, idempotency_key)
+
+    async def log_failed_transaction(self, sender_account: str, receiver_account: str, amount: float,
+                                     currency: str, reason: str, error_message: str) -> None:
+        """Log failed transaction attempt on the writer lane."""
+        await self._write(self.transfer_db.log_failed_transaction, sender_account, receiver_account,
+                          amount, currency, reason, error_message)
@@ -0,0 +1,443 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Callable
+from database import DatabaseManager, from_minor_units
+from db_operations import MoneyTransferDB
+from sharding import ShardedMoneyTransferDB, reshard
+from ledger import LedgerMoneyTransferDB
+
+SKEWS = ('uniform', 'hot')
+
+
+def create_benchmark_database(db_path: str, senders: int = 1000, receivers: int = 1000,
+                              history_rows: int = 10000, seed: int = 42) -> DatabaseManager:
+    """Create and populate a database with synthetic accounts and transaction history."""
+    return _populate(DatabaseManager(db_path), senders, receivers, history_rows, seed, scale=100)
+
+
+class _RealMoneyDatabaseManager(DatabaseManager):
+    """A database as created before money moved to integer minor units."""
+
+    MIGRATIONS = DatabaseManager.MIGRATIONS[:8]
+
+
+def create_real_money_database(db_path: str, senders: int = 1000, receivers: int = 1000,
+                               history_rows: int = 10000, seed: int = 42) -> DatabaseManager:
+    """Like create_benchmark_database, but with money in REAL major units (schema version 8)."""
+    return _populate(_RealMoneyDatabaseManager(db_path), senders, receivers, history_rows, seed, scale=1.0)
+
+
+def _populate(db_manager: DatabaseManager, senders: int, receivers: int, history_rows: int, seed: int,
+              scale: Any) -> DatabaseManager:
+    # Money is written as whole paise times ``scale``: 100 gives minor units, 1.0 REAL rupees
+    rng = random.Random(seed)
+    with db_manager.transaction() as conn:
+        conn.executemany(
+            '''INSERT INTO sender_accounts
+               (account_number, authentication_credential, balance, contact_information, currency)
+               VALUES (?, ?, ?, ?, 'INR')''',
+            ((_sender(i), f'pass{i}', 10 ** 12 * scale, f'sender{i}@example.com') for i in range(senders))
+        )
+        conn.executemany(
+            '''INSERT INTO receiver_accounts
+               (account_number, name, contact_information, currency, daily_limit, daily_received)
+               VALUES (?, ?, ?, 'INR', ?, 0)''',
+            ((_receiver(i), f'Receiver {i}', f'receiver{i}@example.com', 10 ** 12 * scale)
+             for i in range(receivers))
+        )
+        start = datetime.now() - timedelta(days=365)
+        conn.executemany(
+            '''INSERT INTO transactions
+               (sender_account, receiver_account, amount, currency, transaction_reason, status,
+                sender_balance_before, sender_balance_after, receiver_daily_before, receiver_daily_after,
+                transaction_timestamp)
+               VALUES (?, ?, ?, 'INR', NULL, 'SUCCESS', 0, 0, 0, 0, ?)''',
+            ((_sender(rng.randrange(senders)), _receiver(rng.randrange(receivers)),
+              rng.randint(1, 500000) * scale / 100,
+              (start + timedelta(seconds=i * 31536000 // max(history_rows, 1))).strftime('%Y-%m-%d %H:%M:%S'))
+             for i in range(history_rows))
+        )
+    return db_manager
+
+
+def _sender(i: int) -> str:
+    return f'S{i:08d}'
+
+
+def _receiver(i: int) -> str:
+    return f'R{i:08d}'
+
+
+def _account_picker(rng: random.Random, count: int, skew: str, hot_fraction: float,
+                    hot_weight: float) -> Callable[[], int]:
+    """Return a function picking account indexes; 'hot' sends hot_weight of traffic to hot_fraction of accounts."""
+    if skew == 'uniform':
+        return lambda: rng.randrange(count)
+    hot_count = max(1, int(count * hot_fraction))
+
+    def pick() -> int:
+        if rng.random() < hot_weight or hot_count == count:
+            return rng.randrange(hot_count)
+        return rng.randrange(hot_count, count)
+    return pick
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize_latencies(latencies: List[float], elapsed: float) -> Dict[str, Any]:
+    """Turn raw latencies (seconds) into ops/sec and percentile figures in milliseconds."""
+    ordered = sorted(latencies)
+    return {
+        'operations': len(ordered),
+        'ops_per_sec': len(ordered) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': percentile(ordered, 50) * 1000,
+        'p95_ms': percentile(ordered, 95) * 1000,
+        'p99_ms': percentile(ordered, 99) * 1000,
+        'max_ms': (ordered[-1] * 1000) if ordered else 0.0,
+    }
+
+
+def _run_transfer_threads(db_path: str, threads: int, transfers_per_thread: int, senders: int,
+                          receivers: int, skew: str, hot_fraction: float, hot_weight: float,
+                          cache_capacity: int, seed: int, shard_count: int = 0,
+                          ledger_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Drive transfers from ``threads`` threads in this process and collect raw stats.
+
+    With ``shard_count`` set, ``db_path`` is a shard directory. With
+    ``ledger_dir`` set, transfers run on the in-memory ledger engine.
+    """
+    if shard_count:
+        db = ShardedMoneyTransferDB(db_path, shard_count, pool_size=threads, cache_capacity=cache_capacity)
+    elif ledger_dir:
+        db = LedgerMoneyTransferDB(DatabaseManager(db_path, pool_size=threads), ledger_dir,
+                                   cache_capacity=cache_capacity)
+    else:
+        db = MoneyTransferDB(DatabaseManager(db_path, pool_size=threads), cache_capacity=cache_capacity)
+    lock = threading.Lock()
+    stats: Dict[str, Any] = {'latencies': [], 'commits': 0, 'rejected': 0, 'lock_errors': 0, 'other_errors': 0}
+
+    def worker(worker_seed: int) -> None:
+        rng = random.Random(worker_seed)
+        pick_sender = _account_picker(rng, senders, skew, hot_fraction, hot_weight)
+        pick_receiver = _account_picker(rng, receivers, skew, hot_fraction, hot_weight)
+        local = {'latencies': [], 'commits': 0, 'rejected': 0, 'lock_errors': 0, 'other_errors': 0}
+        for _ in range(transfers_per_thread):
+            sender, receiver = _sender(pick_sender()), _receiver(pick_receiver())
+            start = time.perf_counter()
+            try:
+                db.process_transfer(sender, receiver, float(rng.randint(1, 100)), 'INR', '')
+                local['commits'] += 1
+            except ValueError:
+                local['rejected'] += 1
+            except sqlite3.OperationalError as e:
+                message = str(e).lower()
+                local['lock_errors' if 'locked' in message or 'busy' in message else 'other_errors'] += 1
+            except Exception:
+                local['other_errors'] += 1
+            local['latencies'].append(time.perf_counter() - start)
+        with lock:
+            stats['latencies'].extend(local.pop('latencies'))
+            for key, value in local.items():
+                stats[key] += value
+
+    workers = [threading.Thread(target=worker, args=(seed * 1000 + i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    if shard_count:
+        db.close()
+    else:
+        if ledger_dir:
+            db.close()
+        db.db_manager.close()
+    return stats
+
+
+def _process_entry(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return _run_transfer_threads(**kwargs)
+
+
+def run_transfer_benchmark(db_path: str, transfers: int = 10000, threads: int = 4, processes: int = 1,
+                           senders: int = 1000, receivers: int = 1000, skew: str = 'uniform',
+                           hot_fraction: float = 0.01, hot_weight: float = 0.9,
+                           cache_capacity: int = 0, seed: int = 42, shard_count: int = 0,
+                           ledger_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Run ``transfers`` transfers spread across processes x threads and report throughput."""
+    if skew not in SKEWS:
+        raise ValueError(f"Unknown skew '{skew}'. Expected one of {SKEWS}")
+    if ledger_dir and processes != 1:
+        raise ValueError("The ledger engine owns its database; run it with a single process")
+    per_thread = max(1, transfers // (threads * processes))
+    jobs = [dict(db_path=db_path, threads=threads, transfers_per_thread=per_thread, senders=senders,
+                 receivers=receivers, skew=skew, hot_fraction=hot_fraction, hot_weight=hot_weight,
+                 cache_capacity=cache_capacity, seed=seed + p, shard_count=shard_count,
+                 ledger_dir=ledger_dir)
+            for p in range(processes)]
+
+    start = time.perf_counter()
+    if processes == 1:
+        parts = [_run_transfer_threads(**jobs[0])]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            parts = pool.map(_process_entry, jobs)
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for part in parts for latency in part['latencies']]
+    result = summarize_latencies(latencies, elapsed)
+    result['tps'] = sum(part['commits'] for part in parts) / elapsed if elapsed > 0 else 0.0
+    result['elapsed_sec'] = elapsed
+    for key in ('commits', 'rejected', 'lock_errors', 'other_errors'):
+        result[key] = sum(part[key] for part in parts)
+    return result
+
+
+def run_read_benchmark(db_path: str, operations: int = 2000, senders: int = 1000,
+                       cache_capacity: int = 0, seed: int = 42) -> Dict[str, Any]:
+    """Time the main read paths one call at a time."""
+    rng = random.Random(seed)
+    db = MoneyTransferDB(DatabaseManager(db_path), cache_capacity=cache_capacity)
+    readers = {
+        'get_sender_account': lambda: db.get_sender_account(_sender(rng.randrange(senders))),
+        'get_transaction_history': lambda: db.get_transaction_history(_sender(rng.randrange(senders)), 'sender', 20),
+        'get_daily_transaction_summary': lambda: db.get_daily_transaction_summary(),
+    }
+    results = {}
+    for name, read in readers.items():
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(operations):
+            began = time.perf_counter()
+            read()
+            latencies.append(time.perf_counter() - began)
+        results[name] = summarize_latencies(latencies, time.perf_counter() - start)
+    db.db_manager.close()
+    return results
+
+
+def run_startup_benchmark(db_path: str, iterations: int = 200) -> Dict[str, Any]:
+    """
+    Time opening a DatabaseManager (and running one query) on an up-to-date file.
+
+    ``versioned`` is the normal start, which only reads the schema version.
+    ``ddl_every_start`` also re-runs every migration step in a write
+    transaction, as construction did before schema versioning.
+    """
+    def open_and_query(ddl: bool) -> None:
+        manager = DatabaseManager(db_path, pool_size=1)
+        if ddl:
+            with manager.transaction(immediate=True) as conn:
+                for _, step, *_ in manager.MIGRATIONS:
+                    step(manager, conn)
+        with manager.transaction() as conn:
+            conn.execute('SELECT COUNT(*) FROM sender_accounts').fetchone()
+        manager.close()
+
+    DatabaseManager(db_path).close()
+    results = {}
+    for name, ddl in (('versioned', False), ('ddl_every_start', True)):
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(iterations):
+            began = time.perf_counter()
+            open_and_query(ddl)
+            latencies.append(time.perf_counter() - began)
+        results[name] = summarize_latencies(latencies, time.perf_counter() - start)
+    return results
+
+
+def _timed_money_workload(db_path: str, transfers: int, aggregates: int, senders: int, receivers: int,
+                          amount: Callable[[random.Random], Any], seed: int) -> Dict[str, Any]:
+    """Run aggregate queries and single transfers on a raw connection, with the statements process_transfer uses."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    today = datetime.now().strftime('%Y-%m-%d')
+    try:
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(aggregates):
+            began = time.perf_counter()
+            conn.execute(
+                '''SELECT currency, COUNT(*), SUM(amount) FROM transactions
+                   WHERE status = 'SUCCESS' GROUP BY currency'''
+            ).fetchall()
+            conn.execute('SELECT SUM(balance) FROM sender_accounts').fetchone()
+            conn.execute('SELECT SUM(daily_received) FROM receiver_accounts').fetchone()
+            latencies.append(time.perf_counter() - began)
+        aggregate = summarize_latencies(latencies, time.perf_counter() - start)
+
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(transfers):
+            sender, receiver, value = _sender(rng.randrange(senders)), _receiver(rng.randrange(receivers)), amount(rng)
+            began = time.perf_counter()
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                '''SELECT s.balance, r.daily_limit,
+                          CASE WHEN r.last_reset_date < ? THEN 0 ELSE r.daily_received END
+                   FROM (SELECT 1)
+                   LEFT JOIN sender_accounts s ON s.account_number = ?
+                   LEFT JOIN receiver_accounts r ON r.account_number = ?''',
+                (today, sender, receiver)
+            ).fetchone()
+            balance_before, daily_limit, daily_before = row
+            if balance_before >= value and daily_before + value <= daily_limit:
+                conn.execute('''UPDATE sender_accounts SET balance = balance - ?, updated_at = CURRENT_TIMESTAMP
+                                WHERE account_number = ? AND balance >= ?''', (value, sender, value))
+                conn.execute('''UPDATE receiver_accounts
+                                SET daily_received = CASE WHEN last_reset_date < ? THEN 0 ELSE daily_received END + ?,
+                                    last_reset_date = ?, updated_at = CURRENT_TIMESTAMP
+                                WHERE account_number = ?''', (today, value, today, receiver))
+                conn.execute(
+                    '''INSERT INTO transactions
+                       (sender_account, receiver_account, amount, currency, transaction_reason, status,
+                        sender_balance_before, sender_balance_after, receiver_daily_before, receiver_daily_after)
+                       VALUES (?, ?, ?, 'INR', NULL, 'SUCCESS', ?, ?, ?, ?)''',
+                    (sender, receiver, value, balance_before, balance_before - value,
+                     daily_before, daily_before + value)
+                )
+            conn.commit()
+            latencies.append(time.perf_counter() - began)
+        transfer = summarize_latencies(latencies, time.perf_counter() - start)
+
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        page_size, pages, free = (conn.execute(f'PRAGMA {pragma}').fetchone()[0]
+                                  for pragma in ('page_size', 'page_count', 'freelist_count'))
+    finally:
+        conn.close()
+    return {'aggregates': aggregate, 'transfers': transfer, 'used_bytes': page_size * (pages - free)}
+
+
+def run_money_storage_benchmark(db_path: str, senders: int = 1000, receivers: int = 1000,
+                                history_rows: int = 10000, transfers: int = 2000, aggregates: int = 50,
+                                seed: int = 42) -> Dict[str, Any]:
+    """
+    Compare REAL and integer minor-unit money storage, and time the migration between them.
+
+    Builds a database as it was before the minor-units step, times aggregate
+    queries and a single-threaded transfer loop on it, upgrades it in place,
+    then times the same work again. Both runs issue the same SQL with the same
+    amounts, so only the storage (and the arithmetic on what it returns)
+    differs. The migration entry also gives the total of all amounts summed
+    as REAL and, after the upgrade, exactly.
+    """
+    def total_amount() -> Any:
+        conn = sqlite3.connect(db_path)
+        try:
+            return conn.execute('SELECT SUM(amount) FROM transactions').fetchone()[0]
+        finally:
+            conn.close()
+
+    create_real_money_database(db_path, senders, receivers, history_rows, seed).close()
+    report = {'before': _timed_money_workload(db_path, transfers, aggregates, senders, receivers,
+                                              lambda rng: rng.randint(1, 10000) / 100, seed)}
+    real_total = total_amount()
+    start = time.perf_counter()
+    manager = DatabaseManager(db_path)
+    report['migration'] = {'sec': time.perf_counter() - start, 'schema_version': manager.schema_version(),
+                           'real_sum': real_total, 'exact_sum': from_minor_units(total_amount(), 'INR')}
+    manager.close()
+    report['after'] = _timed_money_workload(db_path, transfers, aggregates, senders, receivers,
+                                            lambda rng: rng.randint(1, 10000), seed)
+    return report
+
+
+def run_shard_scaling_benchmark(source_db: str, work_dir: str, shard_counts: List[int],
+                                **transfer_options: Any) -> Dict[str, Any]:
+    """Reshard ``source_db`` into each shard count and run the same transfer load against it."""
+    results = {}
+    for shard_count in shard_counts:
+        shard_dir = os.path.join(work_dir, f'shards_{shard_count}')
+        reshard([source_db], shard_dir, shard_count)
+        results[str(shard_count)] = run_transfer_benchmark(shard_dir, shard_count=shard_count, **transfer_options)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark transfer throughput/latency and read paths.")
+    parser.add_argument('--db', default=None, help="Database to create (default: a temporary file)")
+    parser.add_argument('--senders', type=int, default=1000)
+    parser.add_argument('--receivers', type=int, default=1000)
+    parser.add_argument('--history-rows', type=int, default=10000)
+    parser.add_argument('--transfers', type=int, default=5000, help="Total transfers to run")
+    parser.add_argument('--threads', type=int, default=4, help="Threads per process")
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--skew', choices=SKEWS, default='uniform')
+    parser.add_argument('--hot-fraction', type=float, default=0.01, help="Share of accounts that are hot")
+    parser.add_argument('--hot-weight', type=float, default=0.9, help="Share of traffic sent to hot accounts")
+    parser.add_argument('--reads', type=int, default=2000, help="Calls per read path (0 to skip)")
+    parser.add_argument('--cache-capacity', type=int, default=0,
+                        help="Account cache size for MoneyTransferDB (default 0 measures the database)")
+    parser.add_argument('--shard-scaling', default=None,
+                        help="Comma-separated shard counts to compare, e.g. 1,2,4,8")
+    parser.add_argument('--ledger', action='store_true',
+                        help="Also run the transfer load on the in-memory ledger engine (single process)")
+    parser.add_argument('--startup', type=int, default=200,
+                        help="Database opens to time for the startup benchmark (0 to skip)")
+    parser.add_argument('--money-storage', type=int, default=0,
+                        help="Transfers for the REAL vs minor-unit storage comparison (0 to skip)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = args.db or os.path.join(tmp_dir, 'benchmark.db')
+        setup_start = time.perf_counter()
+        create_benchmark_database(db_path, args.senders, args.receivers, args.history_rows, args.seed).close()
+        report: Dict[str, Any] = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'sqlite_version': sqlite3.sqlite_version,
+            'config': vars(args),
+            'setup_sec': time.perf_counter() - setup_start,
+            'transfers': run_transfer_benchmark(
+                db_path, args.transfers, args.threads, args.processes, args.senders, args.receivers,
+                args.skew, args.hot_fraction, args.hot_weight, args.cache_capacity, args.seed),
+        }
+        if args.ledger:
+            report['ledger_transfers'] = run_transfer_benchmark(
+                db_path, args.transfers, args.threads, 1, args.senders, args.receivers,
+                args.skew, args.hot_fraction, args.hot_weight, args.cache_capacity, args.seed,
+                ledger_dir=os.path.join(tmp_dir, 'ledger_journal'))
+        if args.reads:
+            report['reads'] = run_read_benchmark(db_path, args.reads, args.senders, args.cache_capacity, args.seed)
+        if args.startup:
+            report['startup'] = run_startup_benchmark(db_path, args.startup)
+        if args.money_storage:
+            report['money_storage'] = run_money_storage_benchmark(
+                os.path.join(tmp_dir, 'money_storage.db'), args.senders, args.receivers, args.history_rows,
+                args.money_storage, seed=args.seed)
+        if args.shard_scaling:
+            # Start every layout from the same accounts as the unsharded run
+            source_db = os.path.join(tmp_dir, 'shard_source.db')
+            create_benchmark_database(source_db, args.senders, args.receivers, args.history_rows, args.seed).close()
+            report['shard_scaling'] = run_shard_scaling_benchmark(
+                source_db, tmp_dir, [int(count) for count in args.shard_scaling.split(',')],
+                transfers=args.transfers, threads=args.threads, processes=args.processes,
+                senders=args.senders, receivers=args.receivers, skew=args.skew,
+                hot_fraction=args.hot_fraction, hot_weight=args.hot_weight,
+                cache_capacity=args.cache_capacity, seed=args.seed)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
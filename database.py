@@ -1,110 +1,852 @@
 import sqlite3
 import os
+import re
+import threading
+import time
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
 from contextlib import contextmanager
+from typing import Any, Dict, List
+from urllib.request import pathname2url
+from instrumentation import InstrumentedConnection, current_api
+
+
+SAMPLE_SENDER_ACCOUNTS = [
+    ('ACC1001', 'pass123', 90000.0, 'vijay@example.com', 'INR'),
+    ('ACC1002', 'secure456', 50000.5, 'rahul@example.com', 'INR')
+]
+
+SAMPLE_RECEIVER_ACCOUNTS = [
+    ('ACC2001', 'Amit Sharma', 'amitsharma@gmail.com', 'INR', 100000.0, 9000.0),
+    ('ACC2002', 'Priya Singh', 'priya.singh@example.com', 'INR', 50000.0, 10000.0)
+]
+
+# Money is stored as an integer count of the currency's minor unit. Most
+# currencies have two decimal places; these are the ISO 4217 exceptions.
+CURRENCY_EXPONENTS = {
+    'BHD': 3, 'IQD': 3, 'JOD': 3, 'KWD': 3, 'LYD': 3, 'OMR': 3, 'TND': 3,
+    'CLP': 0, 'ISK': 0, 'JPY': 0, 'KRW': 0, 'PYG': 0, 'UGX': 0, 'VND': 0, 'XAF': 0, 'XOF': 0,
+}
+DEFAULT_CURRENCY_EXPONENT = 2
+
+# Columns holding money, each in minor units of the currency its row is in
+MONEY_COLUMNS = (
+    'balance', 'daily_limit', 'daily_received', 'amount',
+    'sender_balance_before', 'sender_balance_after', 'receiver_daily_before', 'receiver_daily_after',
+    'total_amount', 'value_before', 'value_after',
+)
+
+
+def currency_exponent(currency: str) -> int:
+    """Number of decimal places in the currency's minor unit."""
+    return CURRENCY_EXPONENTS.get(currency.upper(), DEFAULT_CURRENCY_EXPONENT)
+
+
+def to_minor_units(amount, currency: str) -> int:
+    """Convert a major-unit amount (int, float or decimal string) to an integer count of minor units.
+    
+    Floats are read by their shortest repr, so 0.1 is exactly ten cents.
+    Raises ValueError for amounts finer than the currency's minor unit.
+    """
+    if isinstance(amount, bool):
+        raise ValueError(f"Invalid amount: {amount!r}")
+    try:
+        value = Decimal(repr(amount) if isinstance(amount, float) else str(amount).strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {amount!r}") from None
+    if not value.is_finite():
+        raise ValueError(f"Invalid amount: {amount!r}")
+    exponent = currency_exponent(currency)
+    minor = value.scaleb(exponent)
+    if minor != minor.to_integral_value():
+        raise ValueError(f"Amount {amount} has more decimal places than {currency} allows ({exponent})")
+    return int(minor)
+
+
+def round_to_minor_units(amount, currency: str):
+    """Like to_minor_units, but rounds finer amounts instead of refusing them.
+    
+    For recording rejected input, which may not be a valid amount at all;
+    a value that is not a number is returned unchanged.
+    """
+    try:
+        return to_minor_units(amount, currency)
+    except ValueError:
+        try:
+            return round(float(amount) * 10 ** currency_exponent(currency))
+        except (TypeError, ValueError, OverflowError):
+            return amount
+
+
+def from_minor_units(value, currency: str):
+    """Convert an integer count of minor units back to a major-unit float (None stays None)."""
+    if value is None:
+        return None
+    return value / 10 ** currency_exponent(currency)
+
+
+def money_to_major_units(row: Dict[str, Any], currency: str = None) -> Dict[str, Any]:
+    """Convert the money columns of a row dict to major units in place; returns the row."""
+    currency = currency or row['currency']
+    for column in MONEY_COLUMNS:
+        if row.get(column) is not None:
+            row[column] = from_minor_units(row[column], currency)
+    return row
+
+
+def minor_unit_factor_sql(currency_sql: str) -> str:
+    """SQL expression for the number of minor units in one unit of the currency ``currency_sql`` names."""
+    cases = ' '.join(f"WHEN '{currency}' THEN {10 ** exponent}"
+                     for currency, exponent in sorted(CURRENCY_EXPONENTS.items()))
+    return f'(CASE UPPER({currency_sql}) {cases} ELSE {10 ** DEFAULT_CURRENCY_EXPONENT} END)'
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of pre-configured SQLite connections.
+
+    Connections are created lazily up to ``size`` and configured exactly once
+    (pragmas, row factory) when they are opened. Callers check a connection
+    out with ``acquire()`` and hand it back with ``release()``; when every
+    connection is busy, ``acquire()`` waits up to ``timeout`` seconds.
+    """
+
+    def __init__(self, connect, size: int = 5, timeout: float = 30.0,
+                 health_check_interval: float = 30.0):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle: List[Any] = []          # (connection, last_used) pairs
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'created': 0,
+            'discarded': 0,
+        }
+
+    def acquire(self):
+        """Check out a healthy connection, opening one if the pool is not full."""
+        start = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    conn, last_used = None, None
+                    break
+                if start is None:
+                    start = time.perf_counter()
+                    self._stats['waits'] += 1
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"Timed out after {self.timeout}s waiting for a database connection")
+                self._cond.wait(remaining)
+            self._stats['checkouts'] += 1
+            if start is not None:
+                self._stats['wait_time'] += time.perf_counter() - start
+
+        if conn is None:
+            return self._open_connection()
+        if time.monotonic() - last_used >= self.health_check_interval and not self._is_healthy(conn):
+            self._discard(conn)
+            return self._open_connection()
+        return conn
+
+    def release(self, conn) -> None:
+        """Return a connection to the pool, discarding it if it is unusable."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        with self._cond:
+            if self._closed:
+                self._open -= 1
+                conn.close()
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def close(self) -> None:
+        """Close all idle connections and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                conn.close()
+            self._open -= len(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of pool usage counters."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['size'] = self.size
+            stats['open'] = self._open
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._open - len(self._idle)
+            return stats
+
+    def _open_connection(self):
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats['created'] += 1
+        return conn
+
+    def _discard(self, conn) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._open -= 1
+            self._stats['discarded'] += 1
+            self._cond.notify()
+
+    @staticmethod
+    def _is_healthy(conn) -> bool:
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+
+def _create_account_tables(db_manager, conn):
+    # Sender accounts table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sender_accounts (
+            account_number TEXT PRIMARY KEY,
+            authentication_credential TEXT NOT NULL,
+            balance REAL NOT NULL CHECK(balance >= 0),
+            contact_information TEXT NOT NULL,
+            currency TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Receiver accounts table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS receiver_accounts (
+            account_number TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            contact_information TEXT NOT NULL,
+            currency TEXT NOT NULL,
+            daily_limit REAL NOT NULL CHECK(daily_limit > 0),
+            daily_received REAL DEFAULT 0 CHECK(daily_received >= 0),
+            last_reset_date DATE DEFAULT CURRENT_DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Transactions log table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS transactions (
+            transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender_account TEXT NOT NULL,
+            receiver_account TEXT NOT NULL,
+            amount REAL NOT NULL CHECK(amount > 0),
+            currency TEXT NOT NULL,
+            transaction_reason TEXT,
+            status TEXT NOT NULL,
+            sender_balance_before REAL NOT NULL,
+            sender_balance_after REAL NOT NULL,
+            receiver_daily_before REAL NOT NULL,
+            receiver_daily_after REAL NOT NULL,
+            transaction_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (sender_account) REFERENCES sender_accounts(account_number),
+            FOREIGN KEY (receiver_account) REFERENCES receiver_accounts(account_number)
+        )
+    ''')
+
+
+def _create_history_indexes(db_manager, conn):
+    # Create indexes for better performance. The per-account indexes
+    # match the history ordering so keyset pages need no sort step;
+    # they supersede the old single-column account indexes.
+    conn.execute('DROP INDEX IF EXISTS idx_transactions_sender')
+    conn.execute('DROP INDEX IF EXISTS idx_transactions_receiver')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_sender_history 
+        ON transactions(sender_account, transaction_timestamp DESC, transaction_id DESC)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_receiver_history 
+        ON transactions(receiver_account, transaction_timestamp DESC, transaction_id DESC)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_timestamp 
+        ON transactions(transaction_timestamp)
+    ''')
+
+
+def _create_archive_partitions(db_manager, conn):
+    # Monthly archive files holding transactions moved out of the hot
+    # table (see archive.py); paths are relative to this database
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS archive_partitions (
+            partition_month TEXT PRIMARY KEY,
+            file_path TEXT NOT NULL,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            min_transaction_id INTEGER,
+            max_transaction_id INTEGER,
+            min_timestamp TIMESTAMP,
+            max_timestamp TIMESTAMP,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _create_daily_rollups(db_manager, conn):
+    # Daily rollups (per day, currency and status), kept current by a
+    # trigger so every insert into transactions updates them in the
+    # same transaction
+    rollups_exist = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_transaction_rollups'"
+    ).fetchone()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_transaction_rollups (
+            summary_date DATE NOT NULL,
+            currency TEXT NOT NULL,
+            status TEXT NOT NULL,
+            transaction_count INTEGER NOT NULL DEFAULT 0,
+            total_amount REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (summary_date, currency, status)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO daily_transaction_rollups
+                (summary_date, currency, status, transaction_count, total_amount)
+            VALUES (DATE(NEW.transaction_timestamp), NEW.currency, NEW.status, 1, NEW.amount)
+            ON CONFLICT (summary_date, currency, status) DO UPDATE SET
+                transaction_count = transaction_count + 1,
+                total_amount = total_amount + excluded.total_amount;
+        END
+    ''')
+    if not rollups_exist:
+        db_manager.rebuild_daily_rollups(conn=conn)
+
+
+def _create_bulk_load_progress(db_manager, conn):
+    # Progress of interrupted bulk account loads (see bulk_load.py)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS bulk_load_progress (
+            source TEXT NOT NULL,
+            account_type TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            records_done INTEGER NOT NULL DEFAULT 0,
+            loaded INTEGER NOT NULL DEFAULT 0,
+            rejected INTEGER NOT NULL DEFAULT 0,
+            dropped_indexes TEXT NOT NULL DEFAULT '[]',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, account_type)
+        )
+    ''')
+
+
+def _create_transfer_file_progress(db_manager, conn):
+    # Checkpoints of headless transfer-file runs (see main_db.py)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS transfer_file_progress (
+            source TEXT NOT NULL,
+            output_path TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            lines_done INTEGER NOT NULL DEFAULT 0,
+            output_bytes INTEGER NOT NULL DEFAULT 0,
+            succeeded INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, output_path)
+        )
+    ''')
+
+
+def _create_idempotency_keys(db_manager, conn):
+    # Client idempotency keys for transfers, with the result to replay
+    # for a retried submission; expired keys are purged by created_at
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            idempotency_key TEXT PRIMARY KEY,
+            sender_account TEXT NOT NULL,
+            receiver_account TEXT NOT NULL,
+            amount REAL NOT NULL,
+            currency TEXT NOT NULL,
+            transaction_id INTEGER NOT NULL,
+            sender_balance_before REAL NOT NULL,
+            sender_balance_after REAL NOT NULL,
+            receiver_daily_before REAL NOT NULL,
+            receiver_daily_after REAL NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created 
+        ON idempotency_keys(created_at)
+    ''')
+
+
+def _create_ledger_checkpoint(db_manager, conn):
+    # Last transaction written by a ledger checkpoint (see ledger.py);
+    # journal records after it are replayed on startup
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ledger_checkpoint (
+            id INTEGER PRIMARY KEY CHECK(id = 1),
+            last_transaction_id INTEGER NOT NULL,
+            checkpointed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _table_exists(conn, table):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
+def _real_money_columns(conn, table):
+    """Money columns of ``table`` still declared REAL (empty once it is converted)."""
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')
+            if row[1] in MONEY_COLUMNS and row[2].upper() == 'REAL']
+
+
+def _create_minor_unit_copy(conn, table):
+    # <table>_minor: the table's own definition with its money columns INTEGER
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+    definition = sql[sql.index('('):]
+    for column in MONEY_COLUMNS:
+        definition = re.sub(rf'\b({column}\s+)REAL\b', r'\1INTEGER', definition, flags=re.IGNORECASE)
+    conn.execute(f'CREATE TABLE IF NOT EXISTS {table}_minor {definition}')
+
+
+def _copy_in_minor_units(conn, table, currency_sql, key=None, limit=None):
+    """Copy rows of ``table`` not yet in ``<table>_minor``, converting money; returns rows copied.
+    
+    With a ``key`` (an ever-increasing column) rows are copied in key order
+    after the last one already copied, at most ``limit`` at a time; without
+    one the whole table is copied.
+    """
+    real_columns = _real_money_columns(conn, table)
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+    factor = minor_unit_factor_sql(currency_sql)
+    select = ', '.join(f'CAST(ROUND({column} * {factor}) AS INTEGER)' if column in real_columns else column
+                       for column in columns)
+    query = f'INSERT INTO {table}_minor ({", ".join(columns)}) SELECT {select} FROM {table}'
+    params = []
+    if key is not None:
+        last = conn.execute(f'SELECT MAX({key}) FROM {table}_minor').fetchone()[0]
+        if last is not None:
+            query += f' WHERE {key} > ?'
+            params.append(last)
+        query += f' ORDER BY {key}'
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+    return conn.execute(query, params).rowcount
+
+
+def _swap_in_minor_unit_copies(conn, tables):
+    """Replace each table by its ``_minor`` copy, keeping its indexes, triggers and AUTOINCREMENT counter."""
+    marks = ', '.join('?' * len(tables))
+    dependents = [row[0] for row in conn.execute(
+        f'''SELECT sql FROM sqlite_master
+            WHERE type IN ('index', 'trigger') AND tbl_name IN ({marks}) AND sql IS NOT NULL''',
+        tables
+    )]
+    sequences = {}
+    if _table_exists(conn, 'sqlite_sequence'):
+        sequences = dict(conn.execute(
+            f'SELECT name, seq FROM sqlite_sequence WHERE name IN ({marks})', tables
+        ).fetchall())
+    for table in tables:
+        conn.execute(f'DROP TABLE {table}')
+    for table in tables:
+        conn.execute(f'ALTER TABLE {table}_minor RENAME TO {table}')
+    # Ids are never reused, even those of rows deleted before the copy
+    for table, seq in sequences.items():
+        updated = conn.execute('UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?', (seq, table))
+        if not updated.rowcount:
+            conn.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (table, seq))
+    for sql in dependents:
+        conn.execute(sql)
+
+
+def _convert_archive_file(path):
+    """Convert one archive partition file to minor units in a single transaction."""
+    if not os.path.exists(path):
+        return False
+    archive = sqlite3.connect(path)
+    try:
+        archive.execute('BEGIN IMMEDIATE')
+        converted = bool(_table_exists(archive, 'transactions') and _real_money_columns(archive, 'transactions'))
+        if converted:
+            _create_minor_unit_copy(archive, 'transactions')
+            _copy_in_minor_units(archive, 'transactions', 'currency')
+            _swap_in_minor_unit_copies(archive, ['transactions'])
+        archive.commit()
+        return converted
+    finally:
+        archive.close()
+
+
+def _copy_money_in_minor_units(db_manager, conn):
+    # Backfill, run before the step below and outside its transaction: the
+    # large append-only tables are copied in committed chunks (a rerun picks
+    # up after the last copied key) and archive files one file at a time
+    for table, key, currency_sql in db_manager.MINOR_UNIT_TABLES:
+        if key is None or not _table_exists(conn, table) or not _real_money_columns(conn, table):
+            continue
+        _create_minor_unit_copy(conn, table)
+        conn.commit()
+        while True:
+            conn.execute('BEGIN IMMEDIATE')
+            copied = _copy_in_minor_units(conn, table, currency_sql, key, db_manager.MIGRATION_BATCH_SIZE)
+            conn.commit()
+            if copied < db_manager.MIGRATION_BATCH_SIZE:
+                break
+    if _table_exists(conn, 'archive_partitions'):
+        for row in conn.execute('SELECT file_path FROM archive_partitions ORDER BY partition_month').fetchall():
+            _convert_archive_file(db_manager.archive_file_path(row[0]))
+
+
+def _store_money_in_minor_units(db_manager, conn):
+    # Copy whatever the backfill has not (accounts, rollups and rows written
+    # since), drop rows that left the source meanwhile, then swap the copies
+    # in. Rollup totals are exact sums of two-decimal amounts, so scaling them
+    # gives the same result as recomputing from every archive file.
+    tables = [(table, key, currency_sql) for table, key, currency_sql in db_manager.MINOR_UNIT_TABLES
+              if _table_exists(conn, table) and _real_money_columns(conn, table)]
+    if not tables:
+        return
+    for table, key, currency_sql in tables:
+        _create_minor_unit_copy(conn, table)
+        _copy_in_minor_units(conn, table, currency_sql, key)
+        if key is not None:
+            source, copy = (conn.execute(f'SELECT COUNT(*) FROM {name}').fetchone()[0]
+                            for name in (table, f'{table}_minor'))
+            if source != copy:
+                conn.execute(f'DELETE FROM {table}_minor WHERE {key} NOT IN (SELECT {key} FROM {table})')
+    _swap_in_minor_unit_copies(conn, [table for table, _, _ in tables])
+
 
 class DatabaseManager:
     """Manages database connection and operations with transaction support."""
     
-    def __init__(self, db_path='money_transfer.db'):
+    # Schema migration steps, oldest first. A file's PRAGMA user_version is
+    # the number of steps applied to it, so steps are only ever appended
+    # (subclasses append steps of their own). Each step is idempotent, which
+    # lets files created before versioning (user_version 0) replay them all.
+    MIGRATIONS = (
+        ('account and transaction tables', _create_account_tables),
+        ('history indexes', _create_history_indexes),
+        ('archive partitions', _create_archive_partitions),
+        # Rebuilding reads archive_partitions
+        ('daily rollups', _create_daily_rollups),
+        ('bulk load progress', _create_bulk_load_progress),
+        ('transfer file progress', _create_transfer_file_progress),
+        ('idempotency keys', _create_idempotency_keys),
+        ('ledger checkpoint', _create_ledger_checkpoint),
+        # Steps may carry a backfill, run in its own chunks before the step
+        ('money in minor units', _store_money_in_minor_units, _copy_money_in_minor_units),
+    )
+    
+    # Tables converted by the minor-units step: (table, key the backfill copies
+    # in order of, or None to copy inside the step, SQL naming the currency)
+    MINOR_UNIT_TABLES = (
+        ('sender_accounts', None, 'currency'),
+        ('receiver_accounts', None, 'currency'),
+        ('transactions', 'transaction_id', 'currency'),
+        ('idempotency_keys', None, 'currency'),
+        ('daily_transaction_rollups', None, 'currency'),
+    )
+    # Rows per committed chunk of a migration backfill
+    MIGRATION_BATCH_SIZE = 5000
+    
+    def __init__(self, db_path='money_transfer.db', pool_size=5, pool_timeout=30.0, instrumentation=None,
+                 read_pool_size=None):
         self.db_path = db_path
+        # Optional instrumentation.Collector; None keeps connections unwrapped
+        self.instrumentation = instrumentation
+        self.pool = ConnectionPool(self._connect, size=pool_size, timeout=pool_timeout)
         self.init_database()
+        # Read-only lane for queries; opened after init so the file exists
+        self.read_pool = ConnectionPool(self._connect_read_only, size=read_pool_size or pool_size,
+                                        timeout=pool_timeout)
     
-    def get_connection(self):
-        """Create a new database connection with proper settings."""
-        conn = sqlite3.connect(self.db_path)
+    def _connect(self):
+        """Open a raw connection with proper settings.
+        
+        The pool calls this once per pooled connection, so the pragmas below
+        run when a connection is opened rather than on every checkout.
+        """
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
         conn.execute('PRAGMA journal_mode = WAL')  # Write-Ahead Logging for better concurrency
         conn.execute('PRAGMA foreign_keys = ON')   # Enable foreign key constraints
         conn.row_factory = sqlite3.Row  # Enable column access by name
         return conn
     
+    def _connect_read_only(self):
+        """Open a raw read-only connection for the read pool.
+        
+        ``mode=ro`` makes SQLite refuse writes at the file level and
+        ``query_only`` rejects them at the statement level, so nothing on the
+        read lane can take the write lock. Under WAL these readers work from
+        snapshots and never wait on the writer.
+        """
+        uri = 'file:' + pathname2url(os.path.abspath(self.db_path)) + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.execute('PRAGMA query_only = ON')
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def get_connection(self):
+        """Create a new, unpooled database connection with proper settings."""
+        conn = self._connect()
+        if self.instrumentation is not None:
+            return InstrumentedConnection(conn, self.instrumentation)
+        return conn
+    
     @contextmanager
-    def transaction(self):
-        """Context manager for database transactions with automatic rollback on error."""
-        conn = self.get_connection()
+    def transaction(self, immediate=False):
+        """Context manager for database transactions with automatic rollback on error.
+        
+        With ``immediate=True`` the transaction starts with BEGIN IMMEDIATE, taking
+        the write lock up front so rows read inside it cannot change underneath.
+        """
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            api = current_api()
+            start = time.perf_counter()
+        raw = self.pool.acquire()
+        conn = raw
+        if instrumentation is not None:
+            opened = time.perf_counter()
+            instrumentation.record_acquire(opened - start, api)
+            conn = InstrumentedConnection(raw, instrumentation)
         try:
+            if immediate:
+                conn.execute('BEGIN IMMEDIATE')
             yield conn
             conn.commit()
         except Exception as e:
             conn.rollback()
             raise e
         finally:
-            conn.close()
+            self.pool.release(raw)
+            if instrumentation is not None:
+                instrumentation.record_transaction(time.perf_counter() - opened, api)
+    
+    @contextmanager
+    def read(self, snapshot=True):
+        """Context manager for queries on the read-only lane.
+        
+        With ``snapshot=True`` the block runs inside one deferred read
+        transaction, so every statement sees the same committed state however
+        long the block takes, without blocking writers. Pass ``snapshot=False``
+        for single-statement reads that need to ATTACH other databases, which
+        SQLite only allows outside a transaction. Nothing is ever committed.
+        """
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            api = current_api()
+            start = time.perf_counter()
+        raw = self.read_pool.acquire()
+        conn = raw
+        if instrumentation is not None:
+            opened = time.perf_counter()
+            instrumentation.record_acquire(opened - start, api)
+            conn = InstrumentedConnection(raw, instrumentation)
+        try:
+            if snapshot:
+                conn.execute('BEGIN')
+            yield conn
+        finally:
+            if raw.in_transaction:
+                raw.rollback()
+            self.read_pool.release(raw)
+            if instrumentation is not None:
+                instrumentation.record_transaction(time.perf_counter() - opened, api)
+    
+    def pool_stats(self):
+        """Return connection pool statistics (checkouts, waits, wait time, ...)."""
+        return self.pool.stats()
+    
+    def read_pool_stats(self):
+        """Return statistics for the read-only connection pool."""
+        return self.read_pool.stats()
+    
+    def close(self):
+        """Close all pooled connections and flush the instrumentation collector."""
+        self.read_pool.close()
+        self.pool.close()
+        if self.instrumentation is not None:
+            self.instrumentation.close()
+    
+    def schema_version(self):
+        """Return the schema version recorded in the database file (``PRAGMA user_version``)."""
+        conn = self.pool.acquire()
+        try:
+            return conn.execute('PRAGMA user_version').fetchone()[0]
+        finally:
+            self.pool.release(conn)
     
     def init_database(self):
-        """Initialize database schema if not exists."""
-        with self.transaction() as conn:
-            # Sender accounts table
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS sender_accounts (
-                    account_number TEXT PRIMARY KEY,
-                    authentication_credential TEXT NOT NULL,
-                    balance REAL NOT NULL CHECK(balance >= 0),
-                    contact_information TEXT NOT NULL,
-                    currency TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Receiver accounts table
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS receiver_accounts (
-                    account_number TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    contact_information TEXT NOT NULL,
-                    currency TEXT NOT NULL,
-                    daily_limit REAL NOT NULL CHECK(daily_limit > 0),
-                    daily_received REAL DEFAULT 0 CHECK(daily_received >= 0),
-                    last_reset_date DATE DEFAULT CURRENT_DATE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Transactions log table
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS transactions (
-                    transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    sender_account TEXT NOT NULL,
-                    receiver_account TEXT NOT NULL,
-                    amount REAL NOT NULL CHECK(amount > 0),
-                    currency TEXT NOT NULL,
-                    transaction_reason TEXT,
-                    status TEXT NOT NULL,
-                    sender_balance_before REAL NOT NULL,
-                    sender_balance_after REAL NOT NULL,
-                    receiver_daily_before REAL NOT NULL,
-                    receiver_daily_after REAL NOT NULL,
-                    transaction_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (sender_account) REFERENCES sender_accounts(account_number),
-                    FOREIGN KEY (receiver_account) REFERENCES receiver_accounts(account_number)
-                )
-            ''')
-            
-            # Create indexes for better performance
-            conn.execute('''
-                CREATE INDEX IF NOT EXISTS idx_transactions_sender 
-                ON transactions(sender_account)
-            ''')
-            conn.execute('''
-                CREATE INDEX IF NOT EXISTS idx_transactions_receiver 
-                ON transactions(receiver_account)
-            ''')
-            conn.execute('''
-                CREATE INDEX IF NOT EXISTS idx_transactions_timestamp 
-                ON transactions(transaction_timestamp)
-            ''')
+        """Bring the schema up to date.
+        
+        When the file is already at the latest version this is a single
+        header read; no write transaction is opened.
+        """
+        if self.schema_version() < len(self.MIGRATIONS):
+            self.migrate()
+    
+    def migrate(self):
+        """Apply pending migration steps in order; returns the names of the steps applied.
+        
+        Each step runs in its own BEGIN IMMEDIATE transaction together with the
+        ``user_version`` bump, so a step is applied exactly once even when
+        several processes start on an old file at the same time, and an
+        interrupted upgrade resumes at the step that did not commit. A step
+        with a backfill first copies data across in short committed chunks, so
+        the step itself only holds the write lock for what is left.
+        
+        Steps run on a connection of their own with foreign keys off, since
+        rebuilding a table drops and renames tables others reference.
+        """
+        applied = []
+        conn = self._connect()
+        conn.execute('PRAGMA foreign_keys = OFF')
+        try:
+            for version, (name, step, *backfill) in enumerate(self.MIGRATIONS, start=1):
+                if backfill and conn.execute('PRAGMA user_version').fetchone()[0] < version:
+                    backfill[0](self, conn)
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    if conn.execute('PRAGMA user_version').fetchone()[0] >= version:
+                        conn.rollback()
+                        continue
+                    step(self, conn)
+                    conn.execute(f'PRAGMA user_version = {version}')
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                applied.append(name)
+        finally:
+            conn.close()
+        return applied
+    
+    def archive_file_path(self, file_path):
+        """Resolve an archive partition path stored relative to this database."""
+        return os.path.join(os.path.dirname(os.path.abspath(self.db_path)), file_path)
+    
+    def rebuild_daily_rollups(self, from_date=None, to_date=None, conn=None):
+        """Recompute daily rollups from the transactions table and its archives (optionally for a date range)."""
+        if conn is None:
+            with self.transaction(immediate=True) as conn:
+                return self.rebuild_daily_rollups(from_date, to_date, conn)
+        
+        where, params = [], []
+        if from_date:
+            where.append('summary_date >= ?')
+            params.append(from_date)
+        if to_date:
+            where.append('summary_date <= ?')
+            params.append(to_date)
+        clause = (' WHERE ' + ' AND '.join(where)) if where else ''
+        conn.execute('DELETE FROM daily_transaction_rollups' + clause, params)
+        
+        # Range-bound the scan on the raw timestamp so idx_transactions_timestamp is usable
+        ts_where, ts_params = [], []
+        if from_date:
+            ts_where.append('transaction_timestamp >= ?')
+            ts_params.append(from_date)
+        if to_date:
+            ts_where.append('transaction_timestamp < DATE(?, \'+1 day\')')
+            ts_params.append(to_date)
+        ts_clause = (' WHERE ' + ' AND '.join(ts_where)) if ts_where else ''
+        cursor = conn.execute(
+            '''INSERT INTO daily_transaction_rollups
+               (summary_date, currency, status, transaction_count, total_amount)
+               SELECT DATE(transaction_timestamp), currency, status, COUNT(*), SUM(amount)
+               FROM transactions''' + ts_clause + '''
+               GROUP BY DATE(transaction_timestamp), currency, status''',
+            ts_params
+        )
+        rebuilt = cursor.rowcount
+        
+        # Days that were archived still need their counts; read them from the
+        # monthly archive files that overlap the range, and only those
+        partitions = conn.execute(
+            '''SELECT file_path FROM archive_partitions
+               WHERE (? IS NULL OR max_timestamp >= ?)
+                 AND (? IS NULL OR min_timestamp < DATE(?, '+1 day'))
+               ORDER BY partition_month''',
+            (from_date, from_date, to_date, to_date)
+        ).fetchall()
+        for partition in partitions:
+            archive = sqlite3.connect(self.archive_file_path(partition['file_path']))
+            try:
+                rows = archive.execute(
+                    '''SELECT DATE(transaction_timestamp), currency, status, COUNT(*), SUM(amount)
+                       FROM transactions''' + ts_clause + '''
+                       GROUP BY DATE(transaction_timestamp), currency, status''',
+                    ts_params
+                ).fetchall()
+            finally:
+                archive.close()
+            conn.executemany(
+                '''INSERT INTO daily_transaction_rollups
+                   (summary_date, currency, status, transaction_count, total_amount)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT (summary_date, currency, status) DO UPDATE SET
+                       transaction_count = transaction_count + excluded.transaction_count,
+                       total_amount = total_amount + excluded.total_amount''',
+                rows
+            )
+            rebuilt += len(rows)
+        return rebuilt
     
     def seed_sample_data(self):
         """Seed database with sample data."""
+        self.upsert_accounts(SAMPLE_SENDER_ACCOUNTS, SAMPLE_RECEIVER_ACCOUNTS)
+    
+    def upsert_accounts(self, sender_data=(), receiver_data=()):
+        """Insert or replace sender and receiver account rows.
+        
+        Sender rows are (account_number, credential, balance, contact, currency);
+        receiver rows are (account_number, name, contact, currency, daily_limit,
+        daily_received), with money in major units.
+        """
+        sender_data = [(number, credential, to_minor_units(balance, currency), contact, currency)
+                       for number, credential, balance, contact, currency in sender_data]
+        receiver_data = [(number, name, contact, currency, to_minor_units(daily_limit, currency),
+                          to_minor_units(daily_received, currency))
+                         for number, name, contact, currency, daily_limit, daily_received in receiver_data]
         with self.transaction() as conn:
             # Insert sender accounts
-            sender_data = [
-                ('ACC1001', 'pass123', 90000.0, 'vijay@example.com', 'INR'),
-                ('ACC1002', 'secure456', 50000.5, 'rahul@example.com', 'INR')
-            ]
-            
             conn.executemany('''
                 INSERT OR REPLACE INTO sender_accounts 
                 (account_number, authentication_credential, balance, contact_information, currency)
@@ -112,11 +854,6 @@ class DatabaseManager:
             ''', sender_data)
             
             # Insert receiver accounts
-            receiver_data = [
-                ('ACC2001', 'Amit Sharma', 'amitsharma@gmail.com', 'INR', 100000.0, 9000.0),
-                ('ACC2002', 'Priya Singh', 'priya.singh@example.com', 'INR', 50000.0, 10000.0)
-            ]
-            
             conn.executemany('''
                 INSERT OR REPLACE INTO receiver_accounts 
                 (account_number, name, contact_information, currency, daily_limit, daily_received)
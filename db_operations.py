@@ -1,17 +1,100 @@
 import sqlite3
-from datetime import datetime, date
-from typing import Optional, Dict, Any, Tuple, List
-from database import DatabaseManager
+from datetime import datetime, date, timedelta
+from typing import Optional, Dict, Any, Tuple, List, Iterable, Sequence, Union, Callable
+from database import (DatabaseManager, to_minor_units, round_to_minor_units, from_minor_units,
+                      money_to_major_units)
+from account_cache import AccountCache
+from archive import attached_archive, overlapping_partitions
+from instrumentation import traced_api
+
+BATCH_MODES = ('all_or_nothing', 'savepoint')
+TRANSFER_FIELDS = ('sender_account', 'receiver_account', 'amount', 'currency',
+                   'contact_info', 'transaction_reason', 'idempotency_key')
+RESULT_FIELDS = ('transaction_id', 'sender_balance_before', 'sender_balance_after',
+                 'receiver_daily_before', 'receiver_daily_after')
+
+# SQLite caps the number of bound parameters per statement; stay well below it
+MAX_IN_PARAMS = 500
+
+
+def _normalize_transfer_request(request: Union[Dict[str, Any], Sequence[Any]]) -> Dict[str, Any]:
+    """Accept a dict or a positional tuple in process_transfer argument order.
+    
+    The amount comes back in minor units of the transfer's currency.
+    """
+    if isinstance(request, dict):
+        transfer = {field: request.get(field) for field in TRANSFER_FIELDS}
+    else:
+        values = list(request) + [None] * (len(TRANSFER_FIELDS) - len(request))
+        transfer = dict(zip(TRANSFER_FIELDS, values))
+    for field in ('sender_account', 'receiver_account', 'amount', 'currency'):
+        if transfer[field] is None:
+            raise ValueError(f"Transfer request is missing '{field}'")
+    transfer['amount'] = to_minor_units(transfer['amount'], transfer['currency'])
+    return transfer
+
+
+def _chunked(items: Sequence[Any], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# Rejections quote amounts in major units, as the caller submitted them
+def _insufficient_balance(available: int, required: int, currency: str) -> ValueError:
+    return ValueError(f"Insufficient balance. Available: {from_minor_units(available, currency)}, "
+                      f"Required: {from_minor_units(required, currency)}")
+
+
+def _daily_limit_exceeded(remaining: int, currency: str) -> ValueError:
+    return ValueError(f"Receiver daily limit exceeded. Remaining limit: {from_minor_units(remaining, currency)}")
+
+
+# Amounts are scaled by the request's currency, so it must be the account's
+def _currency_mismatch(account_number: str, account_currency: str, currency: str) -> ValueError:
+    return ValueError(f"Currency mismatch. Account {account_number} holds {account_currency}, not {currency}")
 
 class MoneyTransferDB:
     """Handles all database operations for money transfer system."""
     
-    def __init__(self):
-        self.db_manager = DatabaseManager()
+    def __init__(self, db_manager: Optional[DatabaseManager] = None,
+                 cache_capacity: int = 0, cache_ttl: float = 30.0, failure_log=None,
+                 idempotency_retention: float = 86400.0, velocity=None):
+        self.db_manager = db_manager or DatabaseManager()
+        # Read-through caches for account lookups; capacity 0 disables them.
+        # They only see writes made through this instance, so enable them only
+        # where nothing else writes the accounts
+        self.sender_cache = AccountCache(cache_capacity, cache_ttl)
+        self.receiver_cache = AccountCache(cache_capacity, cache_ttl)
+        # Optional failure_log.FailureLogWriter; None writes each failure inline
+        self.failure_log = failure_log
+        # Seconds an idempotency key keeps replaying its original result
+        self.idempotency_retention = idempotency_retention
+        # Optional velocity.VelocityLimiter, loaded from recent transactions
+        self.velocity = velocity
+        if velocity is not None:
+            velocity.rebuild(self.db_manager)
+    
+    def invalidate_cache(self, sender_accounts: Iterable[str] = (), receiver_accounts: Iterable[str] = ()) -> None:
+        """Drop cached account records; call after committing a write to them."""
+        self.sender_cache.invalidate(*sender_accounts)
+        self.receiver_cache.invalidate(*receiver_accounts)
+    
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return hit/miss/eviction counters for the account caches."""
+        return {'sender': self.sender_cache.stats(), 'receiver': self.receiver_cache.stats()}
     
+    @traced_api
     def get_sender_account(self, account_number: str) -> Optional[Dict[str, Any]]:
-        """Retrieve sender account details."""
-        with self.db_manager.transaction() as conn:
+        """Retrieve sender account details (money in major units)."""
+        account = self._cached_sender_account(account_number)
+        return money_to_major_units(account) if account else None
+    
+    def _cached_sender_account(self, account_number: str) -> Optional[Dict[str, Any]]:
+        # A copy of the stored row, money in minor units
+        return self.sender_cache.get_or_load(account_number, lambda: self._load_sender_account(account_number))
+    
+    def _load_sender_account(self, account_number: str) -> Optional[Dict[str, Any]]:
+        with self.db_manager.read() as conn:
             cursor = conn.execute(
                 'SELECT * FROM sender_accounts WHERE account_number = ?',
                 (account_number,)
@@ -21,149 +104,592 @@ class MoneyTransferDB:
                 return dict(row)
             return None
     
+    @traced_api
     def verify_authentication(self, account_number: str, credential: str) -> bool:
         """Verify authentication credential for sender account."""
-        with self.db_manager.transaction() as conn:
-            cursor = conn.execute(
-                'SELECT authentication_credential FROM sender_accounts WHERE account_number = ?',
-                (account_number,)
-            )
-            row = cursor.fetchone()
-            if row:
-                return row['authentication_credential'] == credential
-            return False
+        account = self.get_sender_account(account_number)
+        if account:
+            return account['authentication_credential'] == credential
+        return False
     
+    @traced_api
     def get_receiver_account(self, account_number: str) -> Optional[Dict[str, Any]]:
-        """Retrieve receiver account details with daily limit reset if needed."""
-        with self.db_manager.transaction() as conn:
+        """
+        Retrieve receiver account details with the effective daily total.
+        
+        A receiver whose ``last_reset_date`` is before today has received
+        nothing yet today, so ``daily_received`` is reported as 0. The stored
+        row is left alone; it is rolled over by the next transfer that credits
+        the receiver (or by ``rollover_daily_limits``), keeping lookups write-free.
+        """
+        receiver = self._cached_receiver_account(account_number)
+        return money_to_major_units(receiver) if receiver else None
+    
+    def _cached_receiver_account(self, account_number: str) -> Optional[Dict[str, Any]]:
+        # A copy of the stored row with the effective daily total, in minor units
+        receiver = self.receiver_cache.get_or_load(account_number,
+                                                   lambda: self._load_receiver_account(account_number))
+        if receiver:
+            today = date.today().isoformat()
+            if (receiver['last_reset_date'] or '') < today:
+                receiver['daily_received'] = 0
+                receiver['last_reset_date'] = today
+        return receiver
+    
+    def _load_receiver_account(self, account_number: str) -> Optional[Dict[str, Any]]:
+        with self.db_manager.read() as conn:
             cursor = conn.execute(
                 'SELECT * FROM receiver_accounts WHERE account_number = ?',
                 (account_number,)
             )
             row = cursor.fetchone()
             if row:
-                receiver = dict(row)
-                
-                # Reset daily_received if it's a new day
-                last_reset = datetime.strptime(receiver['last_reset_date'], '%Y-%m-%d').date()
-                today = date.today()
-                
-                if last_reset < today:
-                    conn.execute(
-                        '''UPDATE receiver_accounts 
-                           SET daily_received = 0, 
-                               last_reset_date = ?,
-                               updated_at = CURRENT_TIMESTAMP
-                           WHERE account_number = ?''',
-                        (today.isoformat(), account_number)
-                    )
-                    receiver['daily_received'] = 0.0
-                    receiver['last_reset_date'] = today.isoformat()
-                
-                return receiver
+                return dict(row)
             return None
     
+    @traced_api
     def check_sufficient_balance(self, account_number: str, amount: float) -> bool:
         """Check if sender has sufficient balance."""
-        account = self.get_sender_account(account_number)
+        account = self._cached_sender_account(account_number)
         if account:
-            return account['balance'] >= amount
+            return account['balance'] >= to_minor_units(amount, account['currency'])
         return False
     
+    @traced_api
     def check_receiver_daily_limit(self, receiver_account_number: str, amount: float) -> Tuple[bool, float]:
         """Check if receiver can receive the amount within daily limit."""
-        receiver = self.get_receiver_account(receiver_account_number)
+        receiver = self._cached_receiver_account(receiver_account_number)
         if receiver:
             remaining_limit = receiver['daily_limit'] - receiver['daily_received']
-            return amount <= remaining_limit, remaining_limit
+            return (to_minor_units(amount, receiver['currency']) <= remaining_limit,
+                    from_minor_units(remaining_limit, receiver['currency']))
         return False, 0.0
     
+    @traced_api
     def process_transfer(self, sender_account: str, receiver_account: str, amount: float, 
-                        currency: str, contact_info: str, transaction_reason: Optional[str] = None) -> Dict[str, Any]:
+                        currency: str, contact_info: str, transaction_reason: Optional[str] = None,
+                        idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         """
         Process money transfer with full ACID transaction support.
         Either all operations succeed or all fail (atomic).
+        
+        The transaction begins IMMEDIATE so concurrent transfers queue for the
+        write lock instead of reading the same balance and overwriting each other.
+        
+        With an ``idempotency_key``, a retry of a transfer that already
+        succeeded returns the original result instead of moving money again.
+        Keys are honoured for ``idempotency_retention`` seconds.
         """
+        reservations: List[Any] = []
+        try:
+            with self.db_manager.transaction(immediate=True) as conn:
+                result = self._transfer_idempotent(conn, sender_account, receiver_account, amount, currency,
+                                                   transaction_reason, idempotency_key, reservations)
+        except BaseException:
+            # Not committed, so it does not count against the sender's velocity limits
+            self._release_velocity(*reservations)
+            raise
+        self.invalidate_cache([sender_account], [receiver_account])
+        return result
+    
+    def _transfer_idempotent(self, conn: sqlite3.Connection, sender_account: str, receiver_account: str,
+                             amount: float, currency: str, transaction_reason: Optional[str] = None,
+                             idempotency_key: Optional[str] = None,
+                             reservations: Optional[List[Any]] = None) -> Dict[str, Any]:
+        """Run the transfer, or replay the stored result if ``idempotency_key`` was already used.
+        
+        ``amount`` and the returned balances are in major units. The velocity
+        reservation of a transfer that succeeds is appended to ``reservations``,
+        for the caller to release if its transaction then fails to commit.
+        """
+        amount = to_minor_units(amount, currency)
+        transfer = None
+        if idempotency_key is not None:
+            transfer = {'sender_account': sender_account, 'receiver_account': receiver_account,
+                        'amount': amount, 'currency': currency, 'idempotency_key': idempotency_key}
+            stored = self._load_idempotency_keys(conn, [idempotency_key])
+            if idempotency_key in stored:
+                return money_to_major_units(self._replay_result(stored[idempotency_key], transfer), currency)
+        reservation = self._reserve_velocity(sender_account, amount, currency)
+        try:
+            result = self._transfer_in_connection(conn, sender_account, receiver_account,
+                                                  amount, currency, transaction_reason)
+            if transfer is not None:
+                self._store_idempotency_keys(conn, [(transfer, result)])
+        except BaseException:
+            self._release_velocity(reservation)
+            raise
+        if reservations is not None:
+            reservations.append(reservation)
+        return money_to_major_units(result, currency)
+    
+    def _reserve_velocity(self, sender_account: str, amount: int,
+                          currency: str) -> Optional[Tuple[str, str, int, int]]:
+        """Count the transfer against the sender's velocity limits (ValueError if over a limit)."""
+        if self.velocity is None:
+            return None
+        return self.velocity.reserve(sender_account, amount, currency)
+    
+    def _release_velocity(self, *reservations: Optional[Tuple[str, str, int, int]]) -> None:
+        for reservation in reservations:
+            if reservation is not None:
+                self.velocity.release(reservation)
+    
+    def _load_idempotency_keys(self, conn: sqlite3.Connection, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch unexpired stored results for ``keys`` with primary-key lookups."""
+        stored: Dict[str, Dict[str, Any]] = {}
+        for chunk in _chunked(list(set(keys)), MAX_IN_PARAMS):
+            placeholders = ','.join('?' * len(chunk))
+            for row in conn.execute(
+                f'''SELECT * FROM idempotency_keys
+                    WHERE idempotency_key IN ({placeholders})
+                      AND created_at >= DATETIME('now', ?)''',
+                chunk + [f'-{self.idempotency_retention} seconds']
+            ):
+                stored[row['idempotency_key']] = dict(row)
+        return stored
+    
+    @staticmethod
+    def _store_idempotency_keys(conn: sqlite3.Connection,
+                                entries: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> None:
+        """Record (transfer, result) pairs in minor units; an expired row under the same key is replaced."""
+        conn.executemany(
+            '''INSERT OR REPLACE INTO idempotency_keys
+               (idempotency_key, sender_account, receiver_account, amount, currency, transaction_id,
+                sender_balance_before, sender_balance_after, receiver_daily_before, receiver_daily_after)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+            [(t['idempotency_key'], t['sender_account'], t['receiver_account'], t['amount'], t['currency'])
+             + tuple(result[field] for field in RESULT_FIELDS) for t, result in entries]
+        )
+    
+    @staticmethod
+    def _check_same_transfer(original: Dict[str, Any], transfer: Dict[str, Any]) -> None:
+        for field in ('sender_account', 'receiver_account', 'amount', 'currency'):
+            if original[field] != transfer[field]:
+                raise ValueError(f"Idempotency key {transfer['idempotency_key']!r} "
+                                 f"was already used for a different transfer")
+    
+    @classmethod
+    def _replay_result(cls, stored: Dict[str, Any], transfer: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the original result, refusing a key reused for a different transfer."""
+        cls._check_same_transfer(stored, transfer)
+        result = {field: stored[field] for field in RESULT_FIELDS}
+        result['status'] = 'SUCCESS'
+        return result
+    
+    @traced_api
+    def purge_expired_idempotency_keys(self) -> int:
+        """Delete keys past the retention window; returns how many were removed."""
         with self.db_manager.transaction() as conn:
-            # Step 1: Lock and get current sender balance (FOR UPDATE equivalent)
             cursor = conn.execute(
-                'SELECT balance FROM sender_accounts WHERE account_number = ?',
-                (sender_account,)
+                "DELETE FROM idempotency_keys WHERE created_at < DATETIME('now', ?)",
+                (f'-{self.idempotency_retention} seconds',)
             )
-            sender_row = cursor.fetchone()
-            if not sender_row:
-                raise ValueError(f"Sender account {sender_account} not found")
-            
-            sender_balance_before = float(sender_row['balance'])
-            
-            # Check sufficient balance
-            if sender_balance_before < amount:
-                raise ValueError(f"Insufficient balance. Available: {sender_balance_before}, Required: {amount}")
-            
-            # Step 2: Lock and get receiver daily received amount
+            return cursor.rowcount
+    
+    def _transfer_in_connection(self, conn: sqlite3.Connection, sender_account: str, receiver_account: str,
+                                amount: int, currency: str,
+                                transaction_reason: Optional[str] = None) -> Dict[str, Any]:
+        """Run the transfer steps on an open connection; the caller owns the transaction.
+        
+        ``amount`` and the returned balances are in minor units.
+        """
+        today = date.today().isoformat()
+        
+        # Step 1: Read sender balance and receiver limits in one round trip;
+        # a receiver last reset before today has received nothing yet today
+        row = conn.execute(
+            '''SELECT s.balance, s.currency AS sender_currency, r.daily_limit, r.currency AS receiver_currency,
+                      CASE WHEN r.last_reset_date < ? THEN 0 ELSE r.daily_received END AS daily_received
+               FROM (SELECT 1)
+               LEFT JOIN sender_accounts s ON s.account_number = ?
+               LEFT JOIN receiver_accounts r ON r.account_number = ?''',
+            (today, sender_account, receiver_account)
+        ).fetchone()
+        if row['balance'] is None:
+            raise ValueError(f"Sender account {sender_account} not found")
+        if row['sender_currency'] != currency:
+            raise _currency_mismatch(sender_account, row['sender_currency'], currency)
+        
+        sender_balance_before = row['balance']
+        
+        # Check sufficient balance
+        if sender_balance_before < amount:
+            raise _insufficient_balance(sender_balance_before, amount, currency)
+        
+        if row['daily_limit'] is None:
+            raise ValueError(f"Receiver account {receiver_account} not found")
+        if row['receiver_currency'] != currency:
+            raise _currency_mismatch(receiver_account, row['receiver_currency'], currency)
+        
+        receiver_daily_before = row['daily_received']
+        receiver_daily_limit = row['daily_limit']
+        
+        # Check daily limit
+        if receiver_daily_before + amount > receiver_daily_limit:
+            raise _daily_limit_exceeded(receiver_daily_limit - receiver_daily_before, currency)
+        
+        # Step 2: Conditional debit; the guard re-checks funds inside the statement
+        cursor = conn.execute(
+            '''UPDATE sender_accounts 
+               SET balance = balance - ?, 
+                   updated_at = CURRENT_TIMESTAMP
+               WHERE account_number = ? AND balance >= ?''',
+            (amount, sender_account, amount)
+        )
+        if cursor.rowcount != 1:
+            raise _insufficient_balance(sender_balance_before, amount, currency)
+        sender_balance_after = sender_balance_before - amount
+        
+        # Step 3: Conditional credit tracking against the receiver's daily limit,
+        # rolling a stale counter over to today in the same statement
+        cursor = conn.execute(
+            '''UPDATE receiver_accounts 
+               SET daily_received = CASE WHEN last_reset_date < ? THEN 0 ELSE daily_received END + ?,
+                   last_reset_date = ?,
+                   updated_at = CURRENT_TIMESTAMP
+               WHERE account_number = ?
+                 AND CASE WHEN last_reset_date < ? THEN 0 ELSE daily_received END + ? <= daily_limit''',
+            (today, amount, today, receiver_account, today, amount)
+        )
+        if cursor.rowcount != 1:
+            raise _daily_limit_exceeded(receiver_daily_limit - receiver_daily_before, currency)
+        receiver_daily_after = receiver_daily_before + amount
+        
+        # Step 4: Log transaction
+        cursor = conn.execute(
+            '''INSERT INTO transactions 
+               (sender_account, receiver_account, amount, currency, transaction_reason, 
+                status, sender_balance_before, sender_balance_after, 
+                receiver_daily_before, receiver_daily_after)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+            (sender_account, receiver_account, amount, currency, transaction_reason,
+             'SUCCESS', sender_balance_before, sender_balance_after,
+             receiver_daily_before, receiver_daily_after)
+        )
+        
+        transaction_id = cursor.lastrowid
+        
+        # Return transaction details
+        return {
+            'transaction_id': transaction_id,
+            'sender_balance_before': sender_balance_before,
+            'sender_balance_after': sender_balance_after,
+            'receiver_daily_before': receiver_daily_before,
+            'receiver_daily_after': receiver_daily_after,
+            'status': 'SUCCESS'
+        }
+    
+    @traced_api
+    def process_transfers_batch(self, transfers: Iterable[Union[Dict[str, Any], Sequence[Any]]],
+                                batch_size: int = 1000, mode: str = 'all_or_nothing',
+                                on_batch: Optional[Callable[[sqlite3.Connection, List[Dict[str, Any]]], None]] = None
+                                ) -> List[Dict[str, Any]]:
+        """
+        Settle many transfers with one SQLite transaction per batch.
+        
+        Balances and receiver daily limits are checked in memory across the
+        whole batch, so several transfers touching the same account see each
+        other's effects. Account updates are then written with ``executemany``.
+        
+        ``mode='all_or_nothing'`` commits a batch only if every transfer in it
+        is valid; otherwise nothing in that batch is written. ``mode='savepoint'``
+        commits the valid transfers and reports the rejected ones individually.
+        
+        Returns one result per request, in input order. Successful results carry
+        the same fields as ``process_transfer``; failed ones have
+        ``status='FAILED'`` and an ``error`` message. Requests may carry an
+        ``idempotency_key``: keys seen before (or earlier in the same call)
+        replay the original result instead of settling again.
+        
+        Amounts in requests and results are in major units; the batch itself
+        is checked and written in integer minor units.
+        
+        ``on_batch(conn, results)`` is called with each batch's results inside
+        that batch's transaction, just before it commits, so callers can record
+        their own progress atomically with the transfers. A batch aborted in
+        ``all_or_nothing`` mode still commits what ``on_batch`` writes.
+        """
+        if mode not in BATCH_MODES:
+            raise ValueError(f"Unknown batch mode '{mode}'. Expected one of {BATCH_MODES}")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        
+        results: List[Dict[str, Any]] = []
+        batch: List[Any] = []
+        for request in transfers:
+            batch.append(request)
+            if len(batch) >= batch_size:
+                results.extend(self._settle_batch(batch, len(results), mode, on_batch))
+                batch = []
+        if batch:
+            results.extend(self._settle_batch(batch, len(results), mode, on_batch))
+        return results
+    
+    def _settle_batch(self, requests: List[Any], offset: int, mode: str,
+                      on_batch: Optional[Callable[[sqlite3.Connection, List[Dict[str, Any]]], None]] = None
+                      ) -> List[Dict[str, Any]]:
+        """Validate and write one batch of transfers inside a single transaction."""
+        results: List[Dict[str, Any]] = []
+        transfers: List[Optional[Dict[str, Any]]] = []
+        for index, request in enumerate(requests, start=offset):
+            try:
+                transfers.append(_normalize_transfer_request(request))
+                results.append({'index': index})
+            except (TypeError, ValueError) as e:
+                transfers.append(None)
+                results.append({'index': index, 'status': 'FAILED', 'error': str(e)})
+        
+        reservations: Dict[int, Any] = {}
+        try:
+            # Take the write lock up front so the balances read below stay current
+            with self.db_manager.transaction(immediate=True) as conn:
+                senders = {t['sender_account'] for t in transfers if t}
+                balances = self._load_column(conn, 'sender_accounts', 'balance', senders)
+                currencies = self._load_column(conn, 'sender_accounts', 'currency', senders)
+                receivers = self._load_receivers(conn, {t['receiver_account'] for t in transfers if t})
+                
+                stored = self._load_idempotency_keys(
+                    conn, [t['idempotency_key'] for t in transfers if t and t['idempotency_key'] is not None])
+                first_with_key: Dict[str, int] = {}
+                repeats: List[Tuple[int, int]] = []
+                
+                accepted: List[Tuple[int, Dict[str, Any]]] = []
+                for position, transfer in enumerate(transfers):
+                    if transfer is None:
+                        continue
+                    key = transfer['idempotency_key']
+                    try:
+                        if key in stored:
+                            results[position].update(self._replay_result(stored[key], transfer))
+                            continue
+                        if key in first_with_key:
+                            # Answered with the first request's outcome once it is known
+                            self._check_same_transfer(transfers[first_with_key[key]], transfer)
+                            repeats.append((position, first_with_key[key]))
+                            continue
+                        if key is not None:
+                            first_with_key[key] = position
+                        reservation = self._reserve_velocity(transfer['sender_account'], transfer['amount'],
+                                                             transfer['currency'])
+                        try:
+                            accepted.append((position, self._apply_in_memory(transfer, balances, currencies,
+                                                                             receivers)))
+                        except ValueError:
+                            self._release_velocity(reservation)
+                            raise
+                        reservations[position] = reservation
+                    except ValueError as e:
+                        results[position].update({'status': 'FAILED', 'error': str(e)})
+                
+                failed = [r for r in results if r.get('status') == 'FAILED']
+                if mode == 'all_or_nothing' and failed:
+                    first = failed[0]
+                    for result in results:
+                        if 'status' not in result:
+                            result.update({
+                                'status': 'FAILED',
+                                'error': f"Batch aborted: transfer {first['index']} failed: {first['error']}",
+                            })
+                    self._release_velocity(*reservations.values())
+                    reservations.clear()
+                    self._results_in_major_units(transfers, results)
+                    # Nothing has been written, so the transaction commits only what on_batch writes
+                    if on_batch:
+                        on_batch(conn, results)
+                    return results
+                
+                if accepted:
+                    self._write_accepted(conn, accepted, balances, receivers, results, mode)
+                    self._store_idempotency_keys(conn, [
+                        (entry, results[position]) for position, entry in accepted
+                        if entry['idempotency_key'] is not None and results[position]['status'] == 'SUCCESS'
+                    ])
+                self._release_velocity(*(reservations.pop(position) for position, _ in accepted
+                                         if results[position]['status'] == 'FAILED' and position in reservations))
+                for position, first in repeats:
+                    results[position].update({k: v for k, v in results[first].items() if k != 'index'})
+                self._results_in_major_units(transfers, results)
+                if on_batch:
+                    on_batch(conn, results)
+        except BaseException:
+            # Nothing was committed, so no reserved velocity counts either
+            self._release_velocity(*reservations.values())
+            raise
+        
+        self.invalidate_cache([entry['sender_account'] for _, entry in accepted],
+                              [entry['receiver_account'] for _, entry in accepted])
+        return results
+    
+    @staticmethod
+    def _results_in_major_units(transfers: List[Optional[Dict[str, Any]]], results: List[Dict[str, Any]]) -> None:
+        for transfer, result in zip(transfers, results):
+            if transfer is not None:
+                money_to_major_units(result, transfer['currency'])
+    
+    def _write_accepted(self, conn: sqlite3.Connection, accepted: List[Tuple[int, Dict[str, Any]]],
+                        balances: Dict[str, int], receivers: Dict[str, Dict[str, Any]],
+                        results: List[Dict[str, Any]], mode: str) -> None:
+        """Bulk-write the accepted transfers and fill in their results."""
+        entries = [entry for _, entry in accepted]
+        conn.execute('SAVEPOINT batch_write')
+        try:
+            transaction_ids = self._write_batch(conn, entries, balances, receivers)
+            conn.execute('RELEASE SAVEPOINT batch_write')
+        except sqlite3.Error as e:
+            conn.execute('ROLLBACK TO SAVEPOINT batch_write')
+            conn.execute('RELEASE SAVEPOINT batch_write')
+            if mode == 'all_or_nothing':
+                for position, _ in accepted:
+                    results[position].update({'status': 'FAILED', 'error': f"Batch aborted: write failed: {e}"})
+                return
+            # A row violated a constraint: isolate it by replaying each
+            # transfer under its own savepoint
+            self._write_each_with_savepoint(conn, accepted, results)
+            return
+        
+        for transaction_id, (position, entry) in zip(transaction_ids, accepted):
+            results[position].update({
+                'transaction_id': transaction_id,
+                'sender_balance_before': entry['sender_balance_before'],
+                'sender_balance_after': entry['sender_balance_after'],
+                'receiver_daily_before': entry['receiver_daily_before'],
+                'receiver_daily_after': entry['receiver_daily_after'],
+                'status': 'SUCCESS',
+            })
+    
+    def _write_each_with_savepoint(self, conn: sqlite3.Connection,
+                                   accepted: List[Tuple[int, Dict[str, Any]]],
+                                   results: List[Dict[str, Any]]) -> None:
+        """Apply transfers one at a time so a failing row only rolls back itself."""
+        for position, entry in accepted:
+            conn.execute('SAVEPOINT batch_item')
+            try:
+                result = self._transfer_in_connection(
+                    conn, entry['sender_account'], entry['receiver_account'],
+                    entry['amount'], entry['currency'], entry['transaction_reason'])
+                conn.execute('RELEASE SAVEPOINT batch_item')
+                results[position].update(result)
+            except (ValueError, sqlite3.Error) as e:
+                conn.execute('ROLLBACK TO SAVEPOINT batch_item')
+                conn.execute('RELEASE SAVEPOINT batch_item')
+                results[position].update({'status': 'FAILED', 'error': str(e)})
+    
+    @staticmethod
+    def _load_column(conn: sqlite3.Connection, table: str, column: str, accounts: set) -> Dict[str, Any]:
+        values: Dict[str, Any] = {}
+        for chunk in _chunked(sorted(accounts), MAX_IN_PARAMS):
+            placeholders = ','.join('?' * len(chunk))
             cursor = conn.execute(
-                'SELECT daily_limit, daily_received FROM receiver_accounts WHERE account_number = ?',
-                (receiver_account,)
+                f'SELECT account_number, {column} FROM {table} WHERE account_number IN ({placeholders})',
+                chunk
             )
-            receiver_row = cursor.fetchone()
-            if not receiver_row:
-                raise ValueError(f"Receiver account {receiver_account} not found")
-            
-            receiver_daily_before = float(receiver_row['daily_received'])
-            receiver_daily_limit = float(receiver_row['daily_limit'])
-            
-            # Check daily limit
-            if receiver_daily_before + amount > receiver_daily_limit:
-                remaining = receiver_daily_limit - receiver_daily_before
-                raise ValueError(f"Receiver daily limit exceeded. Remaining limit: {remaining}")
-            
-            # Step 3: Update sender balance (Debit)
-            sender_balance_after = sender_balance_before - amount
-            conn.execute(
-                '''UPDATE sender_accounts 
-                   SET balance = ?, 
-                       updated_at = CURRENT_TIMESTAMP
-                   WHERE account_number = ?''',
-                (sender_balance_after, sender_account)
+            values.update((row[0], row[1]) for row in cursor)
+        return values
+    
+    @staticmethod
+    def _load_receivers(conn: sqlite3.Connection, accounts: set) -> Dict[str, Dict[str, Any]]:
+        receivers: Dict[str, Dict[str, Any]] = {}
+        today = date.today().isoformat()
+        for chunk in _chunked(sorted(accounts), MAX_IN_PARAMS):
+            placeholders = ','.join('?' * len(chunk))
+            cursor = conn.execute(
+                f'''SELECT account_number, daily_limit, currency,
+                           CASE WHEN last_reset_date < ? THEN 0 ELSE daily_received END AS daily_received
+                    FROM receiver_accounts WHERE account_number IN ({placeholders})''',
+                [today, *chunk]
             )
-            
-            # Step 4: Update receiver daily received amount (Credit tracking)
-            receiver_daily_after = receiver_daily_before + amount
+            for row in cursor:
+                receivers[row['account_number']] = {
+                    'daily_limit': row['daily_limit'],
+                    'daily_received': row['daily_received'],
+                    'currency': row['currency'],
+                }
+        return receivers
+    
+    @staticmethod
+    def _apply_in_memory(transfer: Dict[str, Any], balances: Dict[str, int], currencies: Dict[str, str],
+                         receivers: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Run process_transfer's checks against in-memory state and apply the transfer."""
+        sender_account = transfer['sender_account']
+        receiver_account = transfer['receiver_account']
+        amount = transfer['amount']
+        
+        if amount <= 0:
+            raise ValueError("Transfer amount must be greater than 0")
+        if sender_account not in balances:
+            raise ValueError(f"Sender account {sender_account} not found")
+        if currencies[sender_account] != transfer['currency']:
+            raise _currency_mismatch(sender_account, currencies[sender_account], transfer['currency'])
+        sender_balance_before = balances[sender_account]
+        if sender_balance_before < amount:
+            raise _insufficient_balance(sender_balance_before, amount, transfer['currency'])
+        
+        receiver = receivers.get(receiver_account)
+        if receiver is None:
+            raise ValueError(f"Receiver account {receiver_account} not found")
+        if receiver['currency'] != transfer['currency']:
+            raise _currency_mismatch(receiver_account, receiver['currency'], transfer['currency'])
+        receiver_daily_before = receiver['daily_received']
+        if receiver_daily_before + amount > receiver['daily_limit']:
+            raise _daily_limit_exceeded(receiver['daily_limit'] - receiver_daily_before, transfer['currency'])
+        
+        balances[sender_account] = sender_balance_before - amount
+        receiver['daily_received'] = receiver_daily_before + amount
+        return dict(transfer,
+                    sender_balance_before=sender_balance_before,
+                    sender_balance_after=balances[sender_account],
+                    receiver_daily_before=receiver_daily_before,
+                    receiver_daily_after=receiver['daily_received'])
+    
+    @staticmethod
+    def _write_batch(conn: sqlite3.Connection, entries: List[Dict[str, Any]],
+                     balances: Dict[str, int], receivers: Dict[str, Dict[str, Any]]) -> List[int]:
+        """Persist final account state once per account and log every transfer.
+        
+        Returns the new transaction ids in entry order. Transfers are inserted
+        one statement at a time so each id is the row's own ``lastrowid``;
+        triggers or other writers may leave gaps between them.
+        """
+        senders = {entry['sender_account'] for entry in entries}
+        credited = {entry['receiver_account'] for entry in entries}
+        today = date.today().isoformat()
+        conn.executemany(
+            '''UPDATE sender_accounts 
+               SET balance = ?, 
+                   updated_at = CURRENT_TIMESTAMP
+               WHERE account_number = ?''',
+            [(balances[account], account) for account in senders]
+        )
+        conn.executemany(
+            '''UPDATE receiver_accounts 
+               SET daily_received = ?,
+                   last_reset_date = ?,
+                   updated_at = CURRENT_TIMESTAMP
+               WHERE account_number = ?''',
+            [(receivers[account]['daily_received'], today, account) for account in credited]
+        )
+        return [
             conn.execute(
-                '''UPDATE receiver_accounts 
-                   SET daily_received = ?,
-                       updated_at = CURRENT_TIMESTAMP
-                   WHERE account_number = ?''',
-                (receiver_daily_after, receiver_account)
-            )
-            
-            # Step 5: Log transaction
-            cursor = conn.execute(
                 '''INSERT INTO transactions 
                    (sender_account, receiver_account, amount, currency, transaction_reason, 
                     status, sender_balance_before, sender_balance_after, 
                     receiver_daily_before, receiver_daily_after)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                (sender_account, receiver_account, amount, currency, transaction_reason,
-                 'SUCCESS', sender_balance_before, sender_balance_after,
-                 receiver_daily_before, receiver_daily_after)
-            )
-            
-            transaction_id = cursor.lastrowid
-            
-            # Return transaction details
-            return {
-                'transaction_id': transaction_id,
-                'sender_balance_before': sender_balance_before,
-                'sender_balance_after': sender_balance_after,
-                'receiver_daily_before': receiver_daily_before,
-                'receiver_daily_after': receiver_daily_after,
-                'status': 'SUCCESS'
-            }
+                   VALUES (?, ?, ?, ?, ?, 'SUCCESS', ?, ?, ?, ?)''',
+                (e['sender_account'], e['receiver_account'], e['amount'], e['currency'],
+                 e['transaction_reason'], e['sender_balance_before'], e['sender_balance_after'],
+                 e['receiver_daily_before'], e['receiver_daily_after'])
+            ).lastrowid
+            for e in entries
+        ]
     
+    @traced_api
     def log_failed_transaction(self, sender_account: str, receiver_account: str, amount: float, 
                                currency: str, reason: str, error_message: str) -> None:
-        """Log failed transaction attempt."""
+        """Log failed transaction attempt (queued when a failure log writer is attached)."""
+        if self.failure_log is not None:
+            self.failure_log.log(sender_account, receiver_account, amount, currency, reason, error_message)
+            return
         try:
             with self.db_manager.transaction() as conn:
                 conn.execute(
@@ -172,34 +698,109 @@ class MoneyTransferDB:
                         transaction_reason, status, sender_balance_before, 
                         sender_balance_after, receiver_daily_before, receiver_daily_after)
                        VALUES (?, ?, ?, ?, ?, ?, 0, 0, 0, 0)''',
-                    (sender_account, receiver_account, amount, currency,
+                    (sender_account, receiver_account, round_to_minor_units(amount, currency), currency,
                      f"FAILED: {error_message}", 'FAILED')
                 )
         except Exception as e:
             print(f"Error logging failed transaction: {e}")
     
-    def get_transaction_history(self, account_number: str, account_type: str = 'sender', limit: int = 10) -> List[Dict[str, Any]]:
-        """Get transaction history for an account."""
-        with self.db_manager.transaction() as conn:
-            if account_type == 'sender':
-                query = '''
-                    SELECT * FROM transactions 
-                    WHERE sender_account = ? 
-                    ORDER BY transaction_timestamp DESC 
-                    LIMIT ?
-                '''
-            else:
-                query = '''
-                    SELECT * FROM transactions 
-                    WHERE receiver_account = ? 
-                    ORDER BY transaction_timestamp DESC 
-                    LIMIT ?
-                '''
-            
-            cursor = conn.execute(query, (account_number, limit))
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+    @traced_api
+    def get_transaction_history(self, account_number: str, account_type: str = 'sender', limit: int = 10,
+                                cursor: Optional[str] = None, start_date: Optional[str] = None,
+                                end_date: Optional[str] = None,
+                                status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get transaction history for an account (newest first)."""
+        return self.get_transaction_history_page(account_number, account_type, limit, cursor,
+                                                 start_date, end_date, status)['transactions']
     
+    @traced_api
+    def get_transaction_history_page(self, account_number: str, account_type: str = 'sender', limit: int = 10,
+                                     cursor: Optional[str] = None, start_date: Optional[str] = None,
+                                     end_date: Optional[str] = None,
+                                     status: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get one page of transaction history using keyset pagination.
+        
+        Pages are ordered by (transaction_timestamp, transaction_id) descending.
+        Pass the returned ``next_cursor`` back in to fetch the following page;
+        it is None on the last page. Each page is an index seek on the
+        per-account history index, so deep pages cost the same as the first.
+        
+        Archived months are read only when the page cannot be filled from
+        the hot table with rows newer than everything archived.
+        """
+        column = 'sender_account' if account_type == 'sender' else 'receiver_account'
+        query = f'SELECT * FROM {{table}} WHERE {column} = ?'
+        params: List[Any] = [account_number]
+        lower, upper = start_date, None
+        
+        if start_date:
+            query += ' AND transaction_timestamp >= ?'
+            params.append(start_date)
+        
+        if end_date:
+            query += " AND transaction_timestamp < DATE(?, '+1 day')"
+            params.append(end_date)
+            upper = (date.fromisoformat(end_date[:10]) + timedelta(days=1)).isoformat()
+        
+        if status:
+            query += ' AND status = ?'
+            params.append(status)
+        
+        if cursor:
+            cursor_timestamp, cursor_id = self._decode_history_cursor(cursor)
+            query += ' AND (transaction_timestamp, transaction_id) < (?, ?)'
+            params.extend([cursor_timestamp, cursor_id])
+            # Keep the partition filter inclusive of the cursor's own second
+            upper = min(upper, cursor_timestamp + '~') if upper else cursor_timestamp + '~'
+        
+        # One row past the page tells us whether another page exists
+        query += ' ORDER BY transaction_timestamp DESC, transaction_id DESC LIMIT ?'
+        params.append(limit + 1)
+        
+        # Not a snapshot: archive months are ATTACHed on demand, which SQLite
+        # refuses inside a transaction; archived rows never change anyway
+        with self.db_manager.read(snapshot=False) as conn:
+            rows = [dict(row) for row in conn.execute(query.format(table='main.transactions'), params).fetchall()]
+            rows = self._merge_archived_history(conn, query, params, rows, limit + 1, lower, upper)
+        has_more = len(rows) > limit
+        rows = [money_to_major_units(row) for row in rows[:limit]]
+        
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = f"{last['transaction_timestamp']}|{last['transaction_id']}"
+        return {'transactions': rows, 'next_cursor': next_cursor}
+    
+    def _merge_archived_history(self, conn: sqlite3.Connection, query: str, params: List[Any],
+                                rows: List[Dict[str, Any]], limit: int, lower: Optional[str],
+                                upper: Optional[str]) -> List[Dict[str, Any]]:
+        """Top up a history page from the archive partitions that can still contribute."""
+        def newest_first(row: Dict[str, Any]) -> Tuple[str, int]:
+            return row['transaction_timestamp'], row['transaction_id']
+        
+        for partition in overlapping_partitions(conn, lower, upper):
+            if len(rows) >= limit and rows[limit - 1]['transaction_timestamp'] > partition['max_timestamp']:
+                break
+            with attached_archive(conn, self.db_manager, partition['file_path']) as alias:
+                archived = [dict(row) for row in
+                            conn.execute(query.format(table=f'{alias}.transactions'), params).fetchall()]
+            # A resumed archive run can briefly leave a row in both places
+            seen = {row['transaction_id'] for row in rows}
+            rows.extend(row for row in archived if row['transaction_id'] not in seen)
+            rows.sort(key=newest_first, reverse=True)
+            del rows[limit:]
+        return rows
+    
+    @staticmethod
+    def _decode_history_cursor(cursor: str) -> Tuple[str, int]:
+        try:
+            timestamp, transaction_id = cursor.rsplit('|', 1)
+            return timestamp, int(transaction_id)
+        except ValueError:
+            raise ValueError(f"Invalid history cursor: {cursor!r}")
+    
+    @traced_api
     def get_account_balance(self, account_number: str) -> Optional[float]:
         """Get current balance for sender account."""
         account = self.get_sender_account(account_number)
@@ -207,57 +808,103 @@ class MoneyTransferDB:
             return float(account['balance'])
         return None
     
+    @traced_api
     def get_all_sender_accounts(self) -> List[Dict[str, Any]]:
         """Get all sender accounts (for admin purposes)."""
-        with self.db_manager.transaction() as conn:
+        with self.db_manager.read() as conn:
             cursor = conn.execute('SELECT * FROM sender_accounts ORDER BY account_number')
             rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+            return [money_to_major_units(dict(row)) for row in rows]
     
+    @traced_api
     def get_all_receiver_accounts(self) -> List[Dict[str, Any]]:
         """Get all receiver accounts (for admin purposes)."""
-        with self.db_manager.transaction() as conn:
+        with self.db_manager.read() as conn:
             cursor = conn.execute('SELECT * FROM receiver_accounts ORDER BY account_number')
             rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+            return [money_to_major_units(dict(row)) for row in rows]
     
+    @traced_api
     def get_daily_transaction_summary(self, date_str: Optional[str] = None) -> Dict[str, Any]:
         """Get transaction summary for a specific date (default: today)."""
         if date_str is None:
             date_str = date.today().isoformat()
         
-        with self.db_manager.transaction() as conn:
-            # Total successful transactions
+        with self.db_manager.read() as conn:
+            # Total successful transactions, served from the daily rollups;
+            # totals are exact integer sums per currency until converted
             cursor = conn.execute(
-                '''SELECT COUNT(*) as count, SUM(amount) as total
-                   FROM transactions 
-                   WHERE DATE(transaction_timestamp) = ? AND status = 'SUCCESS' ''',
+                '''SELECT currency, SUM(transaction_count) as count, SUM(total_amount) as total
+                   FROM daily_transaction_rollups 
+                   WHERE summary_date = ? AND status = 'SUCCESS'
+                   GROUP BY currency''',
                 (date_str,)
             )
-            row = cursor.fetchone()
+            rows = cursor.fetchall()
             
             return {
                 'date': date_str,
-                'total_transactions': row['count'] if row['count'] else 0,
-                'total_amount': float(row['total']) if row['total'] else 0.0
+                'total_transactions': sum(row['count'] for row in rows),
+                'total_amount': sum((from_minor_units(row['total'], row['currency']) for row in rows), 0.0)
             }
     
+    @traced_api
+    def get_transaction_summary_range(self, from_date: str, to_date: str,
+                                      currency: Optional[str] = None,
+                                      status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get per-day, per-currency, per-status counts and totals for a date range."""
+        query = '''SELECT summary_date, currency, status, transaction_count, total_amount
+                   FROM daily_transaction_rollups
+                   WHERE summary_date BETWEEN ? AND ?'''
+        params: List[Any] = [from_date, to_date]
+        if currency:
+            query += ' AND currency = ?'
+            params.append(currency)
+        if status:
+            query += ' AND status = ?'
+            params.append(status)
+        query += ' ORDER BY summary_date, currency, status'
+        
+        with self.db_manager.read() as conn:
+            cursor = conn.execute(query, params)
+            return [
+                {
+                    'date': row['summary_date'],
+                    'currency': row['currency'],
+                    'status': row['status'],
+                    'total_transactions': row['transaction_count'],
+                    'total_amount': from_minor_units(row['total_amount'], row['currency']),
+                }
+                for row in cursor.fetchall()
+            ]
+    
+    @traced_api
+    def rebuild_daily_rollups(self, from_date: Optional[str] = None, to_date: Optional[str] = None) -> int:
+        """Recompute daily rollups from the transactions log; returns rows written."""
+        return self.db_manager.rebuild_daily_rollups(from_date, to_date)
+    
+    @traced_api
     def update_sender_balance(self, account_number: str, new_balance: float) -> bool:
-        """Update sender account balance (admin function)."""
+        """Update sender account balance (admin function; ``new_balance`` in major units)."""
         try:
             with self.db_manager.transaction() as conn:
-                conn.execute(
-                    '''UPDATE sender_accounts 
-                       SET balance = ?, 
-                           updated_at = CURRENT_TIMESTAMP
-                       WHERE account_number = ?''',
-                    (new_balance, account_number)
-                )
-                return True
+                row = conn.execute('SELECT currency FROM sender_accounts WHERE account_number = ?',
+                                   (account_number,)).fetchone()
+                if row:
+                    conn.execute(
+                        '''UPDATE sender_accounts 
+                           SET balance = ?, 
+                               updated_at = CURRENT_TIMESTAMP
+                           WHERE account_number = ?''',
+                        (to_minor_units(new_balance, row['currency']), account_number)
+                    )
+            self.invalidate_cache(sender_accounts=[account_number])
+            return True
         except Exception as e:
             print(f"Error updating balance: {e}")
             return False
     
+    @traced_api
     def reset_receiver_daily_limit(self, account_number: str) -> bool:
         """Manually reset receiver daily limit (admin function)."""
         try:
@@ -270,23 +917,62 @@ class MoneyTransferDB:
                        WHERE account_number = ?''',
                     (date.today().isoformat(), account_number)
                 )
-                return True
+            self.invalidate_cache(receiver_accounts=[account_number])
+            return True
         except Exception as e:
             print(f"Error resetting daily limit: {e}")
             return False
     
+    @traced_api
+    def rollover_daily_limits(self, as_of: Optional[str] = None) -> int:
+        """
+        Reset every receiver whose daily counter is from a previous day.
+        
+        Runs as one set-based UPDATE, suitable for a scheduled off-peak job.
+        Returns the number of rows rolled over.
+        """
+        as_of = as_of or date.today().isoformat()
+        with self.db_manager.transaction() as conn:
+            cursor = conn.execute(
+                '''UPDATE receiver_accounts 
+                   SET daily_received = 0,
+                       last_reset_date = ?,
+                       updated_at = CURRENT_TIMESTAMP
+                   WHERE last_reset_date < ?''',
+                (as_of, as_of)
+            )
+            rolled_over = cursor.rowcount
+        self.receiver_cache.clear()
+        return rolled_over
+    
+    @traced_api
     def get_transaction_by_id(self, transaction_id: int) -> Optional[Dict[str, Any]]:
         """Get specific transaction details by ID."""
-        with self.db_manager.transaction() as conn:
+        with self.db_manager.read(snapshot=False) as conn:
             cursor = conn.execute(
                 'SELECT * FROM transactions WHERE transaction_id = ?',
                 (transaction_id,)
             )
             row = cursor.fetchone()
             if row:
-                return dict(row)
+                return money_to_major_units(dict(row))
+            
+            partitions = conn.execute(
+                '''SELECT file_path FROM archive_partitions
+                   WHERE ? BETWEEN min_transaction_id AND max_transaction_id''',
+                (transaction_id,)
+            ).fetchall()
+            for partition in partitions:
+                with attached_archive(conn, self.db_manager, partition['file_path']) as alias:
+                    row = conn.execute(
+                        f'SELECT * FROM {alias}.transactions WHERE transaction_id = ?',
+                        (transaction_id,)
+                    ).fetchone()
+                if row:
+                    return money_to_major_units(dict(row))
             return None
     
+    @traced_api
     def search_transactions(self, 
                           sender_account: Optional[str] = None,
                           receiver_account: Optional[str] = None,
@@ -321,7 +1007,7 @@ class MoneyTransferDB:
         query += ' ORDER BY transaction_timestamp DESC LIMIT ?'
         params.append(limit)
         
-        with self.db_manager.transaction() as conn:
+        with self.db_manager.read() as conn:
             cursor = conn.execute(query, params)
             rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+            return [money_to_major_units(dict(row)) for row in rows]
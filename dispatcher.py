@@ -0,0 +1,405 @@
+import argparse
+import json
+import multiprocessing
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import wait as wait_for_connections
+from typing import Optional, Dict, Any, List, Tuple
+from bulk_load import read_records, infer_format
+from main_db import validate_transfer_instruction
+from sharding import shard_index
+
+# Items sent to workers: (request_id, kind, payload). A 'transfer' payload is
+# a process_transfers_batch request; an 'instruction' payload is a raw
+# transfer-file record that the worker validates first (see main_db.py).
+TRANSFER, INSTRUCTION = 'transfer', 'instruction'
+
+# Every worker writes the same SQLite file, so a batch can find the write lock
+# taken for longer than the connection's busy timeout. Such a batch committed
+# nothing and is retried this many times, backing off from the base delay.
+LOCK_RETRIES = 5
+LOCK_RETRY_DELAY = 0.05
+
+
+def _is_lock_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+
+def _settle_batch(transfer_db, transfers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Settle transfers in one savepoint-mode batch, retrying while the database is locked."""
+    for attempt in range(LOCK_RETRIES + 1):
+        try:
+            return transfer_db.process_transfers_batch(transfers, batch_size=len(transfers), mode='savepoint')
+        except sqlite3.OperationalError as e:
+            if not _is_lock_error(e) or attempt == LOCK_RETRIES:
+                raise
+            time.sleep(LOCK_RETRY_DELAY * 2 ** attempt)
+
+
+def _settle_items(transfer_db, items: List[Tuple[int, str, Dict[str, Any]]], log_failures: bool
+                  ) -> List[Tuple[int, Any]]:
+    """
+    Validate and settle one batch in a worker; returns (request_id, result) pairs in order.
+
+    Rejected transfers get FAILED results. If the batch itself cannot be
+    written (an I/O error, or a lock that outlasts the retries), each of its
+    requests gets the exception instead, since nothing about the transfer
+    was wrong.
+    """
+    outcomes: Dict[int, Any] = {}
+    transfers: List[Tuple[int, Dict[str, Any]]] = []
+    for request_id, kind, payload in items:
+        if kind == INSTRUCTION:
+            try:
+                transfers.append((request_id, validate_transfer_instruction(payload, transfer_db)))
+            except (ValueError, AttributeError) as e:
+                outcomes[request_id] = {'status': 'FAILED', 'error': str(e)}
+        else:
+            transfers.append((request_id, payload))
+
+    if transfers:
+        try:
+            results = _settle_batch(transfer_db, [t for _, t in transfers])
+        except (ValueError, sqlite3.IntegrityError) as e:
+            results = [{'status': 'FAILED', 'error': str(e)} for _ in transfers]
+        except Exception as e:
+            for request_id, _ in transfers:
+                outcomes[request_id] = e
+            return [(request_id, outcomes[request_id]) for request_id, _, _ in items]
+        for (request_id, transfer), result in zip(transfers, results):
+            result.pop('index', None)
+            outcomes[request_id] = result
+            if log_failures and result['status'] != 'SUCCESS':
+                transfer_db.log_failed_transaction(
+                    transfer.get('sender_account'), transfer.get('receiver_account'), transfer.get('amount'),
+                    transfer.get('currency'), transfer.get('transaction_reason') or "", result['error'])
+    return [(request_id, outcomes[request_id]) for request_id, _, _ in items]
+
+
+def _worker_main(db_path: str, requests, results, max_batch_size: int, max_wait: float,
+                 log_failures: bool, db_options: Dict[str, Any]) -> None:
+    """Worker process: settle the requests routed to it, in arrival order, a batch at a time."""
+    from database import DatabaseManager
+    from db_operations import MoneyTransferDB
+    from failure_log import FailureLogWriter
+
+    transfer_db = MoneyTransferDB(DatabaseManager(db_path, pool_size=2), **db_options)
+    if log_failures:
+        transfer_db.failure_log = FailureLogWriter(transfer_db.db_manager).start()
+    stopping = False
+    try:
+        while not stopping:
+            message = requests.recv()
+            if message is None:
+                break
+            batch = list(message)
+            deadline = time.monotonic() + max_wait
+            while len(batch) < max_batch_size:
+                if not requests.poll(max(deadline - time.monotonic(), 0)):
+                    break
+                message = requests.recv()
+                if message is None:
+                    stopping = True
+                    break
+                batch.extend(message)
+            results.send(_settle_items(transfer_db, batch, log_failures))
+    finally:
+        if transfer_db.failure_log is not None:
+            transfer_db.failure_log.stop()
+        transfer_db.db_manager.close()
+        results.close()
+
+
+class TransferDispatcher:
+    """
+    Routes transfers to worker processes by sender account.
+
+    Every sender hashes to one worker, which settles its requests strictly in
+    submission order with ``process_transfers_batch`` (savepoint mode), so one
+    account's transfers never reorder or race while other accounts run in
+    parallel on other cores. ``submit()`` returns a Future resolving to the
+    transfer's result dict (``status`` is ``'SUCCESS'`` or ``'FAILED'`` with an
+    ``error``), as in a batch result. A batch the worker could not write at
+    all, after retrying while the database was locked, raises its error from
+    the Future instead.
+
+    Requests travel to workers in small pickled batches over pipes, and each
+    worker batch returns its results in one message. At most
+    ``max_in_flight`` requests are outstanding; ``submit()`` blocks beyond
+    that. ``drain()`` waits for everything submitted; ``stop()`` drains and
+    shuts the workers down.
+    """
+
+    def __init__(self, db_path: str = 'money_transfer.db', workers: Optional[int] = None,
+                 max_batch_size: int = 500, max_wait_ms: float = 2.0, max_in_flight: int = 10000,
+                 log_failures: bool = False, **db_options: Any):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.db_path = db_path
+        self.workers = workers or multiprocessing.cpu_count()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.log_failures = log_failures
+        self.db_options = db_options
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._next_id = 0
+        self._pending: Dict[int, Tuple[Future, int]] = {}
+        self._outboxes: List[List[Tuple[int, str, Dict[str, Any]]]] = []
+        self._senders: List[Any] = []
+        self._send_locks: List[threading.Lock] = []
+        self._processes: List[Any] = []
+        self._flusher: Optional[threading.Thread] = None
+        self._collector: Optional[threading.Thread] = None
+        self._running = False
+        self._stats = {'submitted': 0, 'succeeded': 0, 'failed': 0, 'errors': 0, 'batches': 0,
+                       'max_batch_size': 0}
+
+    def start(self) -> 'TransferDispatcher':
+        """Spawn the worker processes (idempotent)."""
+        if self._running:
+            return self
+        context = multiprocessing.get_context('spawn')
+        receivers = []
+        for index in range(self.workers):
+            request_reader, request_writer = context.Pipe(duplex=False)
+            result_reader, result_writer = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_worker_main, name=f'transfer-worker-{index}', daemon=True,
+                args=(self.db_path, request_reader, result_writer, self.max_batch_size, self.max_wait,
+                      self.log_failures, self.db_options))
+            process.start()
+            request_reader.close()
+            result_writer.close()
+            self._processes.append(process)
+            self._senders.append(request_writer)
+            self._outboxes.append([])
+            self._send_locks.append(threading.Lock())
+            receivers.append(result_reader)
+        self._running = True
+        self._collector = threading.Thread(target=self._collect, args=(receivers,),
+                                           name='transfer-dispatcher-results', daemon=True)
+        self._collector.start()
+        self._flusher = threading.Thread(target=self._flush_periodically, name='transfer-dispatcher-flush',
+                                         daemon=True)
+        self._flusher.start()
+        return self
+
+    def __enter__(self) -> 'TransferDispatcher':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def submit(self, sender_account: str, receiver_account: str, amount: float, currency: str,
+               contact_info: str = '', transaction_reason: Optional[str] = None,
+               idempotency_key: Optional[str] = None) -> Future:
+        """Queue a transfer on its sender's worker; arguments match process_transfer."""
+        return self._submit(sender_account, TRANSFER, {
+            'sender_account': sender_account, 'receiver_account': receiver_account, 'amount': amount,
+            'currency': currency, 'contact_info': contact_info, 'transaction_reason': transaction_reason,
+            'idempotency_key': idempotency_key,
+        })
+
+    def submit_instruction(self, record: Dict[str, Any]) -> Future:
+        """Queue a transfer-file instruction; the worker runs steps 1-8 on it before settling."""
+        return self._submit(str(record.get('sender') or '').strip(), INSTRUCTION, record)
+
+    def _submit(self, sender_account: str, kind: str, payload: Dict[str, Any]) -> Future:
+        if not self._running:
+            raise RuntimeError("TransferDispatcher is not running; call start() first")
+        self._slots.acquire()
+        future: Future = Future()
+        worker = shard_index(sender_account, self.workers)
+        # The send lock keeps one worker's requests in submission order; the
+        # shared lock is never held across a pipe write, so the result
+        # collector cannot be stalled behind a full request pipe
+        with self._send_locks[worker]:
+            with self._lock:
+                request_id = self._next_id
+                self._next_id += 1
+                self._pending[request_id] = (future, worker)
+                self._stats['submitted'] += 1
+                self._outboxes[worker].append((request_id, kind, payload))
+                ready = len(self._outboxes[worker]) >= self.max_batch_size
+            if ready:
+                self._send(worker)
+        return future
+
+    def _send(self, worker: int) -> None:
+        """Ship a worker's outbox (caller holds that worker's send lock)."""
+        with self._lock:
+            outbox, self._outboxes[worker] = self._outboxes[worker], []
+        if not outbox:
+            return
+        try:
+            self._senders[worker].send(outbox)
+        except (OSError, ValueError) as e:
+            # The worker is gone; its requests were never delivered
+            self._fail([request_id for request_id, _, _ in outbox],
+                       RuntimeError(f"Transfer worker {worker} is not accepting requests: {e}"))
+
+    def flush(self) -> None:
+        """Send every queued request to its worker now."""
+        for worker in range(self.workers):
+            with self._send_locks[worker]:
+                self._send(worker)
+
+    def _flush_periodically(self) -> None:
+        while self._running:
+            time.sleep(self.max_wait or 0.001)
+            try:
+                self.flush()
+            except (OSError, ValueError):
+                return
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every submitted transfer has a result; returns False on timeout."""
+        self.flush()
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Finish everything submitted, then stop the workers."""
+        if not self._running:
+            return
+        self.drain(timeout)
+        self._running = False
+        for send_lock, sender in zip(self._send_locks, self._senders):
+            with send_lock:
+                try:
+                    sender.send(None)
+                except (OSError, ValueError):
+                    pass  # the worker already exited
+                sender.close()
+        for process in self._processes:
+            process.join(timeout)
+        self._collector.join(timeout)
+        self._flusher.join(timeout)
+        self._processes, self._senders, self._outboxes, self._send_locks = [], [], [], []
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return request, batch and in-flight counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._pending)
+        stats['avg_batch_size'] = ((stats['succeeded'] + stats['failed'] + stats['errors']) / stats['batches']
+                                   if stats['batches'] else 0.0)
+        return stats
+
+    def _collect(self, receivers: List[Any]) -> None:
+        workers = {receiver: index for index, receiver in enumerate(receivers)}
+        while workers:
+            for receiver in wait_for_connections(list(workers)):
+                try:
+                    outcomes = receiver.recv()
+                except EOFError:
+                    self._fail_worker(workers.pop(receiver))
+                    continue
+                self._resolve(outcomes)
+
+    def _resolve(self, outcomes: List[Tuple[int, Any]]) -> None:
+        with self._lock:
+            futures = [(self._pending.pop(request_id)[0], result) for request_id, result in outcomes]
+            self._stats['batches'] += 1
+            self._stats['max_batch_size'] = max(self._stats['max_batch_size'], len(outcomes))
+            for _, result in futures:
+                if isinstance(result, BaseException):
+                    self._stats['errors'] += 1
+                else:
+                    self._stats['succeeded' if result['status'] == 'SUCCESS' else 'failed'] += 1
+            if not self._pending:
+                self._idle.notify_all()
+        for future, result in futures:
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+            self._slots.release()
+
+    def _fail_worker(self, worker: int) -> None:
+        """A worker exited: anything it still owed will never be answered."""
+        with self._lock:
+            lost = [request_id for request_id, (_, owner) in self._pending.items() if owner == worker]
+        self._fail(lost, RuntimeError(f"Transfer worker {worker} exited before answering"))
+
+    def _fail(self, request_ids: List[int], error: Exception) -> None:
+        """Fail the futures of requests that will never get a result, freeing their slots."""
+        with self._lock:
+            futures = [self._pending.pop(request_id)[0] for request_id in request_ids if request_id in self._pending]
+            if not self._pending:
+                self._idle.notify_all()
+        for future in futures:
+            future.set_exception(error)
+            self._slots.release()
+
+
+def dispatch_transfer_file(input_path: str, output_path: str, db_path: str = 'money_transfer.db',
+                           workers: Optional[int] = None, max_batch_size: int = 500,
+                           max_in_flight: int = 10000) -> Dict[str, Any]:
+    """
+    Settle a transfer instruction file across worker processes.
+
+    The file format and result lines match ``main_db.process_transfer_file``,
+    and results are written in input order. Failed attempts are logged. The
+    run is not checkpointed; use ``main_db.py --file`` when a crashed run must
+    resume exactly where it stopped.
+    """
+    start = time.perf_counter()
+    counters = {'lines_done': 0, 'succeeded': 0, 'failed': 0}
+    in_order: "deque[Tuple[int, Future]]" = deque()
+
+    def write_ready(out, block: bool = False) -> None:
+        while in_order and (block or in_order[0][1].done()):
+            line_number, future = in_order.popleft()
+            result = dict(future.result(), line=line_number)
+            counters['lines_done'] = line_number
+            counters['succeeded' if result['status'] == 'SUCCESS' else 'failed'] += 1
+            out.write(json.dumps(result) + '\n')
+
+    with TransferDispatcher(db_path, workers, max_batch_size, max_in_flight=max_in_flight,
+                            log_failures=True) as dispatcher, \
+            open(output_path, 'w', encoding='utf-8') as out:
+        for line_number, record in enumerate(read_records(input_path, infer_format(input_path)), start=1):
+            try:
+                if isinstance(record, str):
+                    record = json.loads(record)
+                future = dispatcher.submit_instruction(record)
+            except (ValueError, AttributeError) as e:
+                future = Future()
+                future.set_result({'status': 'FAILED', 'error': str(e)})
+            in_order.append((line_number, future))
+            write_ready(out)
+        dispatcher.drain()
+        write_ready(out, block=True)
+        metrics = dispatcher.metrics()
+
+    elapsed = time.perf_counter() - start
+    return dict(counters, workers=dispatcher.workers, avg_batch_size=metrics['avg_batch_size'],
+                elapsed_sec=elapsed, lines_per_sec=counters['lines_done'] / elapsed if elapsed > 0 else 0.0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Settle a transfer file across worker processes, "
+                                                 "keeping each sender's transfers in order.")
+    parser.add_argument('--file', required=True, help="CSV/JSONL transfer instructions (as for main_db.py --file)")
+    parser.add_argument('--output', default=None, help="Result file (default: <file>.results.jsonl)")
+    parser.add_argument('--db', default='money_transfer.db', help="Path to the SQLite database")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--batch-size', type=int, default=500, help="Most transfers a worker settles per transaction")
+    args = parser.parse_args()
+
+    output_path = args.output or args.file + '.results.jsonl'
+    report = dispatch_transfer_file(args.file, output_path, args.db, args.workers, args.batch_size)
+    print(f"✅ Processed {report['lines_done']} line(s) on {report['workers']} worker(s): "
+          f"{report['succeeded']} succeeded, {report['failed']} failed "
+          f"({report['lines_per_sec']:.0f} lines/sec). Results: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
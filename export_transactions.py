@@ -0,0 +1,132 @@
+import argparse
+import csv
+import gzip
+import io
+import json
+import sys
+from typing import Optional, Any, List, IO
+from database import DatabaseManager, MONEY_COLUMNS, from_minor_units
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+
+def _build_export_query(start_date: Optional[str], end_date: Optional[str],
+                        account: Optional[str], status: Optional[str]):
+    query = 'SELECT * FROM transactions WHERE 1=1'
+    params: List[Any] = []
+
+    if start_date:
+        query += ' AND transaction_timestamp >= ?'
+        params.append(start_date)
+
+    if end_date:
+        query += " AND transaction_timestamp < DATE(?, '+1 day')"
+        params.append(end_date)
+
+    if account:
+        query += ' AND (sender_account = ? OR receiver_account = ?)'
+        params.extend([account, account])
+
+    if status:
+        query += ' AND status = ?'
+        params.append(status)
+
+    query += ' ORDER BY transaction_id'
+    return query, params
+
+
+def export_transactions(db_manager: DatabaseManager, output: IO[str], fmt: str = 'csv',
+                        start_date: Optional[str] = None, end_date: Optional[str] = None,
+                        account: Optional[str] = None, status: Optional[str] = None,
+                        chunk_size: int = 5000) -> int:
+    """
+    Stream matching transactions to a text stream as CSV or JSON Lines.
+
+    Rows are pulled from the cursor ``chunk_size`` at a time and written
+    straight out, so memory use does not grow with the size of the ledger.
+    The export reads one snapshot on the read-only lane, so transfers keep
+    committing while it runs. Money is written in major units.
+    Returns the number of rows written.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'. Expected one of {EXPORT_FORMATS}")
+
+    query, params = _build_export_query(start_date, end_date, account, status)
+    exported = 0
+    with db_manager.read() as conn:
+        cursor = conn.execute(query, params)
+        columns = [description[0] for description in cursor.description]
+        money = [index for index, column in enumerate(columns) if column in MONEY_COLUMNS]
+        currency = columns.index('currency')
+
+        def major_units(row) -> list:
+            values = list(row)
+            for index in money:
+                values[index] = from_minor_units(values[index], values[currency])
+            return values
+
+        writer = csv.writer(output) if fmt == 'csv' else None
+        if writer:
+            writer.writerow(columns)
+
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            if writer:
+                writer.writerows(major_units(row) for row in rows)
+            else:
+                output.writelines(json.dumps(dict(zip(columns, major_units(row)))) + '\n' for row in rows)
+            exported += len(rows)
+    return exported
+
+
+def export_to_path(db_manager: DatabaseManager, path: str, fmt: Optional[str] = None,
+                   compress: Optional[bool] = None, **filters: Any) -> int:
+    """Export to a file (or '-' for stdout), gzip-compressing if asked or if path ends in .gz."""
+    if compress is None:
+        compress = path.endswith('.gz')
+    if fmt is None:
+        stem = path[:-3] if path.endswith('.gz') else path
+        fmt = 'jsonl' if stem.endswith(('.jsonl', '.json')) else 'csv'
+
+    if path == '-':
+        if compress:
+            stream = io.TextIOWrapper(gzip.GzipFile(fileobj=sys.stdout.buffer, mode='wb'),
+                                      encoding='utf-8', newline='')
+            try:
+                return export_transactions(db_manager, stream, fmt, **filters)
+            finally:
+                stream.close()
+        return export_transactions(db_manager, sys.stdout, fmt, **filters)
+
+    opener = gzip.open if compress else open
+    with opener(path, 'wt', encoding='utf-8', newline='') as stream:
+        return export_transactions(db_manager, stream, fmt, **filters)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stream the transactions table to CSV or JSON Lines.")
+    parser.add_argument('output', help="Output file path, or '-' for stdout (.gz enables compression)")
+    parser.add_argument('--db', default='money_transfer.db', help="Path to the SQLite database")
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default=None,
+                        help="Output format (default: inferred from the file name, else csv)")
+    parser.add_argument('--gzip', action='store_true', default=None, help="Gzip-compress the output")
+    parser.add_argument('--from-date', default=None, help="First day to include (YYYY-MM-DD)")
+    parser.add_argument('--to-date', default=None, help="Last day to include (YYYY-MM-DD)")
+    parser.add_argument('--account', default=None, help="Only transactions sent or received by this account")
+    parser.add_argument('--status', default=None, help="Only transactions with this status (SUCCESS/FAILED)")
+    parser.add_argument('--chunk-size', type=int, default=5000, help="Rows fetched per round trip")
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager(args.db)
+    exported = export_to_path(db_manager, args.output, args.format, args.gzip,
+                              start_date=args.from_date, end_date=args.to_date,
+                              account=args.account, status=args.status, chunk_size=args.chunk_size)
+    db_manager.close()
+    if args.output != '-':
+        print(f"✅ Exported {exported} transaction(s) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
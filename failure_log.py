@@ -0,0 +1,278 @@
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Tuple
+from database import DatabaseManager, round_to_minor_units
+
+OVERFLOW_POLICIES = ('block', 'drop', 'spill')
+
+FAILED_TRANSACTION_INSERT = '''
+    INSERT INTO transactions
+    (sender_account, receiver_account, amount, currency,
+     transaction_reason, status, sender_balance_before,
+     sender_balance_after, receiver_daily_before, receiver_daily_after,
+     transaction_timestamp)
+    VALUES (?, ?, ?, ?, ?, 'FAILED', 0, 0, 0, 0, ?)
+'''
+
+_STOP = object()
+
+
+class _Flush:
+    __slots__ = ('done',)
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+
+
+class FailureLogWriter:
+    """
+    Buffers failed-attempt records and writes them in batches off the caller's thread.
+
+    While the writer runs, ``log()`` only enqueues; a background thread
+    inserts what has queued up once ``max_batch_size`` records are waiting or
+    ``flush_interval`` seconds after the first one arrived, in a single
+    transaction. Before ``start()`` and after ``stop()`` records are written
+    inline instead. Each record keeps the time it was logged, not the time it
+    was flushed.
+
+    When the queue is full the ``overflow`` policy applies: ``'block'`` waits
+    for room, ``'drop'`` discards the record and counts it, and ``'spill'``
+    appends it to ``spill_path``; spilled records are written to the database
+    when the writer starts and when it stops. ``stop()`` (also registered with
+    atexit) writes everything still queued before returning.
+
+    A record the table refuses (an unknown account, an amount <= 0) is
+    dropped and counted as ``rejected``; the rest of its batch is written.
+    Other write errors are counted in ``write_errors``, with the latest
+    message in ``last_error``.
+    """
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None, max_batch_size: int = 500,
+                 flush_interval: float = 1.0, max_queue_size: int = 10000, overflow: str = 'block',
+                 spill_path: str = 'failed_transactions.spill.jsonl'):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow}'. Expected one of {OVERFLOW_POLICIES}")
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.db_manager = db_manager or DatabaseManager()
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.spill_path = spill_path
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        # True from start() until the writer thread takes the stop sentinel
+        self._accepting = False
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._stats = {
+            'logged': 0,
+            'written': 0,
+            'batches': 0,
+            'dropped': 0,
+            'spilled': 0,
+            'replayed': 0,
+            'rejected': 0,
+            'write_errors': 0,
+            'last_error': None,
+            'max_queue_depth': 0,
+        }
+
+    def start(self) -> 'FailureLogWriter':
+        """Start the writer thread (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='failure-log-writer', daemon=True)
+            self._accepting = True
+            self._thread.start()
+            atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Write everything already queued (and any spill file), then stop the writer thread."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            atexit.unregister(self.stop)
+
+    def __enter__(self) -> 'FailureLogWriter':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def log(self, sender_account: str, receiver_account: str, amount: float,
+            currency: str, reason: str, error_message: str) -> None:
+        """Queue one failed attempt; arguments match MoneyTransferDB.log_failed_transaction."""
+        record = (sender_account, receiver_account, round_to_minor_units(amount, currency), currency,
+                  f"FAILED: {error_message}", datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'))
+        try:
+            if self.overflow == 'block':
+                # Wait for room only while a thread is there to make it
+                while True:
+                    if not self._running():
+                        self._write_inline(record)
+                        return
+                    try:
+                        self._queue.put(record, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+            elif not self._running():
+                self._write_inline(record)
+                return
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            if self.overflow == 'drop':
+                with self._lock:
+                    self._stats['dropped'] += 1
+                return
+            self._spill([record])
+            with self._lock:
+                self._stats['spilled'] += 1
+            return
+        with self._lock:
+            self._stats['logged'] += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._queue.qsize())
+        if not self._running():
+            # The writer stopped after the check above; it may never see this record
+            self._drain()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued before this call has been written."""
+        if self._thread is None or not self._thread.is_alive():
+            raise RuntimeError("FailureLogWriter is not running; call start() first")
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return queue depth, batch and overflow counters."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        return stats
+
+    def _running(self) -> bool:
+        return self._accepting and self._thread is not None and self._thread.is_alive()
+
+    def _write_inline(self, record: Tuple[Any, ...]) -> None:
+        with self._lock:
+            self._stats['logged'] += 1
+        self._write([record])
+
+    def _drain(self) -> None:
+        """Write whatever is left in the queue once the writer thread no longer reads it."""
+        batch: List[Tuple[Any, ...]] = []
+        markers: List[_Flush] = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, _Flush):
+                markers.append(item)
+            elif item is not _STOP:
+                batch.append(item)
+        for start in range(0, len(batch), self.max_batch_size):
+            self._write(batch[start:start + self.max_batch_size])
+        for marker in markers:
+            marker.done.set()
+
+    def _run(self) -> None:
+        self._replay_spill()
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                self._accepting = False
+                break
+            batch: List[Tuple[Any, ...]] = []
+            markers: List[_Flush] = []
+            (markers if isinstance(item, _Flush) else batch).append(item)
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch_size and not markers:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._accepting = False
+                    stopping = True
+                    break
+                (markers if isinstance(item, _Flush) else batch).append(item)
+            self._write(batch)
+            for marker in markers:
+                marker.done.set()
+        self._drain()
+        self._replay_spill()
+
+    def _write(self, batch: List[Tuple[Any, ...]], replayed: bool = False) -> bool:
+        if not batch:
+            return True
+        written = len(batch)
+        try:
+            try:
+                with self.db_manager.transaction() as conn:
+                    conn.executemany(FAILED_TRANSACTION_INSERT, batch)
+            except sqlite3.IntegrityError:
+                # One record the table refuses fails the whole statement;
+                # write the others one by one
+                written = self._write_each(batch)
+        except Exception as e:
+            with self._lock:
+                self._stats['write_errors'] += 1
+                self._stats['last_error'] = str(e)
+            if self.overflow == 'spill' and not replayed:
+                self._spill(batch)
+            return False
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['rejected'] += len(batch) - written
+            self._stats['replayed' if replayed else 'written'] += written
+        return True
+
+    def _write_each(self, batch: List[Tuple[Any, ...]]) -> int:
+        """Insert records one savepoint at a time, dropping those that break a constraint; returns rows written."""
+        written = 0
+        with self.db_manager.transaction() as conn:
+            for record in batch:
+                conn.execute('SAVEPOINT failure_record')
+                try:
+                    conn.execute(FAILED_TRANSACTION_INSERT, record)
+                    written += 1
+                except sqlite3.IntegrityError:
+                    conn.execute('ROLLBACK TO SAVEPOINT failure_record')
+                finally:
+                    conn.execute('RELEASE SAVEPOINT failure_record')
+        return written
+
+    def _spill(self, records: List[Tuple[Any, ...]]) -> None:
+        with self._spill_lock:
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(record) + '\n' for record in records)
+
+    def _replay_spill(self) -> None:
+        """Move spilled records into the database; the file is removed only once they are written."""
+        replay_path = self.spill_path + '.replay'
+        with self._spill_lock:
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spill_path):
+                    return
+                os.replace(self.spill_path, replay_path)
+        with open(replay_path, encoding='utf-8') as f:
+            records = [tuple(json.loads(line)) for line in f if line.strip()]
+        for start in range(0, len(records), self.max_batch_size):
+            if not self._write(records[start:start + self.max_batch_size], replayed=True):
+                # Keep only what is still unwritten for the next attempt
+                with open(replay_path, 'w', encoding='utf-8') as f:
+                    f.writelines(json.dumps(record) + '\n' for record in records[start:])
+                return
+        os.remove(replay_path)
@@ -0,0 +1,164 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional, Dict, Any, List, Tuple
+from db_operations import MoneyTransferDB
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """
+    Funnels transfers from many threads through one writer thread.
+
+    Callers ``submit()`` a transfer and get a Future back. The writer drains
+    the queue, applies up to ``max_batch_size`` transfers (or whatever arrived
+    within ``max_wait_ms``) in a single transaction with a savepoint around each
+    transfer, commits once, and then resolves every Future in the batch.
+    Results and error messages match ``MoneyTransferDB.process_transfer``.
+    """
+
+    def __init__(self, transfer_db: Optional[MoneyTransferDB] = None, max_batch_size: int = 100,
+                 max_wait_ms: float = 5.0, max_queue_size: int = 10000):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.transfer_db = transfer_db or MoneyTransferDB()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # Orders submits against stop(), so nothing is queued behind _STOP. Kept
+        # apart from _lock, which the writer needs while a full queue blocks put()
+        self._submit_lock = threading.Lock()
+        self._stopped = False
+        self._stats = {
+            'submitted': 0,
+            'committed': 0,
+            'failed': 0,
+            'batches': 0,
+            'max_batch_size': 0,
+            'max_queue_depth': 0,
+        }
+
+    def start(self) -> 'GroupCommitWriter':
+        """Start the writer thread (idempotent)."""
+        with self._submit_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped = False
+                self._thread = threading.Thread(target=self._run, name='group-commit-writer', daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Process everything already queued, then stop the writer thread; later submits fail."""
+        with self._submit_lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                return
+            if not self._stopped:
+                self._stopped = True
+                self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def __enter__(self) -> 'GroupCommitWriter':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def submit(self, sender_account: str, receiver_account: str, amount: float,
+               currency: str, contact_info: str, transaction_reason: Optional[str] = None,
+               idempotency_key: Optional[str] = None) -> Future:
+        """Queue a transfer; the returned Future resolves to the process_transfer result."""
+        future: Future = Future()
+        with self._submit_lock:
+            if self._stopped:
+                raise RuntimeError("GroupCommitWriter has been stopped")
+            if self._thread is None or not self._thread.is_alive():
+                raise RuntimeError("GroupCommitWriter is not running; call start() first")
+            self._queue.put((future, (sender_account, receiver_account, amount, currency, transaction_reason,
+                                      idempotency_key)))
+        with self._lock:
+            self._stats['submitted'] += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._queue.qsize())
+        return future
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return queue depth and batch-size metrics."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['avg_batch_size'] = (
+            (stats['committed'] + stats['failed']) / stats['batches'] if stats['batches'] else 0.0
+        )
+        return stats
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._commit_batch(batch)
+            except Exception as e:
+                # Keep the writer alive, and leave no Future of the batch unresolved
+                for future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _commit_batch(self, batch: List[Tuple[Future, Tuple[Any, ...]]]) -> None:
+        """Apply a batch under per-transfer savepoints and commit it once."""
+        outcomes: List[Tuple[Future, bool, Any]] = []
+        reservations: List[Any] = []
+        try:
+            with self.transfer_db.db_manager.transaction(immediate=True) as conn:
+                for future, args in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    conn.execute('SAVEPOINT group_item')
+                    try:
+                        result = self.transfer_db._transfer_idempotent(conn, *args, reservations=reservations)
+                        conn.execute('RELEASE SAVEPOINT group_item')
+                        outcomes.append((future, True, result))
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO SAVEPOINT group_item')
+                        conn.execute('RELEASE SAVEPOINT group_item')
+                        outcomes.append((future, False, e))
+        except Exception as e:
+            # The commit itself failed, so none of the batch was persisted or
+            # counts against the senders' velocity limits
+            self.transfer_db._release_velocity(*reservations)
+            outcomes = [(future, False, e) for future, _ in batch if future.running()]
+
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['max_batch_size'] = max(self._stats['max_batch_size'], len(batch))
+            self._stats['committed'] += sum(1 for _, ok, _ in outcomes if ok)
+            self._stats['failed'] += sum(1 for _, ok, _ in outcomes if not ok)
+
+        committed = [future for future, ok, _ in outcomes if ok]
+        if committed:
+            args_by_future = dict(batch)
+            self.transfer_db.invalidate_cache([args_by_future[f][0] for f in committed],
+                                              [args_by_future[f][1] for f in committed])
+
+        for future, ok, value in outcomes:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
@@ -0,0 +1,298 @@
+import contextvars
+import functools
+import json
+import re
+import threading
+import time
+from typing import Optional, Dict, Any, Callable, List
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1.0, 5.0, 10.0, 50.0, 100.0, 500.0, float('inf'))
+
+_current_api: contextvars.ContextVar = contextvars.ContextVar('current_api', default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace, replace literals with ? and fold IN (?, ?, ...) lists."""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+def current_api() -> Optional[str]:
+    """Name of the MoneyTransferDB API currently executing on this thread/task."""
+    return _current_api.get()
+
+
+def traced_api(func: Callable) -> Callable:
+    """
+    Tag a MoneyTransferDB method so its statements are attributed to it.
+
+    The outermost tagged call wins, so ``check_sufficient_balance`` keeps its
+    own name even though it calls ``get_sender_account``. When the manager
+    has no instrumentation this adds a single attribute check.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        instrumentation = self.db_manager.instrumentation
+        if instrumentation is None or _current_api.get() is not None:
+            return func(self, *args, **kwargs)
+        token = _current_api.set(name)
+        start = time.perf_counter()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            instrumentation.record_api(name, time.perf_counter() - start)
+            _current_api.reset(token)
+    return wrapper
+
+
+class Collector:
+    """Base class for instrumentation sinks. Durations are in seconds."""
+
+    def record_statement(self, sql: str, duration: float, rows: int, api: Optional[str]) -> None:
+        pass
+
+    def record_rows(self, sql: str, rows: int, api: Optional[str]) -> None:
+        pass
+
+    def record_transaction(self, duration: float, api: Optional[str]) -> None:
+        pass
+
+    def record_acquire(self, duration: float, api: Optional[str]) -> None:
+        pass
+
+    def record_api(self, api: str, duration: float) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class _Timing:
+    __slots__ = ('count', 'total', 'max', 'rows', 'buckets')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS_MS)
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        duration_ms = duration * 1000
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if duration_ms <= bound:
+                self.buckets[index] += 1
+                break
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1000,
+            'avg_ms': (self.total / self.count * 1000) if self.count else 0.0,
+            'max_ms': self.max * 1000,
+            'rows': self.rows,
+            'histogram_ms': {('inf' if bound == float('inf') else str(bound)): count
+                             for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets)},
+        }
+
+
+class InMemoryCollector(Collector):
+    """Aggregates counts, totals, maxima and latency histograms in memory."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._statements: Dict[str, _Timing] = {}
+            self._apis: Dict[str, _Timing] = {}
+            self._statements_by_api: Dict[str, Dict[str, float]] = {}
+            self._transactions = _Timing()
+            self._acquire = _Timing()
+
+    def record_statement(self, sql: str, duration: float, rows: int, api: Optional[str]) -> None:
+        with self._lock:
+            timing = self._statements.get(sql)
+            if timing is None:
+                timing = self._statements[sql] = _Timing()
+            timing.add(duration)
+            timing.rows += rows
+            per_api = self._statements_by_api.setdefault(api or 'unattributed', {'statements': 0, 'db_time': 0.0})
+            per_api['statements'] += 1
+            per_api['db_time'] += duration
+
+    def record_rows(self, sql: str, rows: int, api: Optional[str]) -> None:
+        with self._lock:
+            timing = self._statements.get(sql)
+            if timing is not None:
+                timing.rows += rows
+
+    def record_transaction(self, duration: float, api: Optional[str]) -> None:
+        with self._lock:
+            self._transactions.add(duration)
+
+    def record_acquire(self, duration: float, api: Optional[str]) -> None:
+        with self._lock:
+            self._acquire.add(duration)
+
+    def record_api(self, api: str, duration: float) -> None:
+        with self._lock:
+            timing = self._apis.get(api)
+            if timing is None:
+                timing = self._apis[api] = _Timing()
+            timing.add(duration)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return all aggregates; statements are sorted by total time, slowest first."""
+        with self._lock:
+            statements = sorted(self._statements.items(), key=lambda item: item[1].total, reverse=True)
+            apis = {}
+            for name, timing in self._apis.items():
+                entry = timing.as_dict()
+                db_stats = self._statements_by_api.get(name, {'statements': 0, 'db_time': 0.0})
+                entry['statements'] = db_stats['statements']
+                entry['db_time_ms'] = db_stats['db_time'] * 1000
+                apis[name] = entry
+            return {
+                'statements': [dict(timing.as_dict(), sql=sql) for sql, timing in statements],
+                'apis': apis,
+                'transactions': self._transactions.as_dict(),
+                'connection_acquire': self._acquire.as_dict(),
+            }
+
+
+class CallbackCollector(Collector):
+    """Forwards every event to ``callback(event_type, payload)`` as it happens."""
+
+    def __init__(self, callback: Callable[[str, Dict[str, Any]], None]):
+        self.callback = callback
+
+    def record_statement(self, sql: str, duration: float, rows: int, api: Optional[str]) -> None:
+        self.callback('statement', {'sql': sql, 'duration': duration, 'rows': rows, 'api': api})
+
+    def record_rows(self, sql: str, rows: int, api: Optional[str]) -> None:
+        self.callback('rows', {'sql': sql, 'rows': rows, 'api': api})
+
+    def record_transaction(self, duration: float, api: Optional[str]) -> None:
+        self.callback('transaction', {'duration': duration, 'api': api})
+
+    def record_acquire(self, duration: float, api: Optional[str]) -> None:
+        self.callback('acquire', {'duration': duration, 'api': api})
+
+    def record_api(self, api: str, duration: float) -> None:
+        self.callback('api', {'api': api, 'duration': duration})
+
+
+class PeriodicLogCollector(InMemoryCollector):
+    """In-memory aggregates appended to a JSON Lines log file every ``interval`` seconds."""
+
+    def __init__(self, path: str, interval: float = 60.0, reset_after_dump: bool = True):
+        super().__init__()
+        self.path = path
+        self.interval = interval
+        self.reset_after_dump = reset_after_dump
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='instrumentation-dump', daemon=True)
+        self._thread.start()
+
+    def dump(self) -> None:
+        snapshot = self.snapshot()
+        if self.reset_after_dump:
+            self.reset()
+        snapshot['timestamp'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(snapshot) + '\n')
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.dump()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.dump()
+
+
+class InstrumentedCursor:
+    """Cursor proxy that counts rows as they are fetched."""
+
+    __slots__ = ('_cursor', '_sql', '_collector', '_api')
+
+    def __init__(self, cursor, sql: str, collector: Collector, api: Optional[str]):
+        self._cursor = cursor
+        self._sql = sql
+        self._collector = collector
+        self._api = api
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._collector.record_rows(self._sql, 1, self._api)
+        return row
+
+    def fetchmany(self, size: Optional[int] = None):
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        self._collector.record_rows(self._sql, len(rows), self._api)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._collector.record_rows(self._sql, len(rows), self._api)
+        return rows
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._collector.record_rows(self._sql, 1, self._api)
+            yield row
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """Connection proxy that times every execute/executemany call."""
+
+    def __init__(self, conn, collector: Collector):
+        self._conn = conn
+        self._collector = collector
+
+    def execute(self, sql: str, parameters: Any = ()):
+        return self._timed(self._conn.execute, sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Any):
+        return self._timed(self._conn.executemany, sql, seq_of_parameters)
+
+    def _timed(self, method: Callable, sql: str, parameters: Any):
+        api = _current_api.get()
+        start = time.perf_counter()
+        cursor = method(sql, parameters)
+        duration = time.perf_counter() - start
+        normalized = normalize_sql(sql)
+        # DML reports affected rows up front; SELECT rows are counted as fetched
+        affected = cursor.rowcount if cursor.rowcount > 0 else 0
+        self._collector.record_statement(normalized, duration, affected, api)
+        return InstrumentedCursor(cursor, normalized, self._collector, api)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
+def unwrap_connection(conn: Any) -> Any:
+    """Return the raw sqlite3 connection behind an instrumented proxy."""
+    return conn._conn if isinstance(conn, InstrumentedConnection) else conn
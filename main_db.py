@@ -1,8 +1,30 @@
+import argparse
+import json
+import os
+import time
 from db_operations import MoneyTransferDB
+from database import currency_exponent, to_minor_units, from_minor_units
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, Callable
+from bulk_load import read_records, infer_format
+from failure_log import FailureLogWriter
+
+# Opened on first use (or under __main__), so importing this module, as the
+# dispatcher's workers do, opens no database
+db: Optional[MoneyTransferDB] = None
+
+
+def _default_db() -> MoneyTransferDB:
+    global db
+    if db is None:
+        db = MoneyTransferDB()
+    return db
+
+
+def format_money(amount: float, currency: str) -> str:
+    """Show an amount with the currency's number of decimal places."""
+    return f"{amount:,.{currency_exponent(currency)}f}"
 
-db = MoneyTransferDB()
 
 def get_valid_account() -> str:
     """Prompt for account number until valid."""
@@ -90,27 +112,36 @@ def get_valid_amount(account_number: str) -> float:
     
     currency = sender['currency']
 
-    print(f"ℹ️  Available balance: {balance} {currency}")
+    print(f"ℹ️  Available balance: {format_money(balance, currency)} {currency}")
 
     while True:
         transfer_amount = input("Enter Transfer Amount: ").strip()
 
         try:
-            amount = float(transfer_amount)
+            float(transfer_amount)
+        except ValueError:
+            print("❌ Invalid amount format. Please enter a numeric value.\n")
+            continue
 
-            if amount <= 0:
-                print("❌ Transfer amount must be greater than 0. Please try again.\n")
-                continue
+        try:
+            # Checked in integer minor units, like the transfer itself
+            amount = to_minor_units(transfer_amount, currency)
+        except ValueError as e:
+            print(f"❌ {e}. Please try again.\n")
+            continue
 
-            if amount > balance:
-                print(f"❌ Insufficient balance. Your balance is {balance} {currency}. Please try again.\n")
-                continue
+        if amount <= 0:
+            print("❌ Transfer amount must be greater than 0. Please try again.\n")
+            continue
 
-            print(f"✅ Amount validated: {amount} {currency}")
-            return amount
+        if amount > to_minor_units(balance, currency):
+            print(f"❌ Insufficient balance. Your balance is {format_money(balance, currency)} {currency}. "
+                  f"Please try again.\n")
+            continue
 
-        except ValueError:
-            print("❌ Invalid amount format. Please enter a numeric value.\n")
+        amount = from_minor_units(amount, currency)
+        print(f"✅ Amount validated: {format_money(amount, currency)} {currency}")
+        return amount
 
 
 def get_valid_contact(account_number: str) -> str:
@@ -154,18 +185,22 @@ def check_receiver_daily_limit(receiver_account_number: str, amount: float) -> b
         print("❌ Error retrieving receiver information.")
         return False
     
+    currency = receiver['currency']
     daily_limit = receiver['daily_limit']
     daily_received = receiver['daily_received']
 
-    print(f"ℹ️  Receiver's Daily Limit: {daily_limit}")
-    print(f"ℹ️  Receiver's Already Received Today: {daily_received}")
+    print(f"ℹ️  Receiver's Daily Limit: {format_money(daily_limit, currency)}")
+    print(f"ℹ️  Receiver's Already Received Today: {format_money(daily_received, currency)}")
 
     if not can_receive:
         print("❌ Receiver has reached or will exceed their daily transfer limit.")
-        print(f"Receiver can only receive {remaining_limit} more today.")
+        print(f"Receiver can only receive {format_money(remaining_limit, currency)} more today.")
         return False
     else:
-        print(f"✅ Receiver can receive this amount. Remaining limit after transfer: {remaining_limit - amount}")
+        remaining_after = from_minor_units(to_minor_units(remaining_limit, currency)
+                                           - to_minor_units(amount, currency), currency)
+        print(f"✅ Receiver can receive this amount. Remaining limit after transfer: "
+              f"{format_money(remaining_after, currency)}")
         return True
 
 
@@ -184,8 +219,8 @@ def process_transaction(sender_account: str, receiver_account: str, amount: floa
         
         print("\n💰 Transaction processed successfully!")
         print(f"Transaction ID: {result['transaction_id']}")
-        print(f"Sender's new balance: {result['sender_balance_after']}")
-        print(f"Receiver's total received today: {result['receiver_daily_after']}")
+        print(f"Sender's new balance: {format_money(result['sender_balance_after'], currency)}")
+        print(f"Receiver's total received today: {format_money(result['receiver_daily_after'], currency)}")
         
         return True
         
@@ -273,16 +308,264 @@ def main() -> None:
         print(f"\n📋 Transaction Summary:")
         print(f"   From Account: {account_number}")
         print(f"   To Account: {receiver_account_number}")
-        print(f"   Amount: {amount} {currency}")
+        print(f"   Amount: {format_money(amount, currency)} {currency}")
         if transaction_reason:
             print(f"   Reason: {transaction_reason}")
         print(f"   Contact: {contact_information}")
 
 
+def validate_transfer_instruction(record: Dict[str, Any], transfer_db: Optional[MoneyTransferDB] = None) -> Dict[str, Any]:
+    """
+    Run the checks of interactive steps 1-8 on one file instruction.
+    
+    Raises ValueError with the first failing check; otherwise returns the
+    transfer request for settlement. Balance and daily limit are checked
+    again when the transfer settles, against the live rows.
+    """
+    transfer_db = transfer_db or _default_db()
+    
+    def field(name: str) -> str:
+        value = record.get(name)
+        return str(value).strip() if value is not None else ''
+    
+    # Step 1: Account validation
+    sender_account = field('sender')
+    sender = transfer_db.get_sender_account(sender_account)
+    if not sender:
+        raise ValueError("Sender account not found or inactive")
+    
+    # Step 2: Authentication
+    if not transfer_db.verify_authentication(sender_account, field('credential')):
+        raise ValueError("Invalid authentication credentials")
+    
+    # Step 3: Receiver account validation
+    receiver_account = field('receiver')
+    receiver = transfer_db.get_receiver_account(receiver_account)
+    if not receiver:
+        raise ValueError("Receiver account not found")
+    
+    # Step 4: Currency validation
+    sender_currency = sender['currency']
+    if sender_currency != receiver['currency']:
+        raise ValueError(f"Cross-currency transfers not supported. Both accounts must use {sender_currency}")
+    currency = field('currency').upper()
+    if currency != sender_currency:
+        raise ValueError(f"Currency mismatch. You must enter {sender_currency}")
+    
+    # Step 5: Amount validation, in integer minor units
+    try:
+        float(field('amount'))
+    except ValueError:
+        raise ValueError("Invalid amount format. Please enter a numeric value")
+    amount = to_minor_units(field('amount'), currency)
+    if not amount > 0:
+        raise ValueError("Transfer amount must be greater than 0")
+    if amount > to_minor_units(sender['balance'], sender_currency):
+        raise ValueError(f"Insufficient balance. Your balance is "
+                         f"{format_money(sender['balance'], sender_currency)} {sender_currency}")
+    amount = from_minor_units(amount, currency)
+    
+    # Step 6: Receiver daily limit check
+    can_receive, remaining_limit = transfer_db.check_receiver_daily_limit(receiver_account, amount)
+    if not can_receive:
+        raise ValueError(f"Receiver can only receive {format_money(remaining_limit, currency)} more today")
+    
+    # Step 7: Contact verification
+    contact_information = field('contact')
+    if contact_information != sender['contact_information']:
+        raise ValueError("Contact information does not match registered record")
+    
+    # Step 8: Transaction reason (optional)
+    return {
+        'sender_account': sender_account,
+        'receiver_account': receiver_account,
+        'amount': amount,
+        'currency': currency,
+        'contact_info': contact_information,
+        'transaction_reason': field('reason') or None,
+    }
+
+
+def process_transfer_file(input_path: str, output_path: str, transfer_db: Optional[MoneyTransferDB] = None,
+                          chunk_size: int = 500, resume: bool = True,
+                          progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Settle a CSV/JSONL file of transfer instructions without prompts.
+    
+    Instructions (sender, credential, receiver, amount, currency, contact,
+    reason) are read as a stream, validated like the interactive steps and
+    settled ``chunk_size`` at a time with ``process_transfers_batch``. One
+    JSON result line per instruction is appended to ``output_path``.
+    
+    Each chunk's result lines are written and synced, and the checkpoint in
+    ``transfer_file_progress`` is updated, inside the chunk's transaction. A
+    run that crashes therefore resumes after the last committed chunk, with
+    the result file cut back to match, and no line is settled twice. A file
+    that already completed is not processed again unless ``resume`` is False.
+    """
+    transfer_db = transfer_db or _default_db()
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    source, output = os.path.abspath(input_path), os.path.abspath(output_path)
+    stat = os.stat(input_path)
+    fingerprint = f'{stat.st_size}:{int(stat.st_mtime)}'
+    key = (source, output)
+    
+    with transfer_db.db_manager.transaction() as conn:
+        state = conn.execute(
+            'SELECT * FROM transfer_file_progress WHERE source = ? AND output_path = ?', key
+        ).fetchone()
+        if state is not None and (not resume or state['fingerprint'] != fingerprint):
+            conn.execute('DELETE FROM transfer_file_progress WHERE source = ? AND output_path = ?', key)
+            state = None
+        if state is None:
+            conn.execute(
+                '''INSERT INTO transfer_file_progress (source, output_path, fingerprint)
+                   VALUES (?, ?, ?)''',
+                key + (fingerprint,)
+            )
+            counters = {'lines_done': 0, 'output_bytes': 0, 'succeeded': 0, 'failed': 0}
+        else:
+            counters = {name: state[name] for name in ('lines_done', 'output_bytes', 'succeeded', 'failed')}
+    
+    resumed_from = counters['lines_done']
+    start = time.perf_counter()
+    
+    def report(completed: bool = False, already_completed: bool = False) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - start
+        processed = counters['lines_done'] - resumed_from
+        return dict(counters, resumed_from=resumed_from, completed=completed,
+                    already_completed=already_completed, elapsed_sec=elapsed,
+                    lines_per_sec=processed / elapsed if elapsed > 0 else 0.0)
+    
+    if state is not None and state['completed']:
+        return report(completed=True, already_completed=True)
+    
+    with open(output_path, 'r+b' if resumed_from and os.path.exists(output_path) else 'wb') as out:
+        # Drop result lines from a chunk that never committed
+        out.truncate(counters['output_bytes'])
+        out.seek(counters['output_bytes'])
+        
+        records = read_records(input_path, infer_format(input_path))
+        for _ in range(resumed_from):
+            next(records, None)
+        
+        chunk: List[Tuple[int, Optional[Dict[str, Any]], Optional[str]]] = []
+        position = resumed_from
+        for record in records:
+            position += 1
+            try:
+                if isinstance(record, str):
+                    record = json.loads(record)
+                chunk.append((position, validate_transfer_instruction(record, transfer_db), None))
+            except (ValueError, AttributeError) as e:
+                chunk.append((position, None, str(e)))
+            if len(chunk) >= chunk_size:
+                _settle_file_chunk(transfer_db, chunk, out, key, counters)
+                chunk = []
+                if progress:
+                    progress(report())
+        if chunk:
+            _settle_file_chunk(transfer_db, chunk, out, key, counters)
+    
+    with transfer_db.db_manager.transaction() as conn:
+        conn.execute(
+            '''UPDATE transfer_file_progress SET completed = 1, updated_at = CURRENT_TIMESTAMP
+               WHERE source = ? AND output_path = ?''',
+            key
+        )
+    return report(completed=True)
+
+
+def _settle_file_chunk(transfer_db: MoneyTransferDB, chunk: List[Tuple[int, Optional[Dict[str, Any]], Optional[str]]],
+                       out, key: Tuple[str, str], counters: Dict[str, int]) -> None:
+    """Settle one chunk, writing its result lines and checkpoint inside the chunk's transaction."""
+    transfers = [transfer for _, transfer, _ in chunk if transfer is not None]
+    pending: Dict[str, int] = {}
+    
+    def record(conn, results: List[Dict[str, Any]]) -> None:
+        settled = iter(results)
+        lines, succeeded, failed = [], 0, 0
+        for line_number, transfer, error in chunk:
+            if transfer is None:
+                result = {'line': line_number, 'status': 'FAILED', 'error': error}
+            else:
+                result = dict(next(settled), line=line_number)
+                del result['index']
+            if result['status'] == 'SUCCESS':
+                succeeded += 1
+            else:
+                failed += 1
+            lines.append(json.dumps(result) + '\n')
+        out.write(''.join(lines).encode('utf-8'))
+        out.flush()
+        os.fsync(out.fileno())
+        conn.execute(
+            '''UPDATE transfer_file_progress
+               SET lines_done = ?, output_bytes = ?, succeeded = ?, failed = ?, updated_at = CURRENT_TIMESTAMP
+               WHERE source = ? AND output_path = ?''',
+            (chunk[-1][0], out.tell(), counters['succeeded'] + succeeded, counters['failed'] + failed) + key
+        )
+        pending.update(lines_done=chunk[-1][0], output_bytes=out.tell(),
+                       succeeded=counters['succeeded'] + succeeded, failed=counters['failed'] + failed)
+    
+    if transfers:
+        results = transfer_db.process_transfers_batch(transfers, batch_size=len(transfers),
+                                                      mode='savepoint', on_batch=record)
+    else:
+        results = []
+        with transfer_db.db_manager.transaction(immediate=True) as conn:
+            record(conn, results)
+    # Only count the chunk once its transaction has committed
+    counters.update(pending)
+    
+    for transfer, result in zip(transfers, results):
+        if result['status'] != 'SUCCESS':
+            transfer_db.log_failed_transaction(transfer['sender_account'], transfer['receiver_account'],
+                                               transfer['amount'], transfer['currency'],
+                                               transfer['transaction_reason'] or "", result['error'])
+
+
+def run_headless(args: argparse.Namespace) -> None:
+    """Process a transfer instruction file, printing progress and throughput."""
+    output_path = args.output or args.file + '.results.jsonl'
+    
+    def show(report: Dict[str, Any]) -> None:
+        print(f"  {report['lines_done']} lines ({report['succeeded']} succeeded, {report['failed']} failed), "
+              f"{report['lines_per_sec']:.0f} lines/sec")
+    
+    db.failure_log = FailureLogWriter(db.db_manager).start()
+    try:
+        report = process_transfer_file(args.file, output_path, db, args.chunk_size, not args.restart, show)
+    finally:
+        db.failure_log.stop()
+    if report['already_completed']:
+        print(f"ℹ️  {args.file} was already processed (results: {output_path}); use --restart to run it again.")
+        return
+    if report['resumed_from']:
+        print(f"Resumed after line {report['resumed_from']}.")
+    print(f"✅ Processed {report['lines_done']} line(s): {report['succeeded']} succeeded, "
+          f"{report['failed']} failed ({report['lines_per_sec']:.0f} lines/sec). Results: {output_path}")
+
+
 if __name__ == "__main__":
-    # Initialize database and seed data
-    print("Initializing database...")
-    db.db_manager.seed_sample_data()
-    print("Database ready!\n")
+    parser = argparse.ArgumentParser(description="Money Transfer System (interactive, or headless with --file).")
+    parser.add_argument('--file', default=None, help="CSV/JSONL transfer instructions to process without prompts")
+    parser.add_argument('--output', default=None, help="Result file (default: <file>.results.jsonl)")
+    parser.add_argument('--chunk-size', type=int, default=500, help="Instructions settled per transaction")
+    parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint and process the file again")
+    args = parser.parse_args()
     
-    main()
+    if args.file:
+        db = MoneyTransferDB()
+        run_headless(args)
+    else:
+        # A single interactive session is the only writer it needs to see,
+        # so account lookups between prompts can be cached
+        db = MoneyTransferDB(cache_capacity=1024)
+        # Initialize database and seed data
+        print("Initializing database...")
+        db.db_manager.seed_sample_data()
+        print("Database ready!\n")
+        
+        main()
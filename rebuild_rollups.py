@@ -0,0 +1,19 @@
+import argparse
+from database import DatabaseManager
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild daily transaction rollups from the transactions table.")
+    parser.add_argument('--db', default='money_transfer.db', help="Path to the SQLite database")
+    parser.add_argument('--from-date', default=None, help="First day to rebuild (YYYY-MM-DD, default: all)")
+    parser.add_argument('--to-date', default=None, help="Last day to rebuild (YYYY-MM-DD, default: all)")
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager(args.db)
+    rows = db_manager.rebuild_daily_rollups(args.from_date, args.to_date)
+    db_manager.close()
+    print(f"✅ Rebuilt {rows} rollup row(s).")
+
+
+if __name__ == "__main__":
+    main()
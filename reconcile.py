@@ -0,0 +1,276 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+from typing import Optional, Dict, Any, List, Tuple, Iterator
+from urllib.request import pathname2url
+
+ACCOUNT_TYPES = ('sender', 'receiver')
+
+# Per account type: the column holding the account, the before/after pair that
+# must chain from one transaction to the next, and the table/column holding
+# the account's current value
+CHAINS = {
+    'sender': ('sender_account', 'sender_balance_before', 'sender_balance_after',
+               'sender_accounts', 'balance'),
+    'receiver': ('receiver_account', 'receiver_daily_before', 'receiver_daily_after',
+                 'receiver_accounts', 'daily_received'),
+}
+
+
+def _numpy():
+    """Import NumPy on first use; the rest of the system does not need it."""
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("Ledger reconciliation needs NumPy. Install it with 'pip install numpy'.") from None
+    return numpy
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    uri = 'file:' + pathname2url(os.path.abspath(db_path)) + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True)
+    conn.execute('PRAGMA query_only = ON')
+    return conn
+
+
+def account_partitions(db_path: str, account_type: str, partitions: int) -> List[Tuple[Optional[str], Optional[str]]]:
+    """Split the account table into ``partitions`` contiguous [low, high) key ranges."""
+    table = CHAINS[account_type][3]
+    conn = _connect(db_path)
+    try:
+        total = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        bounds: List[Optional[str]] = [None]
+        for index in range(1, partitions):
+            row = conn.execute(f'SELECT account_number FROM {table} ORDER BY account_number LIMIT 1 OFFSET ?',
+                               (total * index // partitions,)).fetchone()
+            if row is not None and row[0] != bounds[-1]:
+                bounds.append(row[0])
+        bounds.append(None)
+    finally:
+        conn.close()
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _range_filter(column: str, low: Optional[str], high: Optional[str]) -> Tuple[str, List[str]]:
+    clauses, params = [], []
+    if low is not None:
+        clauses.append(f'{column} >= ?')
+        params.append(low)
+    if high is not None:
+        clauses.append(f'{column} < ?')
+        params.append(high)
+    return (' AND '.join(clauses) or '1 = 1'), params
+
+
+def _column_chunks(cursor: sqlite3.Cursor, chunk_size: int) -> Iterator[Tuple[Any, ...]]:
+    """Turn a row cursor into column arrays of up to ``chunk_size`` rows."""
+    np = _numpy()
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        accounts, ids, amounts, before, after = zip(*rows)
+        yield (np.array(accounts, dtype=object), np.array(ids, dtype=np.int64),
+               np.array(amounts, dtype=np.int64), np.array(before, dtype=np.int64),
+               np.array(after, dtype=np.int64))
+
+
+def reconcile_partition(db_path: str, account_type: str, low: Optional[str], high: Optional[str],
+                        chunk_size: int = 100000, max_breaks: int = 1000) -> Dict[str, Any]:
+    """
+    Check the before/after chains of one account range.
+
+    Successful transactions are streamed in ``(account, transaction_id)``
+    order, ``chunk_size`` rows at a time, and checked with array operations:
+
+    - ``arithmetic``: after = before - amount (sender) or before + amount (receiver)
+    - ``chain``: a transaction's before equals the previous one's after for the
+      same account; a receiver counter may also restart at 0 on a new day
+    - ``current``: the account's last after equals its stored balance (a
+      receiver's stored counter may also be 0 after a rollover)
+
+    The last row of a chunk is carried into the next one, so chains spanning
+    chunks are checked too. Everything is read in one snapshot. Values are
+    the stored integer minor units and are compared exactly, so breaks
+    report minor units too.
+    """
+    np = _numpy()
+    account_column, before_column, after_column, table, current_column = CHAINS[account_type]
+    sign = -1 if account_type == 'sender' else 1
+    where, params = _range_filter(account_column, low, high)
+    account_where, account_params = _range_filter('account_number', low, high)
+
+    breaks: List[Dict[str, Any]] = []
+    counts = {'arithmetic': 0, 'chain': 0, 'current': 0}
+    rows_checked = 0
+
+    def report(check: str, accounts, ids, expected, actual) -> None:
+        counts[check] += len(ids)
+        for account, transaction_id, want, got in zip(accounts, ids, expected, actual):
+            if len(breaks) >= max_breaks:
+                return
+            breaks.append({'account_type': account_type, 'account_number': account,
+                           'transaction_id': int(transaction_id), 'check': check,
+                           'expected': int(want), 'actual': None if got is None else int(got)})
+
+    conn = _connect(db_path)
+    try:
+        # One read transaction so balances and the log come from the same snapshot
+        conn.execute('BEGIN')
+        cursor = conn.execute(
+            f'''SELECT {account_column}, transaction_id, amount, {before_column}, {after_column}
+                FROM transactions
+                WHERE status = 'SUCCESS' AND {where}
+                ORDER BY {account_column}, transaction_id''',
+            params
+        )
+        carry = None
+        chunks = _column_chunks(cursor, chunk_size)
+        chunk = next(chunks, None)
+        while chunk is not None:
+            following = next(chunks, None)
+            if carry is not None:
+                chunk = tuple(np.concatenate((c, column)) for c, column in zip(carry, chunk))
+            accounts, ids, amounts, before, after = chunk
+            # A carried row was already checked on its own; only its links are new
+            carried = 0 if carry is None else 1
+            rows_checked += len(ids) - carried
+
+            expected_after = before + sign * amounts
+            bad = after != expected_after
+            bad[:carried] = False
+            if bad.any():
+                report('arithmetic', accounts[bad], ids[bad], expected_after[bad], after[bad])
+
+            same_account = accounts[1:] == accounts[:-1]
+            continues = before[1:] == after[:-1]
+            if account_type == 'receiver':
+                continues |= before[1:] == 0
+            bad = same_account & ~continues
+            if bad.any():
+                report('chain', accounts[1:][bad], ids[1:][bad], after[:-1][bad], before[1:][bad])
+
+            # The last row of each account is final unless it ends the chunk
+            # and the account may continue in the next one
+            last = np.append(~same_account, True)
+            if following is not None:
+                last[-1] = False
+                carry = tuple(column[-1:] for column in chunk)
+            if last.any():
+                last_accounts = accounts[last]
+                current = dict(conn.execute(
+                    f'''SELECT account_number, {current_column} FROM {table}
+                        WHERE account_number >= ? AND account_number <= ?''',
+                    (last_accounts[0], last_accounts[-1])
+                ).fetchall())
+                stored = np.array([current.get(account) for account in last_accounts], dtype=object)
+                found = np.array([value is not None for value in stored], dtype=bool)
+                values = np.where(found, stored, 0).astype(np.int64)
+                matches = values == after[last]
+                if account_type == 'receiver':
+                    matches |= values == 0
+                bad = ~(found & matches)
+                if bad.any():
+                    report('current', last_accounts[bad], ids[last][bad], after[last][bad], stored[bad])
+            chunk = following
+
+        accounts_checked = conn.execute(
+            f'SELECT COUNT(*) FROM {table} WHERE {account_where}', account_params
+        ).fetchone()[0]
+        conn.rollback()
+    finally:
+        conn.close()
+    return {'account_type': account_type, 'range': [low, high], 'rows': rows_checked,
+            'accounts': accounts_checked, 'counts': counts, 'breaks': breaks}
+
+
+def _partition_entry(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return reconcile_partition(**kwargs)
+
+
+def reconcile(db_path: str, account_types: Tuple[str, ...] = ACCOUNT_TYPES, workers: Optional[int] = None,
+              partitions: Optional[int] = None, chunk_size: int = 100000,
+              max_breaks: int = 1000) -> Dict[str, Any]:
+    """
+    Reconcile stored balances and daily counters against the transactions log.
+
+    Accounts are split into ``partitions`` key ranges per account type (4 per
+    worker by default) and checked by ``workers`` processes, each holding at
+    most one chunk of rows. Only the live ``transactions`` table is read; a
+    chain that starts in an archive partition is checked from its first live row.
+    """
+    for account_type in account_types:
+        if account_type not in ACCOUNT_TYPES:
+            raise ValueError(f"Unknown account type '{account_type}'. Expected one of {ACCOUNT_TYPES}")
+    _numpy()
+    workers = workers or os.cpu_count() or 1
+    partitions = partitions or workers * 4
+    jobs = [dict(db_path=db_path, account_type=account_type, low=low, high=high, chunk_size=chunk_size,
+                 max_breaks=max_breaks)
+            for account_type in account_types
+            for low, high in account_partitions(db_path, account_type, partitions)]
+
+    start = time.perf_counter()
+    if workers == 1:
+        parts = [reconcile_partition(**job) for job in jobs]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            parts = pool.map(_partition_entry, jobs)
+    elapsed = time.perf_counter() - start
+
+    counts = {'arithmetic': 0, 'chain': 0, 'current': 0}
+    breaks: List[Dict[str, Any]] = []
+    for part in parts:
+        for check, count in part['counts'].items():
+            counts[check] += count
+        breaks.extend(part['breaks'])
+    breaks.sort(key=lambda b: (b['transaction_id'], b['account_type'], b['check']))
+    rows = sum(part['rows'] for part in parts)
+    return {
+        'rows': rows,
+        'accounts': sum(part['accounts'] for part in parts),
+        'partitions': len(jobs),
+        'workers': workers,
+        'counts': counts,
+        'total_breaks': sum(counts.values()),
+        'breaks': breaks[:max_breaks],
+        'elapsed_sec': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check balances and daily counters against the transactions log.")
+    parser.add_argument('--db', default='money_transfer.db', help="Path to the SQLite database")
+    parser.add_argument('--type', dest='account_types', choices=ACCOUNT_TYPES, action='append',
+                        help="Account type to check (repeatable; default: both)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--partitions', type=int, default=None,
+                        help="Account ranges per type (default: 4 per worker)")
+    parser.add_argument('--chunk-size', type=int, default=100000, help="Rows per array chunk")
+    parser.add_argument('--max-breaks', type=int, default=1000, help="Breaks to list in the report")
+    parser.add_argument('--output', default=None, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    report = reconcile(args.db, tuple(args.account_types or ACCOUNT_TYPES), args.workers, args.partitions,
+                       args.chunk_size, args.max_breaks)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(f"Checked {report['rows']} transaction rows for {report['accounts']} account(s) "
+          f"in {report['elapsed_sec']:.2f}s ({report['rows_per_sec']:.0f} rows/sec).")
+    if not report['total_breaks']:
+        print("✅ Balances and daily counters match the transactions log.")
+        return
+    print(f"❌ {report['total_breaks']} break(s): {report['counts']}")
+    for item in report['breaks'][:20]:
+        print(f"  transaction {item['transaction_id']}: {item['account_type']} {item['account_number']} "
+              f"{item['check']} expected {item['expected']}, found {item['actual']}")
+    raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import argparse
+import threading
+from datetime import datetime, date, time as dt_time, timedelta
+from typing import Optional
+from database import DatabaseManager
+from db_operations import MoneyTransferDB
+
+
+class DailyJob:
+    """
+    Runs ``run_once`` every day at ``run_at`` on a background thread.
+
+    Subclasses implement ``run_once`` and return how many rows it touched.
+    """
+
+    thread_name = 'daily-job'
+
+    def __init__(self, transfer_db: Optional[MoneyTransferDB] = None, run_at: dt_time = dt_time(0, 5)):
+        self.transfer_db = transfer_db or MoneyTransferDB()
+        self.run_at = run_at
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_run: Optional[datetime] = None
+
+    def run_once(self) -> int:
+        raise NotImplementedError
+
+    def seconds_until_next_run(self, now: Optional[datetime] = None) -> float:
+        now = now or datetime.now()
+        next_run = datetime.combine(now.date(), self.run_at)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    def start(self) -> 'DailyJob':
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def run_forever(self) -> None:
+        """Run the schedule on the calling thread until stop() is called."""
+        self._run()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.seconds_until_next_run()):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Error in {self.thread_name} job: {e}")
+
+
+class DailyRolloverJob(DailyJob):
+    """
+    Background job that resets stale receiver daily counters once a day.
+
+    Lookups and transfers already treat stale counters as zero, so this job is
+    optional; it just keeps the stored rows tidy with one set-based UPDATE at
+    an off-peak time instead of many single-row writes during business hours.
+    """
+
+    thread_name = 'daily-rollover'
+
+    def __init__(self, transfer_db: Optional[MoneyTransferDB] = None, run_at: dt_time = dt_time(0, 5)):
+        super().__init__(transfer_db, run_at)
+        self.last_rolled_over = 0
+
+    def run_once(self, as_of: Optional[str] = None) -> int:
+        """Roll over all stale rows now and return how many were reset."""
+        self.last_rolled_over = self.transfer_db.rollover_daily_limits(as_of)
+        self.last_run = datetime.now()
+        return self.last_rolled_over
+
+
+class IdempotencyKeyPurgeJob(DailyJob):
+    """
+    Background job that deletes idempotency keys past their retention window.
+
+    Expired keys no longer replay either way; purging only keeps the table
+    small. The retention comes from the MoneyTransferDB it is given.
+    """
+
+    thread_name = 'idempotency-purge'
+
+    def __init__(self, transfer_db: Optional[MoneyTransferDB] = None, run_at: dt_time = dt_time(0, 5)):
+        super().__init__(transfer_db, run_at)
+        self.last_purged = 0
+
+    def run_once(self) -> int:
+        """Delete expired keys now and return how many were removed."""
+        self.last_purged = self.transfer_db.purge_expired_idempotency_keys()
+        self.last_run = datetime.now()
+        return self.last_purged
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Reset stale receiver daily limits, or purge expired idempotency keys.")
+    parser.add_argument('--db', default='money_transfer.db', help="Path to the SQLite database")
+    parser.add_argument('--as-of', default=None, help="Reset rows last reset before this date (default: today)")
+    parser.add_argument('--purge-idempotency-keys', action='store_true',
+                        help="Delete expired idempotency keys instead of rolling over daily limits")
+    parser.add_argument('--retention', type=float, default=86400.0,
+                        help="Seconds an idempotency key is kept, for --purge-idempotency-keys")
+    parser.add_argument('--daemon', action='store_true', help="Keep running and run the job once a day")
+    parser.add_argument('--at', default='00:05', help="Time of day for --daemon runs (HH:MM)")
+    args = parser.parse_args()
+
+    transfer_db = MoneyTransferDB(DatabaseManager(args.db), idempotency_retention=args.retention)
+    job_class = IdempotencyKeyPurgeJob if args.purge_idempotency_keys else DailyRolloverJob
+
+    if args.daemon:
+        job = job_class(transfer_db, run_at=datetime.strptime(args.at, '%H:%M').time())
+        print(f"Daily {job.thread_name} scheduled at {args.at}. Press Ctrl+C to stop.")
+        try:
+            job.run_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if args.purge_idempotency_keys:
+        purged = IdempotencyKeyPurgeJob(transfer_db).run_once()
+        print(f"✅ Purged {purged} expired idempotency key(s).")
+    else:
+        rolled_over = DailyRolloverJob(transfer_db).run_once(args.as_of or date.today().isoformat())
+        print(f"✅ Rolled over {rolled_over} receiver account(s).")
+    transfer_db.db_manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,667 @@
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import threading
+import uuid
+import zlib
+from datetime import date
+from typing import Optional, Dict, Any, Tuple, List, Iterable, Sequence
+from database import (DatabaseManager, SAMPLE_SENDER_ACCOUNTS, SAMPLE_RECEIVER_ACCOUNTS, to_minor_units,
+                      money_to_major_units)
+from db_operations import MoneyTransferDB, _insufficient_balance, _daily_limit_exceeded, _currency_mismatch
+
+# Cross-shard commit decisions, recorded on the sender's shard in the same
+# transaction as the debit. A prepared credit with no decision has not
+# committed; recovery aborts it by recording ABORTED first, so a late commit
+# of the same transfer finds its gtid taken and fails.
+COMMITTED = 'COMMITTED'
+ABORTED = 'ABORTED'
+
+# Recovery leaves transfers younger than this alone, since another instance
+# may still be completing them
+RECOVERY_GRACE_SECONDS = 60.0
+
+TRANSACTION_COLUMNS = ('sender_account', 'receiver_account', 'amount', 'currency', 'transaction_reason',
+                       'status', 'sender_balance_before', 'sender_balance_after',
+                       'receiver_daily_before', 'receiver_daily_after', 'transaction_timestamp')
+
+
+def shard_index(account_number: str, shard_count: int) -> int:
+    """Stable hash partitioning of an account number across ``shard_count`` shards."""
+    return zlib.crc32(account_number.encode('utf-8')) % shard_count
+
+
+def shard_paths(shard_dir: str, shard_count: int) -> List[str]:
+    return [os.path.join(shard_dir, f'shard_{index:03d}.db') for index in range(shard_count)]
+
+
+def _create_prepared_transfers(db_manager, conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS prepared_transfers (
+            gtid TEXT NOT NULL,
+            role TEXT NOT NULL CHECK(role IN ('debit', 'credit')),
+            account_number TEXT NOT NULL,
+            amount INTEGER NOT NULL,
+            value_before INTEGER NOT NULL,
+            value_after INTEGER NOT NULL,
+            reset_date DATE,
+            sender_shard INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (gtid, role)
+        )
+    ''')
+
+
+def _create_transfer_decisions(db_manager, conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS transfer_decisions (
+            gtid TEXT PRIMARY KEY,
+            state TEXT NOT NULL CHECK(state IN ('COMMITTED', 'ABORTED')),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _create_shard_meta(db_manager, conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS shard_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    ''')
+
+
+class ShardDatabaseManager(DatabaseManager):
+    """DatabaseManager for one shard file, plus the prepared legs and decisions of cross-shard transfers."""
+
+    MIGRATIONS = DatabaseManager.MIGRATIONS + (
+        ('prepared transfers', _create_prepared_transfers),
+        ('transfer decisions', _create_transfer_decisions),
+    )
+
+    def _connect(self):
+        conn = super()._connect()
+        # The counterpart account of a cross-shard transfer lives in another
+        # file, so the transactions table's foreign keys cannot be enforced per
+        # shard; the coordinator validates both accounts instead
+        conn.execute('PRAGMA foreign_keys = OFF')
+        return conn
+
+
+class CoordinatorDatabaseManager(DatabaseManager):
+    """DatabaseManager for the shard set's metadata."""
+
+    MIGRATIONS = (
+        ('shard metadata', _create_shard_meta),
+    )
+
+
+class ShardedMoneyTransferDB:
+    """
+    MoneyTransferDB over accounts hash-partitioned across several SQLite files.
+
+    Each shard is an ordinary database with its own pool and writer lock, so
+    transfers on different shards run in parallel. A transfer whose sender and
+    receiver share a shard is a plain local transaction. A cross-shard transfer
+    is a two-phase commit in which the sender's shard decides: the credit is
+    prepared (limit consumed) on the receiver's shard, then the debit,
+    transaction row and commit decision are written in one transaction on the
+    sender's shard. No shared file is written per transfer. ``recover()``
+    resolves any transfer left in flight by a crash.
+
+    Transaction rows live on the sender's shard, so receiver history and
+    summaries fan out across shards. Transaction ids are unique per shard;
+    results carry a ``shard`` field alongside ``transaction_id``. Idempotency
+    keys are kept on the sender's shard, and one velocity limiter covers every
+    shard.
+    """
+
+    def __init__(self, shard_dir: str = 'shards', shard_count: int = 4, pool_size: int = 5,
+                 cache_capacity: int = 0, cache_ttl: float = 30.0, recover: bool = True,
+                 idempotency_retention: float = 86400.0, velocity=None):
+        os.makedirs(shard_dir, exist_ok=True)
+        self.shard_dir = shard_dir
+        self.coordinator = CoordinatorDatabaseManager(os.path.join(shard_dir, 'coordinator.db'), pool_size)
+        self.shard_count = self._check_shard_count(shard_count)
+        self._cleanup: Dict[int, List[Tuple[str, str, Optional[int]]]] = {}
+        self._cleanup_lock = threading.Lock()
+        self.shards = [
+            MoneyTransferDB(ShardDatabaseManager(path, pool_size), cache_capacity, cache_ttl,
+                            idempotency_retention=idempotency_retention)
+            for path in shard_paths(shard_dir, self.shard_count)
+        ]
+        # Shared by the shards, and loaded once from all of them
+        self.velocity = velocity
+        if velocity is not None:
+            for shard in self.shards:
+                shard.velocity = velocity
+            velocity.rebuild(*(shard.db_manager for shard in self.shards))
+        if recover:
+            self.recover()
+
+    def _check_shard_count(self, shard_count: int) -> int:
+        with self.coordinator.transaction() as conn:
+            row = conn.execute("SELECT value FROM shard_meta WHERE key = 'shard_count'").fetchone()
+            if row is None:
+                conn.execute("INSERT INTO shard_meta (key, value) VALUES ('shard_count', ?)", (str(shard_count),))
+                return shard_count
+        if int(row['value']) != shard_count:
+            raise ValueError(f"{self.shard_dir} holds {row['value']} shards, not {shard_count}; "
+                             f"use 'python sharding.py reshard' to change the shard count")
+        return shard_count
+
+    def close(self) -> None:
+        self.flush()
+        for shard in self.shards:
+            shard.db_manager.close()
+        self.coordinator.close()
+
+    def shard_for(self, account_number: str) -> MoneyTransferDB:
+        return self.shards[shard_index(account_number, self.shard_count)]
+
+    def seed_sample_data(self) -> None:
+        """Seed the sample accounts, each on the shard its number hashes to."""
+        self.upsert_accounts(SAMPLE_SENDER_ACCOUNTS, SAMPLE_RECEIVER_ACCOUNTS)
+
+    def upsert_accounts(self, sender_data: Iterable[Sequence[Any]] = (),
+                        receiver_data: Iterable[Sequence[Any]] = ()) -> None:
+        """Route account rows (DatabaseManager.upsert_accounts format) to their shards."""
+        senders: Dict[int, List[Sequence[Any]]] = {}
+        receivers: Dict[int, List[Sequence[Any]]] = {}
+        for row in sender_data:
+            senders.setdefault(shard_index(row[0], self.shard_count), []).append(row)
+        for row in receiver_data:
+            receivers.setdefault(shard_index(row[0], self.shard_count), []).append(row)
+        for index in set(senders) | set(receivers):
+            shard = self.shards[index]
+            shard.db_manager.upsert_accounts(senders.get(index, ()), receivers.get(index, ()))
+            shard.invalidate_cache([row[0] for row in senders.get(index, ())],
+                                   [row[0] for row in receivers.get(index, ())])
+
+    # Account lookups route to the owning shard
+
+    def get_sender_account(self, account_number: str) -> Optional[Dict[str, Any]]:
+        return self.shard_for(account_number).get_sender_account(account_number)
+
+    def verify_authentication(self, account_number: str, credential: str) -> bool:
+        return self.shard_for(account_number).verify_authentication(account_number, credential)
+
+    def get_receiver_account(self, account_number: str) -> Optional[Dict[str, Any]]:
+        return self.shard_for(account_number).get_receiver_account(account_number)
+
+    def check_sufficient_balance(self, account_number: str, amount: float) -> bool:
+        return self.shard_for(account_number).check_sufficient_balance(account_number, amount)
+
+    def check_receiver_daily_limit(self, receiver_account_number: str, amount: float) -> Tuple[bool, float]:
+        return self.shard_for(receiver_account_number).check_receiver_daily_limit(receiver_account_number, amount)
+
+    def get_account_balance(self, account_number: str) -> Optional[float]:
+        return self.shard_for(account_number).get_account_balance(account_number)
+
+    def log_failed_transaction(self, sender_account: str, receiver_account: str, amount: float,
+                               currency: str, reason: str, error_message: str) -> None:
+        self.shard_for(sender_account).log_failed_transaction(sender_account, receiver_account, amount,
+                                                              currency, reason, error_message)
+
+    # Transfers
+
+    def process_transfer(self, sender_account: str, receiver_account: str, amount: float,
+                         currency: str, contact_info: str, transaction_reason: Optional[str] = None,
+                         idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Process a transfer locally when both accounts share a shard, else in two phases.
+
+        The credit is prepared on the receiver's shard first (daily limit
+        consumed, leg recorded). The sender's shard then debits the account,
+        writes the transaction row and records the commit decision in one
+        transaction, so the decision needs no separate log. Releasing the
+        prepared leg is deferred into later writes on the shards.
+        Prepared legs hold minor units.
+
+        An ``idempotency_key`` is checked and stored on the sender's shard,
+        in the debit's transaction.
+        """
+        sender_shard = shard_index(sender_account, self.shard_count)
+        receiver_shard = shard_index(receiver_account, self.shard_count)
+        sender_db = self.shards[sender_shard]
+        if sender_shard == receiver_shard:
+            result = sender_db.process_transfer(sender_account, receiver_account, amount, currency,
+                                                contact_info, transaction_reason, idempotency_key)
+            result['shard'] = sender_shard
+            return result
+
+        amount = to_minor_units(amount, currency)
+        transfer = {'sender_account': sender_account, 'receiver_account': receiver_account, 'amount': amount,
+                    'currency': currency, 'transaction_reason': transaction_reason,
+                    'idempotency_key': idempotency_key}
+        if idempotency_key is not None:
+            with sender_db.db_manager.read() as conn:
+                stored = sender_db._load_idempotency_keys(conn, [idempotency_key])
+            if stored:
+                return self._replayed(sender_shard, stored[idempotency_key], transfer)
+        reservation = sender_db._reserve_velocity(sender_account, amount, currency)
+        try:
+            gtid = uuid.uuid4().hex
+            credit = self._prepare_credit(gtid, receiver_shard, sender_shard, receiver_account, amount, currency)
+            transfer['receiver_daily_before'] = credit['value_before']
+            transfer['receiver_daily_after'] = credit['value_after']
+            try:
+                result = self._commit_debit(gtid, sender_shard, transfer)
+            except Exception:
+                self._undo_credit(gtid, receiver_shard)
+                raise
+            if 'replayed' in result:
+                # A concurrent retry under the same key committed first
+                self._undo_credit(gtid, receiver_shard)
+        except BaseException:
+            sender_db._release_velocity(reservation)
+            raise
+        if 'replayed' in result:
+            sender_db._release_velocity(reservation)
+            return self._replayed(sender_shard, result['replayed'], transfer)
+        self._defer_cleanup(receiver_shard, [('credit', gtid, sender_shard)])
+        return money_to_major_units({
+            'transaction_id': result['transaction_id'],
+            'shard': sender_shard,
+            'sender_balance_before': result['sender_balance_before'],
+            'sender_balance_after': result['sender_balance_after'],
+            'receiver_daily_before': credit['value_before'],
+            'receiver_daily_after': credit['value_after'],
+            'status': 'SUCCESS'
+        }, currency)
+
+    def _replayed(self, shard: int, stored: Dict[str, Any], transfer: Dict[str, Any]) -> Dict[str, Any]:
+        """The original result of an idempotent retry, or ValueError if the key was used for another transfer."""
+        result = self.shards[shard]._replay_result(stored, transfer)
+        result['shard'] = shard
+        return money_to_major_units(result, transfer['currency'])
+
+    def _prepare_credit(self, gtid: str, shard: int, sender_shard: int, account_number: str, amount: int,
+                        currency: str) -> Dict[str, int]:
+        """Phase one on the receiver shard: consume daily limit and record the prepared leg."""
+        shard_db = self.shards[shard]
+        today = date.today().isoformat()
+        cleanup = self._take_cleanup(shard)
+        try:
+            with shard_db.db_manager.transaction(immediate=True) as conn:
+                row = conn.execute(
+                    '''SELECT daily_limit, currency,
+                              CASE WHEN last_reset_date < ? THEN 0 ELSE daily_received END AS daily_received
+                       FROM receiver_accounts WHERE account_number = ?''',
+                    (today, account_number)
+                ).fetchone()
+                if not row:
+                    raise ValueError(f"Receiver account {account_number} not found")
+                if row['currency'] != currency:
+                    raise _currency_mismatch(account_number, row['currency'], currency)
+                daily_before = row['daily_received']
+                daily_limit = row['daily_limit']
+                if daily_before + amount > daily_limit:
+                    raise _daily_limit_exceeded(daily_limit - daily_before, currency)
+                daily_after = daily_before + amount
+                conn.execute(
+                    '''UPDATE receiver_accounts
+                       SET daily_received = ?,
+                           last_reset_date = ?,
+                           updated_at = CURRENT_TIMESTAMP
+                       WHERE account_number = ?''',
+                    (daily_after, today, account_number)
+                )
+                conn.execute(
+                    '''INSERT INTO prepared_transfers
+                       (gtid, role, account_number, amount, value_before, value_after, reset_date, sender_shard)
+                       VALUES (?, 'credit', ?, ?, ?, ?, ?, ?)''',
+                    (gtid, account_number, amount, daily_before, daily_after, today, sender_shard)
+                )
+                self._apply_cleanup(conn, cleanup)
+        except BaseException:
+            self._defer_cleanup(shard, cleanup)
+            raise
+        self._cleanup_done(cleanup)
+        shard_db.invalidate_cache(receiver_accounts=[account_number])
+        return {'value_before': daily_before, 'value_after': daily_after}
+
+    def _commit_debit(self, gtid: str, shard: int, transfer: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Phase two on the sender shard: record the decision, debit the sender and write the transaction.
+
+        If the transfer's idempotency key was stored meanwhile, nothing is
+        debited and ``{'replayed': stored_row}`` is returned instead.
+        """
+        shard_db = self.shards[shard]
+        idempotency_key = transfer.get('idempotency_key')
+        cleanup = self._take_cleanup(shard)
+        try:
+            with shard_db.db_manager.transaction(immediate=True) as conn:
+                stored = {} if idempotency_key is None else shard_db._load_idempotency_keys(conn, [idempotency_key])
+                if stored:
+                    result = {'replayed': stored[idempotency_key]}
+                else:
+                    result = self._debit_in_connection(conn, gtid, transfer)
+                    if idempotency_key is not None:
+                        shard_db._store_idempotency_keys(conn, [(transfer, result)])
+                self._apply_cleanup(conn, cleanup)
+        except BaseException:
+            self._defer_cleanup(shard, cleanup)
+            raise
+        self._cleanup_done(cleanup)
+        if not stored:
+            shard_db.invalidate_cache(sender_accounts=[transfer['sender_account']])
+        return result
+
+    @staticmethod
+    def _debit_in_connection(conn: sqlite3.Connection, gtid: str, transfer: Dict[str, Any]) -> Dict[str, int]:
+        """Record the COMMITTED decision, debit the sender and insert the transaction row; returns minor units."""
+        sender_account = transfer['sender_account']
+        decided = conn.execute(
+            '''INSERT INTO transfer_decisions (gtid, state) VALUES (?, ?)
+               ON CONFLICT(gtid) DO NOTHING''',
+            (gtid, COMMITTED)
+        ).rowcount
+        if decided != 1:
+            raise ValueError(f"Transfer {gtid} was aborted by recovery before it could commit")
+        row = conn.execute('SELECT balance, currency FROM sender_accounts WHERE account_number = ?',
+                           (sender_account,)).fetchone()
+        if not row:
+            raise ValueError(f"Sender account {sender_account} not found")
+        if row['currency'] != transfer['currency']:
+            raise _currency_mismatch(sender_account, row['currency'], transfer['currency'])
+        balance_before = row['balance']
+        if balance_before < transfer['amount']:
+            raise _insufficient_balance(balance_before, transfer['amount'], transfer['currency'])
+        balance_after = balance_before - transfer['amount']
+        conn.execute(
+            '''UPDATE sender_accounts
+               SET balance = ?,
+                   updated_at = CURRENT_TIMESTAMP
+               WHERE account_number = ?''',
+            (balance_after, sender_account)
+        )
+        cursor = conn.execute(
+            '''INSERT INTO transactions
+               (sender_account, receiver_account, amount, currency, transaction_reason,
+                status, sender_balance_before, sender_balance_after,
+                receiver_daily_before, receiver_daily_after)
+               VALUES (?, ?, ?, ?, ?, 'SUCCESS', ?, ?, ?, ?)''',
+            (sender_account, transfer['receiver_account'], transfer['amount'], transfer['currency'],
+             transfer['transaction_reason'], balance_before, balance_after,
+             transfer['receiver_daily_before'], transfer['receiver_daily_after'])
+        )
+        return {'transaction_id': cursor.lastrowid, 'sender_balance_before': balance_before,
+                'sender_balance_after': balance_after, 'receiver_daily_before': transfer['receiver_daily_before'],
+                'receiver_daily_after': transfer['receiver_daily_after']}
+
+    def _undo_credit(self, gtid: str, shard: int) -> None:
+        """Abort a prepared credit by giving back the limit it consumed; a no-op if it is gone."""
+        shard_db = self.shards[shard]
+        with shard_db.db_manager.transaction(immediate=True) as conn:
+            leg = conn.execute("SELECT * FROM prepared_transfers WHERE gtid = ? AND role = 'credit'",
+                               (gtid,)).fetchone()
+            if leg is None:
+                return
+            # If the counter has since rolled over to a new day there is nothing to give back
+            conn.execute(
+                '''UPDATE receiver_accounts
+                   SET daily_received = MAX(0, daily_received - ?),
+                       updated_at = CURRENT_TIMESTAMP
+                   WHERE account_number = ? AND last_reset_date = ?''',
+                (leg['amount'], leg['account_number'], leg['reset_date'])
+            )
+            conn.execute("DELETE FROM prepared_transfers WHERE gtid = ? AND role = 'credit'", (gtid,))
+        shard_db.invalidate_cache(receiver_accounts=[leg['account_number']])
+
+    # Committed transfers leave a prepared credit and a decision behind. They
+    # are deleted in that order (a credit without a decision is taken for an
+    # unfinished transfer) by the next write on their shard, or by flush().
+
+    def _take_cleanup(self, shard: int) -> List[Tuple[str, str, Optional[int]]]:
+        with self._cleanup_lock:
+            return self._cleanup.pop(shard, [])
+
+    def _defer_cleanup(self, shard: int, items: List[Tuple[str, str, Optional[int]]]) -> None:
+        if items:
+            with self._cleanup_lock:
+                self._cleanup.setdefault(shard, []).extend(items)
+
+    @staticmethod
+    def _apply_cleanup(conn: sqlite3.Connection, items: List[Tuple[str, str, Optional[int]]]) -> None:
+        for kind, gtid, _ in items:
+            if kind == 'credit':
+                conn.execute("DELETE FROM prepared_transfers WHERE gtid = ? AND role = 'credit'", (gtid,))
+            else:
+                conn.execute('DELETE FROM transfer_decisions WHERE gtid = ?', (gtid,))
+
+    def _cleanup_done(self, items: List[Tuple[str, str, Optional[int]]]) -> None:
+        """Once a released credit is committed, its decision can go too."""
+        for kind, gtid, sender_shard in items:
+            if kind == 'credit':
+                self._defer_cleanup(sender_shard, [('decision', gtid, None)])
+
+    def flush(self) -> None:
+        """Write out the deferred cleanup of committed transfers."""
+        while True:
+            with self._cleanup_lock:
+                pending = [shard for shard, items in self._cleanup.items() if items]
+            if not pending:
+                return
+            for shard in pending:
+                cleanup = self._take_cleanup(shard)
+                try:
+                    with self.shards[shard].db_manager.transaction(immediate=True) as conn:
+                        self._apply_cleanup(conn, cleanup)
+                except BaseException:
+                    self._defer_cleanup(shard, cleanup)
+                    raise
+                self._cleanup_done(cleanup)
+
+    def recover(self, older_than_seconds: float = RECOVERY_GRACE_SECONDS) -> Dict[str, int]:
+        """
+        Resolve cross-shard transfers left in flight by a crash.
+
+        A prepared credit whose decision is COMMITTED is released; one with no
+        decision is aborted and its limit given back. Transfers younger than
+        ``older_than_seconds`` are left alone, since another instance may
+        still be completing them; pass 0 only when no other instance is live.
+        Shards with nothing to resolve are only read.
+        """
+        self.flush()
+        with self.coordinator.read(snapshot=False) as conn:
+            cutoff = conn.execute("SELECT DATETIME('now', ?)", (f'-{older_than_seconds} seconds',)).fetchone()[0]
+        outcome = {'committed': 0, 'aborted': 0}
+        for shard, shard_db in enumerate(self.shards):
+            with shard_db.db_manager.read(snapshot=False) as conn:
+                legs = conn.execute(
+                    "SELECT gtid, sender_shard FROM prepared_transfers WHERE role = 'credit' AND created_at <= ?",
+                    (cutoff,)
+                ).fetchall()
+            for leg in legs:
+                gtid = leg['gtid']
+                with self.shards[leg['sender_shard']].db_manager.transaction(immediate=True) as conn:
+                    conn.execute(
+                        '''INSERT INTO transfer_decisions (gtid, state) VALUES (?, ?)
+                           ON CONFLICT(gtid) DO NOTHING''',
+                        (gtid, ABORTED)
+                    )
+                    state = conn.execute('SELECT state FROM transfer_decisions WHERE gtid = ?', (gtid,)).fetchone()[0]
+                if state == ABORTED:
+                    # The ABORTED decision stays, so a late commit of this transfer fails
+                    self._undo_credit(gtid, shard)
+                    outcome['aborted'] += 1
+                else:
+                    self._defer_cleanup(shard, [('credit', gtid, leg['sender_shard'])])
+                    outcome['committed'] += 1
+        self.flush()
+        # Every credit older than the cutoff is resolved by now, so older
+        # COMMITTED decisions (left by a crash after their credit was released) can go
+        for shard_db in self.shards:
+            with shard_db.db_manager.read(snapshot=False) as conn:
+                stale = conn.execute('SELECT 1 FROM transfer_decisions WHERE state = ? AND created_at <= ? LIMIT 1',
+                                     (COMMITTED, cutoff)).fetchone()
+            if stale:
+                with shard_db.db_manager.transaction(immediate=True) as conn:
+                    conn.execute('DELETE FROM transfer_decisions WHERE state = ? AND created_at <= ?',
+                                 (COMMITTED, cutoff))
+        return outcome
+
+    # Reporting fans out across shards
+
+    def get_transaction_history(self, account_number: str, account_type: str = 'sender', limit: int = 10,
+                                cursor: Optional[str] = None, start_date: Optional[str] = None,
+                                end_date: Optional[str] = None,
+                                status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get transaction history; receiver history is merged from every shard.
+
+        A ``cursor`` pages sender history, which lives on one shard. Receiver
+        history is merged from shards whose transaction ids overlap, so it
+        cannot be paged with one.
+        """
+        if account_type == 'sender':
+            return self.shard_for(account_number).get_transaction_history(
+                account_number, 'sender', limit, cursor, start_date, end_date, status)
+        if cursor is not None:
+            raise ValueError("Receiver history spans shards and cannot be paged with a cursor")
+        rows = []
+        for index, shard in enumerate(self.shards):
+            for row in shard.get_transaction_history(account_number, 'receiver', limit, None,
+                                                     start_date, end_date, status):
+                row['shard'] = index
+                rows.append(row)
+        rows.sort(key=lambda row: (row['transaction_timestamp'], row['transaction_id']), reverse=True)
+        return rows[:limit]
+
+    def get_transaction_history_page(self, account_number: str, account_type: str = 'sender', limit: int = 10,
+                                     cursor: Optional[str] = None, start_date: Optional[str] = None,
+                                     end_date: Optional[str] = None,
+                                     status: Optional[str] = None) -> Dict[str, Any]:
+        """Get one page of sender history from the sender's shard (see MoneyTransferDB)."""
+        if account_type != 'sender':
+            raise ValueError("Receiver history spans shards and cannot be paged with a cursor")
+        return self.shard_for(account_number).get_transaction_history_page(
+            account_number, 'sender', limit, cursor, start_date, end_date, status)
+
+    def get_all_sender_accounts(self) -> List[Dict[str, Any]]:
+        accounts = [account for shard in self.shards for account in shard.get_all_sender_accounts()]
+        return sorted(accounts, key=lambda account: account['account_number'])
+
+    def get_all_receiver_accounts(self) -> List[Dict[str, Any]]:
+        accounts = [account for shard in self.shards for account in shard.get_all_receiver_accounts()]
+        return sorted(accounts, key=lambda account: account['account_number'])
+
+    def get_daily_transaction_summary(self, date_str: Optional[str] = None) -> Dict[str, Any]:
+        summaries = [shard.get_daily_transaction_summary(date_str) for shard in self.shards]
+        return {
+            'date': summaries[0]['date'],
+            'total_transactions': sum(summary['total_transactions'] for summary in summaries),
+            'total_amount': sum(summary['total_amount'] for summary in summaries)
+        }
+
+
+def _check_reshard_source(path: str) -> None:
+    """Raise ValueError if ``path`` holds state that resharding would lose."""
+    conn = sqlite3.connect(path)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if 'prepared_transfers' in tables and conn.execute('SELECT 1 FROM prepared_transfers').fetchone():
+            raise ValueError(f"{path} has in-flight cross-shard transfers; run recovery first")
+        if conn.execute("SELECT 1 FROM pragma_table_info('sender_accounts') "
+                        "WHERE name = 'balance' AND type = 'REAL'").fetchone():
+            raise ValueError(f"{path} still stores money as REAL; open it once to migrate it")
+        if 'archive_partitions' in tables and conn.execute('SELECT 1 FROM archive_partitions').fetchone():
+            raise ValueError(f"{path} has archived transactions, which resharding cannot move")
+        if 'idempotency_keys' in tables and conn.execute('SELECT 1 FROM idempotency_keys').fetchone():
+            raise ValueError(f"{path} has idempotency keys, whose transaction ids resharding "
+                             f"would break; reshard once they have expired and been purged")
+    finally:
+        conn.close()
+
+
+def reshard(source_paths: List[str], target_dir: str, target_count: int, pool_size: int = 5) -> Dict[str, int]:
+    """
+    Copy accounts and history from existing database files into a new shard set.
+
+    Sources may be the shards of an existing layout or a single unsharded
+    database. Rows are redistributed with set-based INSERT ... SELECT over
+    ATTACHed sources. Transaction ids are reassigned in the target shards.
+    Run with writers stopped and after ``recover(0)``, since prepared legs are
+    not carried over. Sources with archive partitions or idempotency keys are
+    refused: archived months and stored results refer to transaction ids
+    that change here. Restore the archive and purge expired keys first.
+    """
+    if os.path.exists(os.path.join(target_dir, 'coordinator.db')):
+        raise ValueError(f"{target_dir} already holds a shard set")
+    for path in source_paths:
+        if not os.path.exists(path):
+            raise ValueError(f"Source database {path} does not exist")
+        _check_reshard_source(path)
+
+    target = ShardedMoneyTransferDB(target_dir, target_count, pool_size, cache_capacity=0, recover=False)
+    copied = {'sender_accounts': 0, 'receiver_accounts': 0, 'transactions': 0}
+    columns = ', '.join(TRANSACTION_COLUMNS)
+    try:
+        for index, shard in enumerate(target.shards):
+            conn = shard.db_manager.get_connection()
+            conn.create_function('shard_of', 1, lambda account: shard_index(account, target_count),
+                                 deterministic=True)
+            try:
+                for path in source_paths:
+                    conn.execute('ATTACH DATABASE ? AS source', (path,))
+                    copied['sender_accounts'] += conn.execute(
+                        'INSERT INTO sender_accounts SELECT * FROM source.sender_accounts '
+                        'WHERE shard_of(account_number) = ?', (index,)).rowcount
+                    copied['receiver_accounts'] += conn.execute(
+                        'INSERT INTO receiver_accounts SELECT * FROM source.receiver_accounts '
+                        'WHERE shard_of(account_number) = ?', (index,)).rowcount
+                    copied['transactions'] += conn.execute(
+                        f'INSERT INTO transactions ({columns}) SELECT {columns} FROM source.transactions '
+                        f'WHERE shard_of(sender_account) = ? ORDER BY transaction_id', (index,)).rowcount
+                    conn.commit()
+                    conn.execute('DETACH DATABASE source')
+            finally:
+                conn.close()
+    finally:
+        target.close()
+    return copied
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage sharded money transfer databases.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    reshard_parser = subparsers.add_parser('reshard', help="Redistribute accounts into a new shard set")
+    source = reshard_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--source', help="Single unsharded database to split")
+    source.add_argument('--source-dir', help="Directory of an existing shard set to rebalance")
+    reshard_parser.add_argument('--target-dir', required=True, help="Directory for the new shard set")
+    reshard_parser.add_argument('--shards', type=int, required=True, help="Number of target shards")
+
+    recover_parser = subparsers.add_parser('recover', help="Resolve in-flight cross-shard transfers")
+    recover_parser.add_argument('--shard-dir', default='shards')
+    recover_parser.add_argument('--shards', type=int, required=True)
+    recover_parser.add_argument('--older-than', type=float, default=RECOVERY_GRACE_SECONDS,
+                                help="Leave transfers younger than this many seconds alone "
+                                     "(0 when no other instance is running)")
+    args = parser.parse_args()
+
+    if args.command == 'reshard':
+        if args.source_dir:
+            sharded = ShardedMoneyTransferDB(args.source_dir, len(glob.glob(os.path.join(args.source_dir, 'shard_*.db'))))
+            outcome = sharded.recover(older_than_seconds=0)
+            sharded.close()
+            print(f"Recovered source shard set: {outcome}")
+            sources = sorted(glob.glob(os.path.join(args.source_dir, 'shard_*.db')))
+        else:
+            sources = [args.source]
+        copied = reshard(sources, args.target_dir, args.shards)
+        print(f"✅ Resharded into {args.shards} shard(s) in {args.target_dir}: {copied}")
+    else:
+        sharded = ShardedMoneyTransferDB(args.shard_dir, args.shards, recover=False)
+        outcome = sharded.recover(args.older_than)
+        sharded.close()
+        print(f"✅ Recovery complete: {outcome}")
+
+
+if __name__ == "__main__":
+    main()
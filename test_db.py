@@ -1,5 +1,31 @@
+import asyncio
+import csv
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from db_operations import MoneyTransferDB
-from database import DatabaseManager
+from database import DatabaseManager, to_minor_units
+from group_commit import GroupCommitWriter
+from async_db import AsyncMoneyTransferDB
+from export_transactions import export_to_path
+from instrumentation import InMemoryCollector, CallbackCollector, normalize_sql
+from sharding import ShardedMoneyTransferDB, shard_index, reshard
+from benchmark import (create_benchmark_database, run_transfer_benchmark, run_read_benchmark,
+                       create_real_money_database)
+from archive import TransactionArchiver
+from bulk_load import load_accounts
+from failure_log import FailureLogWriter
+from main_db import process_transfer_file
+from ledger import LedgerMoneyTransferDB
+from reconcile import reconcile
+from velocity import VelocityLimiter
+from dispatcher import TransferDispatcher, dispatch_transfer_file, _settle_items, LOCK_RETRIES
+from rollover_job import DailyRolloverJob, IdempotencyKeyPurgeJob
 
 def test_database_operations():
     """Test all database operations."""
@@ -96,5 +122,1476 @@ def test_database_operations():
     print("ALL TESTS COMPLETED!")
     print("=" * 60)
 
+def test_connection_pool():
+    """Test that transactions reuse pooled connections across threads."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING CONNECTION POOL")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'pool.db'), pool_size=2)
+        db_manager.seed_sample_data()
+        db = MoneyTransferDB(db_manager, cache_capacity=0)
+        
+        def lookup():
+            for _ in range(25):
+                assert db.get_sender_account('ACC1001') is not None
+        
+        threads = [threading.Thread(target=lookup) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        stats = db_manager.read_pool_stats()
+        print(f"✅ Read pool stats: {stats}")
+        assert stats['created'] <= 2
+        assert stats['checkouts'] >= 100
+        assert stats['in_use'] == 0
+        db_manager.close()
+
+def test_read_only_lane():
+    """Test that the read lane rejects writes and gives reports a stable snapshot."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING READ-ONLY LANE")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'read_lane.db'))
+        db_manager.seed_sample_data()
+        db = MoneyTransferDB(db_manager, cache_capacity=0)
+        
+        with db_manager.read() as conn:
+            try:
+                conn.execute("UPDATE sender_accounts SET balance = 0")
+                assert False, "Write on the read lane should fail"
+            except sqlite3.OperationalError as e:
+                print(f"✅ Write rejected on read lane: {e}")
+        
+        with db_manager.read() as conn:
+            before = conn.execute("SELECT balance FROM sender_accounts WHERE account_number = 'ACC1001'").fetchone()[0]
+            # The writer commits while the report's snapshot is open
+            db.process_transfer('ACC1001', 'ACC2001', 100.0, 'INR', 'vijay@example.com')
+            during = conn.execute("SELECT balance FROM sender_accounts WHERE account_number = 'ACC1001'").fetchone()[0]
+        assert before == during == 9000000  # minor units (paise)
+        assert db.get_account_balance('ACC1001') == 89900.0
+        print("✅ Snapshot unchanged while a transfer committed alongside it")
+        
+        checkouts = db_manager.pool_stats()['checkouts']
+        db.get_all_sender_accounts()
+        db.get_transaction_history('ACC1001')
+        db.get_daily_transaction_summary()
+        assert db_manager.pool_stats()['checkouts'] == checkouts
+        db_manager.close()
+
+def test_batch_transfers():
+    """Test batch settlement in both all-or-nothing and savepoint modes."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING BATCH TRANSFERS")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'batch.db'))
+        db_manager.seed_sample_data()
+        db = MoneyTransferDB(db_manager)
+        
+        transfers = [
+            {'sender_account': 'ACC1001', 'receiver_account': 'ACC2001', 'amount': 500.0, 'currency': 'INR'},
+            ('ACC1001', 'ACC2001', 700.0, 'INR', 'vijay@example.com', 'Payroll'),
+            {'sender_account': 'ACC1002', 'receiver_account': 'ACC2009', 'amount': 10.0, 'currency': 'INR'},
+        ]
+        
+        def record_progress(conn, results):
+            assert conn.in_transaction
+            conn.execute("INSERT INTO transfer_file_progress (source, output_path, fingerprint) "
+                         "VALUES ('batch', 'results', ?)", (str(len(results)),))
+        
+        results = db.process_transfers_batch(transfers, mode='all_or_nothing', on_batch=record_progress)
+        print(f"✅ All-or-nothing statuses: {[r['status'] for r in results]}")
+        assert all(r['status'] == 'FAILED' for r in results)
+        assert db.get_account_balance('ACC1001') == 90000.0
+        with db_manager.read() as conn:
+            assert conn.execute("SELECT fingerprint FROM transfer_file_progress WHERE source = 'batch'"
+                                ).fetchone()[0] == '3'
+        
+        results = db.process_transfers_batch(transfers, batch_size=2, mode='savepoint')
+        print(f"✅ Savepoint statuses: {[r['status'] for r in results]}")
+        assert [r['status'] for r in results] == ['SUCCESS', 'SUCCESS', 'FAILED']
+        assert results[1]['sender_balance_before'] == 89500.0
+        assert results[1]['receiver_daily_after'] == 10200.0
+        assert db.get_account_balance('ACC1001') == 88800.0
+        assert db.get_transaction_by_id(results[1]['transaction_id'])['amount'] == 700.0
+        
+        # Ids come from each insert, so rows added by triggers in between do not shift them
+        with db_manager.transaction() as conn:
+            conn.execute('''CREATE TRIGGER trg_test_fee AFTER INSERT ON transactions
+                            WHEN NEW.transaction_reason = 'Fee'
+                            BEGIN
+                                INSERT INTO transactions (sender_account, receiver_account, amount, currency,
+                                    transaction_reason, status, sender_balance_before, sender_balance_after,
+                                    receiver_daily_before, receiver_daily_after)
+                                VALUES (NEW.sender_account, NEW.receiver_account, 1, NEW.currency,
+                                    'Fee charge', 'FEE', 0, 0, 0, 0);
+                            END''')
+            conn.execute('''CREATE TRIGGER trg_test_reject BEFORE INSERT ON transactions
+                            WHEN NEW.transaction_reason = 'Reject'
+                            BEGIN SELECT RAISE(ABORT, 'rejected by audit'); END''')
+        fees = [('ACC1001', 'ACC2001', amount, 'INR', '', 'Fee') for amount in (11.0, 12.0, 13.0)]
+        results = db.process_transfers_batch(fees)
+        assert [db.get_transaction_by_id(r['transaction_id'])['amount'] for r in results] == [11.0, 12.0, 13.0]
+        
+        # A write error in all-or-nothing mode fails the batch instead of raising
+        results = db.process_transfers_batch(fees[:1] + [('ACC1001', 'ACC2001', 14.0, 'INR', '', 'Reject')])
+        print(f"✅ Rejected write statuses: {[r['status'] for r in results]}")
+        assert all(r['status'] == 'FAILED' and 'rejected by audit' in r['error'] for r in results)
+        assert db.get_account_balance('ACC1001') == 88764.0
+        db_manager.close()
+
+def test_concurrent_transfers_no_lost_updates():
+    """Test that many writer threads never lose a debit or credit."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING CONCURRENT TRANSFERS")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        thread_count, transfers_per_thread = 8, 25
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'concurrency.db'), pool_size=thread_count)
+        db_manager.seed_sample_data()
+        db = MoneyTransferDB(db_manager)
+        successes = []
+        errors = []
+        
+        def worker():
+            for _ in range(transfers_per_thread):
+                try:
+                    result = db.process_transfer('ACC1001', 'ACC2002', 100.0, 'INR', 'vijay@example.com')
+                    successes.append(result)
+                except Exception as e:
+                    errors.append(e)
+        
+        threads = [threading.Thread(target=worker) for _ in range(thread_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        total = thread_count * transfers_per_thread
+        print(f"✅ {len(successes)} of {total} transfers committed, {len(errors)} errors")
+        assert not errors
+        assert len(successes) == total
+        assert db.get_account_balance('ACC1001') == 90000.0 - 100.0 * total
+        assert db.get_receiver_account('ACC2002')['daily_received'] == 10000.0 + 100.0 * total
+        balances_after = sorted(r['sender_balance_after'] for r in successes)
+        assert len(set(balances_after)) == total
+        db_manager.close()
+
+def test_group_commit_writer():
+    """Test that queued transfers are committed in groups with per-transfer results."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING GROUP COMMIT WRITER")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'group.db'))
+        db_manager.seed_sample_data()
+        db = MoneyTransferDB(db_manager)
+        
+        with GroupCommitWriter(db, max_batch_size=50, max_wait_ms=20) as writer:
+            futures = [writer.submit('ACC1002', 'ACC2001', 1000.0, 'INR', 'rahul@example.com')
+                       for _ in range(60)]
+            results, errors = [], []
+            for future in futures:
+                try:
+                    results.append(future.result(timeout=10))
+                except ValueError as e:
+                    errors.append(str(e))
+            metrics = writer.metrics()
+        
+        print(f"✅ {len(results)} committed, {len(errors)} rejected, metrics: {metrics}")
+        assert len(results) == 50
+        assert errors[0] == "Insufficient balance. Available: 0.5, Required: 1000.0"
+        assert metrics['batches'] < len(futures)
+        assert metrics['queue_depth'] == 0
+        assert db.get_account_balance('ACC1002') == 0.5
+        
+        # A batch whose commit fails resolves every Future and frees its velocity reservations
+        db = MoneyTransferDB(db_manager, velocity=VelocityLimiter())
+        real_transaction = db_manager.transaction
+        
+        @contextmanager
+        def failing_commit(immediate=False):
+            with real_transaction(immediate) as conn:
+                yield conn
+                raise sqlite3.OperationalError("disk I/O error")
+        
+        with GroupCommitWriter(db, max_wait_ms=20) as writer:
+            db_manager.transaction = failing_commit
+            futures = [writer.submit('ACC1001', 'ACC2001', 10.0, 'INR', 'vijay@example.com') for _ in range(3)]
+            for future in futures:
+                try:
+                    future.result(timeout=10)
+                    assert False, "A transfer whose commit failed should not succeed"
+                except sqlite3.OperationalError:
+                    pass
+            del db_manager.transaction
+            assert db.velocity.usage('ACC1001', 'INR')['count'] == 0
+            assert writer.submit('ACC1001', 'ACC2001', 10.0, 'INR', 'vijay@example.com'
+                                 ).result(timeout=10)['status'] == 'SUCCESS'
+        print("✅ Failed commit released its reservations and the writer kept running")
+        
+        # A submit after stop() fails at once instead of queueing behind the stop marker
+        gate = threading.Event()
+        
+        @contextmanager
+        def gated_commit(immediate=False):
+            gate.wait(10)
+            with real_transaction(immediate) as conn:
+                yield conn
+        
+        db_manager.transaction = gated_commit
+        writer = GroupCommitWriter(db, max_wait_ms=0).start()
+        first = writer.submit('ACC1001', 'ACC2001', 10.0, 'INR', 'vijay@example.com')
+        writer.stop(timeout=0)
+        assert writer._thread.is_alive()
+        try:
+            writer.submit('ACC1001', 'ACC2001', 10.0, 'INR', 'vijay@example.com')
+            assert False, "A submit after stop() should be refused"
+        except RuntimeError:
+            pass
+        gate.set()
+        writer.stop()
+        del db_manager.transaction
+        assert first.result(timeout=10)['status'] == 'SUCCESS'
+        print("✅ Submits after stop() are refused and queued ones still commit")
+        db_manager.close()
+
+def test_async_facade_keeps_event_loop_responsive():
+    """Load-test the asyncio facade and measure event loop lag."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING ASYNC FACADE UNDER LOAD")
+    print("=" * 60)
+    
+    async def run_load(async_db):
+        max_lag = 0.0
+        done = asyncio.Event()
+        
+        async def heartbeat():
+            nonlocal max_lag
+            while not done.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(0.005)
+                max_lag = max(max_lag, time.perf_counter() - start - 0.005)
+        
+        ticker = asyncio.create_task(heartbeat())
+        reads = [async_db.get_sender_account('ACC1001') for _ in range(1000)]
+        reads += [async_db.get_daily_transaction_summary() for _ in range(200)]
+        writes = [async_db.process_transfer('ACC1001', 'ACC2001', 10.0, 'INR', 'vijay@example.com')
+                  for _ in range(50)]
+        results = await asyncio.gather(*reads, *writes)
+        done.set()
+        await ticker
+        return results, max_lag
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'async.db'), pool_size=5)
+        db_manager.seed_sample_data()
+        transfer_db = MoneyTransferDB(db_manager)
+        async_db = AsyncMoneyTransferDB(transfer_db, read_workers=4)
+        try:
+            results, max_lag = asyncio.run(run_load(async_db))
+        finally:
+            async_db.close()
+        
+        print(f"✅ {len(results)} calls completed, max event loop lag: {max_lag * 1000:.1f} ms")
+        assert all(r['status'] == 'SUCCESS' for r in results[-50:])
+        assert max_lag < 0.5
+        assert transfer_db.get_account_balance('ACC1001') == 90000.0 - 10.0 * 50
+        db_manager.close()
+
+def test_account_cache():
+    """Test that account lookups are cached and invalidated by writes."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING ACCOUNT CACHE")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'cache.db'))
+        db_manager.seed_sample_data()
+        db = MoneyTransferDB(db_manager, cache_capacity=1)
+        
+        for _ in range(5):
+            assert db.get_sender_account('ACC1001')['balance'] == 90000.0
+        assert db.verify_authentication('ACC1001', 'pass123')
+        db.process_transfer('ACC1001', 'ACC2001', 1000.0, 'INR', 'vijay@example.com')
+        assert db.get_account_balance('ACC1001') == 89000.0
+        assert db.get_receiver_account('ACC2001')['daily_received'] == 10000.0
+        db.update_sender_balance('ACC1001', 500.0)
+        assert db.check_sufficient_balance('ACC1001', 1000.0) is False
+        db.get_sender_account('ACC1002')
+        db.get_sender_account('nonexistent')
+        db.get_sender_account('ACC1001')
+        
+        stats = db.cache_stats()
+        print(f"✅ Cache stats: {stats}")
+        assert stats['sender']['hits'] >= 5
+        assert stats['sender']['evictions'] >= 1
+        assert stats['sender']['size'] == 1
+        
+        # Off by default, so writes through another instance show at once
+        reader, writer = MoneyTransferDB(db_manager), MoneyTransferDB(db_manager)
+        assert reader.get_account_balance('ACC1002') == 50000.5
+        writer.update_sender_balance('ACC1002', 123.0)
+        assert reader.get_account_balance('ACC1002') == 123.0
+        db_manager.close()
+
+def test_daily_limit_rollover_is_write_free():
+    """Test that stale receiver counters read as zero and roll over lazily."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING DAILY LIMIT ROLLOVER")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'rollover.db'))
+        db_manager.seed_sample_data()
+        with db_manager.transaction() as conn:
+            conn.execute("UPDATE receiver_accounts SET last_reset_date = '2000-01-01'")
+        db = MoneyTransferDB(db_manager, cache_capacity=0)
+        
+        receiver = db.get_receiver_account('ACC2001')
+        assert receiver['daily_received'] == 0.0
+        with db_manager.transaction() as conn:
+            stored = conn.execute("SELECT daily_received FROM receiver_accounts WHERE account_number = 'ACC2001'").fetchone()
+        assert stored[0] == 900000  # minor units
+        
+        result = db.process_transfer('ACC1001', 'ACC2001', 90000.0, 'INR', 'vijay@example.com')
+        assert result['receiver_daily_before'] == 0.0
+        assert result['receiver_daily_after'] == 90000.0
+        
+        rolled_over = db.rollover_daily_limits()
+        print(f"✅ Rolled over {rolled_over} stale receiver(s)")
+        assert rolled_over == 1
+        assert db.get_receiver_account('ACC2002')['daily_received'] == 0.0
+        db_manager.close()
+
+def test_daily_rollups():
+    """Test that daily rollups track inserts and can be rebuilt from history."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING DAILY ROLLUPS")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'rollups.db'))
+        db_manager.seed_sample_data()
+        db = MoneyTransferDB(db_manager)
+        
+        db.process_transfer('ACC1001', 'ACC2001', 1000.0, 'INR', 'vijay@example.com')
+        db.process_transfers_batch([('ACC1002', 'ACC2002', 250.5, 'INR'), ('ACC1002', 'ACC2002', 100.0, 'INR')])
+        db.log_failed_transaction('ACC1001', 'ACC2001', 5.0, 'INR', '', 'Test failure')
+        
+        with db_manager.transaction() as conn:
+            day = conn.execute('SELECT DATE(MAX(transaction_timestamp)) FROM transactions').fetchone()[0]
+        summary = db.get_daily_transaction_summary(day)
+        print(f"✅ Summary from rollups: {summary}")
+        assert summary['total_transactions'] == 3
+        assert summary['total_amount'] == 1350.5
+        
+        before = db.get_transaction_summary_range(day, day)
+        assert db.rebuild_daily_rollups() == 2
+        assert db.get_transaction_summary_range(day, day) == before
+        assert [r['status'] for r in before] == ['FAILED', 'SUCCESS']
+        assert db.get_transaction_summary_range(day, day, status='FAILED')[0]['total_transactions'] == 1
+        db_manager.close()
+
+def test_keyset_paginated_history():
+    """Test that history pages are disjoint, ordered and exhaust the account."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING KEYSET PAGINATION")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'history.db'))
+        db_manager.seed_sample_data()
+        db = MoneyTransferDB(db_manager)
+        db.process_transfers_batch([('ACC1001', 'ACC2001', 10.0, 'INR')] * 25)
+        db.log_failed_transaction('ACC1001', 'ACC2001', 5.0, 'INR', '', 'Test failure')
+        
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = db.get_transaction_history_page('ACC1001', limit=10, cursor=cursor, status='SUCCESS')
+            seen.extend(txn['transaction_id'] for txn in page['transactions'])
+            pages += 1
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        
+        print(f"✅ Read {len(seen)} transaction(s) in {pages} page(s)")
+        assert len(seen) == 25
+        assert seen == sorted(seen, reverse=True)
+        
+        # An exactly full last page ends the walk instead of handing out a cursor
+        page = db.get_transaction_history_page('ACC1001', limit=5, status='SUCCESS')
+        for _ in range(4):
+            page = db.get_transaction_history_page('ACC1001', limit=5, cursor=page['next_cursor'],
+                                                   status='SUCCESS')
+        assert len(page['transactions']) == 5
+        assert page['next_cursor'] is None
+        assert len(db.get_transaction_history('ACC2001', 'receiver', 100)) == 26
+        assert db.get_transaction_history('ACC1001', start_date='2000-01-01', end_date='2000-12-31') == []
+        db_manager.close()
+
+def test_streaming_export():
+    """Test CSV/JSONL export with filters and gzip compression."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING STREAMING EXPORT")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'export.db'))
+        db_manager.seed_sample_data()
+        db = MoneyTransferDB(db_manager)
+        db.process_transfers_batch([('ACC1001', 'ACC2001', 10.0, 'INR')] * 7 + [('ACC1002', 'ACC2002', 1.0, 'INR')])
+        db.log_failed_transaction('ACC1001', 'ACC2001', 5.0, 'INR', '', 'Test failure')
+        
+        csv_path = os.path.join(tmp_dir, 'ledger.csv.gz')
+        exported = export_to_path(db_manager, csv_path, chunk_size=3)
+        with gzip.open(csv_path, 'rt', newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert exported == len(rows) == 9
+        
+        jsonl_path = os.path.join(tmp_dir, 'ledger.jsonl')
+        exported = export_to_path(db_manager, jsonl_path, account='ACC1001', status='SUCCESS', chunk_size=2)
+        with open(jsonl_path) as f:
+            records = [json.loads(line) for line in f]
+        print(f"✅ Exported {len(rows)} CSV row(s) and {len(records)} filtered JSONL record(s)")
+        assert exported == len(records) == 7
+        assert all(r['sender_account'] == 'ACC1001' and r['status'] == 'SUCCESS' for r in records)
+        db_manager.close()
+
+def test_benchmark_harness_smoke():
+    """Run the benchmark harness at a tiny scale."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING BENCHMARK HARNESS")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        create_benchmark_database(db_path, senders=20, receivers=20, history_rows=200).close()
+        transfers = run_transfer_benchmark(db_path, transfers=40, threads=2, senders=20, receivers=20, skew='hot')
+        reads = run_read_benchmark(db_path, operations=10, senders=20)
+        print(f"✅ {transfers['commits']} commits at {transfers['tps']:.0f} TPS, p99 {transfers['p99_ms']:.2f} ms")
+        assert transfers['commits'] == 40
+        assert transfers['lock_errors'] == 0
+        assert set(reads) == {'get_sender_account', 'get_transaction_history', 'get_daily_transaction_summary'}
+        json.dumps({'transfers': transfers, 'reads': reads})
+
+def test_query_instrumentation():
+    """Test statement timing, row counts and per-API attribution."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING QUERY INSTRUMENTATION")
+    print("=" * 60)
+    
+    assert normalize_sql("SELECT *  FROM t WHERE a = 'x' AND b IN (?, ?, ?) LIMIT 5") == \
+        'SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?'
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        collector = InMemoryCollector()
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'traced.db'), instrumentation=collector)
+        db_manager.seed_sample_data()
+        db = MoneyTransferDB(db_manager, cache_capacity=0)
+        collector.reset()
+        
+        db.process_transfer('ACC1001', 'ACC2001', 10.0, 'INR', 'vijay@example.com')
+        db.check_sufficient_balance('ACC1001', 5.0)
+        assert len(db.get_all_sender_accounts()) == 2
+        
+        snapshot = collector.snapshot()
+        print(f"✅ Traced {len(snapshot['statements'])} distinct statement(s) across APIs {sorted(snapshot['apis'])}")
+        assert set(snapshot['apis']) == {'process_transfer', 'check_sufficient_balance', 'get_all_sender_accounts'}
+        assert snapshot['apis']['process_transfer']['statements'] == 5
+        assert snapshot['transactions']['count'] == 3
+        assert snapshot['connection_acquire']['count'] == 3
+        listing = [s for s in snapshot['statements'] if s['sql'].startswith('SELECT * FROM sender_accounts ORDER')]
+        assert listing[0]['rows'] == 2
+        
+        events = []
+        db_manager.instrumentation = CallbackCollector(lambda kind, payload: events.append(kind))
+        db.get_transaction_by_id(1)
+        assert events.count('statement') == 1 and 'api' in events
+        db_manager.close()
+
+def test_sharded_transfers_and_recovery():
+    """Test cross-shard two-phase commit, crash recovery and resharding."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING SHARDED STORAGE")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        shard_dir = os.path.join(tmp_dir, 'shards')
+        db = ShardedMoneyTransferDB(shard_dir, shard_count=3)
+        db.seed_sample_data()
+        assert shard_index('ACC1001', 3) != shard_index('ACC2001', 3)
+        
+        result = db.process_transfer('ACC1001', 'ACC2001', 1000.0, 'INR', 'vijay@example.com')
+        assert result['sender_balance_after'] == 89000.0
+        assert result['receiver_daily_after'] == 10000.0
+        assert db.get_transaction_history('ACC2001', 'receiver')[0]['amount'] == 1000.0
+        try:
+            db.process_transfer('ACC1001', 'ACC2002', 45000.0, 'INR', 'vijay@example.com')
+            assert False, "Transfer over the receiver limit should fail"
+        except ValueError as e:
+            assert str(e) == "Receiver daily limit exceeded. Remaining limit: 40000.0"
+        try:
+            db.process_transfer('ACC1001', 'ACC2001', 1000, 'JPY', 'vijay@example.com')
+            assert False, "Transfer in another currency should fail"
+        except ValueError as e:
+            assert str(e) == "Currency mismatch. Account ACC2001 holds INR, not JPY"
+        assert db.get_account_balance('ACC1001') == 89000.0
+        
+        # Simulate crashes: one transfer committed on the sender's shard, one
+        # only prepared (the two-phase protocol works in minor units)
+        s_shard, r_shard = shard_index('ACC1001', 3), shard_index('ACC2001', 3)
+        credit = db._prepare_credit('crash-commit', r_shard, s_shard, 'ACC2001', 1000, 'INR')
+        committed = {'sender_account': 'ACC1001', 'receiver_account': 'ACC2001', 'amount': 1000,
+                     'currency': 'INR', 'transaction_reason': None,
+                     'receiver_daily_before': credit['value_before'], 'receiver_daily_after': credit['value_after']}
+        db._commit_debit('crash-commit', s_shard, committed)
+        db._prepare_credit('crash-abort', r_shard, s_shard, 'ACC2001', 50000, 'INR')
+        db.close()
+        
+        # Startup recovery leaves young transfers to the instance that may still own them,
+        # and with nothing old enough to resolve it writes to no shard
+        db = ShardedMoneyTransferDB(shard_dir, shard_count=3, recover=False)
+        writes = []
+        
+        def counting(manager):
+            original = manager.transaction
+            
+            @contextmanager
+            def transaction(*args, **kwargs):
+                writes.append(manager.db_path)
+                with original(*args, **kwargs) as conn:
+                    yield conn
+            return transaction
+        
+        for shard in db.shards:
+            shard.db_manager.transaction = counting(shard.db_manager)
+        assert db.recover() == {'committed': 0, 'aborted': 0}
+        assert writes == []
+        for shard in db.shards:
+            del shard.db_manager.transaction
+        assert db.get_receiver_account('ACC2001')['daily_received'] == 10510.0
+        outcome = db.recover(older_than_seconds=0)
+        print(f"✅ Recovery outcome: {outcome}")
+        assert outcome == {'committed': 1, 'aborted': 1}
+        assert db.get_account_balance('ACC1001') == 88990.0
+        assert db.get_receiver_account('ACC2001')['daily_received'] == 10010.0
+        assert len(db.get_transaction_history('ACC1001')) == 2
+        try:
+            db._commit_debit('crash-abort', s_shard, dict(committed))
+            assert False, "A transfer aborted by recovery must not commit"
+        except ValueError as e:
+            assert "aborted by recovery" in str(e)
+        assert db.get_account_balance('ACC1001') == 88990.0
+        db.close()
+        
+        target_dir = os.path.join(tmp_dir, 'resharded')
+        copied = reshard([os.path.join(shard_dir, f'shard_{i:03d}.db') for i in range(3)], target_dir, 2)
+        assert copied == {'sender_accounts': 2, 'receiver_accounts': 2, 'transactions': 2}
+        resharded = ShardedMoneyTransferDB(target_dir, shard_count=2)
+        assert resharded.get_account_balance('ACC1001') == 88990.0
+        assert resharded.get_daily_transaction_summary(
+            resharded.get_transaction_history('ACC1001')[0]['transaction_timestamp'][:10])['total_amount'] == 1010.0
+        resharded.close()
+        
+        # The MoneyTransferDB options: idempotency keys, velocity limits and history cursors
+        keyed_dir = os.path.join(tmp_dir, 'keyed')
+        limits = {'default': {'window_seconds': 60, 'buckets': 6, 'max_count': 2, 'max_amount': None}}
+        keyed = ShardedMoneyTransferDB(keyed_dir, shard_count=3, velocity=VelocityLimiter(limits))
+        keyed.seed_sample_data()
+        first = keyed.process_transfer('ACC1001', 'ACC2001', 100.0, 'INR', '', idempotency_key='shard-key')
+        assert keyed.process_transfer('ACC1001', 'ACC2001', 100.0, 'INR', '', idempotency_key='shard-key') == first
+        try:
+            keyed.process_transfer('ACC1001', 'ACC2001', 200.0, 'INR', '', idempotency_key='shard-key')
+            assert False, "A reused key for another transfer should fail"
+        except ValueError as e:
+            assert "already used" in str(e)
+        keyed.process_transfer('ACC1001', 'ACC2002', 100.0, 'INR', '')
+        try:
+            keyed.process_transfer('ACC1001', 'ACC2002', 100.0, 'INR', '')
+            assert False, "Third transfer in the window should be refused"
+        except ValueError as e:
+            assert str(e).startswith("Velocity limit exceeded")
+        assert keyed.get_account_balance('ACC1001') == 89800.0
+        newest = keyed.get_transaction_history('ACC1001', 'sender', 1)
+        older = keyed.get_transaction_history_page('ACC1001', 'sender', 1)['next_cursor']
+        assert keyed.get_transaction_history('ACC1001', 'sender', 1, older)[0]['amount'] == 100.0
+        assert newest[0]['receiver_account'] == 'ACC2002'
+        try:
+            keyed.get_transaction_history('ACC2001', 'receiver', 1, older)
+            assert False, "Receiver history cannot take a cursor"
+        except ValueError:
+            pass
+        keyed.close()
+        keyed = ShardedMoneyTransferDB(keyed_dir, shard_count=3, velocity=VelocityLimiter(limits))
+        assert keyed.velocity.usage('ACC1001', 'INR')['count'] == 2
+        keyed.close()
+        try:
+            reshard([os.path.join(keyed_dir, f'shard_{i:03d}.db') for i in range(3)],
+                    os.path.join(tmp_dir, 'rekeyed'), 2)
+            assert False, "Idempotency keys should block resharding"
+        except ValueError as e:
+            print(f"✅ Reshard refused: {e}")
+        assert not os.path.exists(os.path.join(tmp_dir, 'rekeyed'))
+
+def test_transaction_archive():
+    """Test that archived months stay visible to history, lookups and summaries."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING TRANSACTION ARCHIVE")
+    print("=" * 60)
+    
+    def full_history(db, account, account_type):
+        rows, cursor = [], None
+        while True:
+            page = db.get_transaction_history_page(account, account_type, limit=7, cursor=cursor)
+            rows.extend(page['transactions'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                return rows
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = create_benchmark_database(os.path.join(tmp_dir, 'archive.db'), senders=5,
+                                               receivers=5, history_rows=600)
+        db = MoneyTransferDB(db_manager)
+        with db_manager.transaction() as conn:
+            first_day, last_day = conn.execute(
+                'SELECT DATE(MIN(transaction_timestamp)), DATE(MAX(transaction_timestamp)) FROM transactions'
+            ).fetchone()
+            before = conn.execute(
+                'SELECT DATE(transaction_timestamp) FROM transactions ORDER BY transaction_timestamp LIMIT 1 OFFSET 400'
+            ).fetchone()[0]
+        history = full_history(db, 'S00000001', 'sender')
+        received = full_history(db, 'R00000002', 'receiver')
+        summaries = db.get_transaction_summary_range(first_day, last_day)
+        
+        archiver = TransactionArchiver(db_manager, batch_size=50)
+        partial = archiver.archive(before, max_batches=3)
+        assert partial['batches'] == 3 and 0 < partial['total'] <= 150
+        rest = archiver.archive(before)
+        print(f"✅ Archived {partial['total']} + {rest['total']} rows into {len(archiver.partitions())} month(s)")
+        assert archiver.archive(before)['total'] == 0
+        with db_manager.transaction() as conn:
+            hot = conn.execute('SELECT COUNT(*) FROM transactions').fetchone()[0]
+        assert hot == 600 - partial['total'] - rest['total'] and hot < 250
+        assert sum(p['row_count'] for p in archiver.partitions()) == 600 - hot
+        
+        assert full_history(db, 'S00000001', 'sender') == history
+        assert full_history(db, 'R00000002', 'receiver') == received
+        assert db.get_transaction_history('S00000001', start_date=first_day, end_date=before) == \
+            [row for row in history if row['transaction_timestamp'] < before][:10]
+        assert db.get_transaction_by_id(history[-1]['transaction_id']) == history[-1]
+        assert db.get_transaction_summary_range(first_day, last_day) == summaries
+        db.rebuild_daily_rollups()
+        assert db.get_transaction_summary_range(first_day, last_day) == summaries
+        print("✅ History, lookups and rebuilt summaries match the pre-archive data")
+        db_manager.close()
+
+def test_bulk_account_loader():
+    """Test chunked bulk loading with validation, index deferral and resume."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING BULK ACCOUNT LOADER")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'bulk.db'))
+        with db_manager.transaction() as conn:
+            conn.execute('CREATE INDEX idx_sender_currency ON sender_accounts(currency)')
+        
+        path = os.path.join(tmp_dir, 'senders.csv')
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['account_number', 'authentication_credential', 'balance', 'contact_information', 'currency'])
+            for i in range(1000):
+                writer.writerow([f'BULK{i:05d}', f'pass{i}', 100.0 + i, f'bulk{i}@example.com', 'inr'])
+            writer.writerow(['BULKBAD', 'pass', '-1', 'bad@example.com', 'INR'])
+        
+        def interrupt(report):
+            raise KeyboardInterrupt
+        
+        try:
+            load_accounts(db_manager, path, 'sender', chunk_size=300, progress=interrupt)
+            assert False, "Load should have been interrupted"
+        except KeyboardInterrupt:
+            pass
+        with db_manager.read() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM sender_accounts').fetchone()[0] == 300
+            assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_sender_currency'").fetchone() is None
+        
+        rejects = os.path.join(tmp_dir, 'rejects.jsonl')
+        report = load_accounts(db_manager, path, 'sender', chunk_size=300, rejects_path=rejects)
+        print(f"✅ Resumed load: {report}")
+        assert report['resumed_from'] == 300
+        assert report['loaded'] == 1000 and report['rejected'] == 1
+        with open(rejects) as f:
+            assert 'balance' in json.loads(f.readline())['error']
+        
+        db = MoneyTransferDB(db_manager)
+        assert db.get_sender_account('BULK00999')['currency'] == 'INR'
+        with db_manager.read() as conn:
+            assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_sender_currency'").fetchone()
+            assert conn.execute('SELECT COUNT(*) FROM bulk_load_progress').fetchone()[0] == 0
+        assert load_accounts(db_manager, path, 'sender')['loaded'] == 0
+        db_manager.close()
+
+def test_failure_log_writer():
+    """Test batched failure logging, flush on stop and each overflow policy."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING FAILURE LOG WRITER")
+    print("=" * 60)
+    
+    def failed_rows(db_manager):
+        with db_manager.read() as conn:
+            return conn.execute("SELECT COUNT(*) FROM transactions WHERE status = 'FAILED'").fetchone()[0]
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'failures.db'))
+        db_manager.seed_sample_data()
+        
+        writer = FailureLogWriter(db_manager, max_batch_size=50, flush_interval=0.05)
+        db = MoneyTransferDB(db_manager, failure_log=writer.start())
+        
+        def burst():
+            for _ in range(40):
+                db.log_failed_transaction('ACC1001', 'ACC2001', 5.0, 'INR', '', 'Daily limit exceeded')
+        
+        threads = [threading.Thread(target=burst) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert writer.flush(timeout=5)
+        assert failed_rows(db_manager) == 120
+        db.log_failed_transaction('ACC1002', 'ACC2002', 5.0, 'INR', '', 'Queued at shutdown')
+        writer.stop()
+        metrics = writer.metrics()
+        print(f"✅ Failure log metrics: {metrics}")
+        assert failed_rows(db_manager) == 121
+        assert metrics['written'] == 121 and metrics['batches'] < 121
+        
+        # Records logged before start() or after stop() are written inline, even with a full 'block' queue
+        idle = FailureLogWriter(db_manager, max_queue_size=1)
+        for _ in range(3):
+            idle.log('ACC1001', 'ACC2001', 5.0, 'INR', '', 'Logged while stopped')
+        writer.log('ACC1001', 'ACC2001', 5.0, 'INR', '', 'Logged after stop')
+        assert idle.metrics()['written'] == 3 and idle.metrics()['queue_depth'] == 0
+        assert failed_rows(db_manager) == 125
+        
+        # A writer stuck on its first record lets the queue fill
+        release = threading.Event()
+        
+        class StalledWriter(FailureLogWriter):
+            def _write(self, batch, replayed=False):
+                release.wait()
+                return super()._write(batch, replayed)
+        
+        def fill(stalled, error_message):
+            stalled.start()
+            stalled.log('ACC1001', 'ACC2001', 5.0, 'INR', '', error_message)
+            while stalled.metrics()['queue_depth']:
+                time.sleep(0.01)
+            for _ in range(8):
+                stalled.log('ACC1001', 'ACC2001', 5.0, 'INR', '', error_message)
+            release.set()
+            stalled.stop()
+            release.clear()
+        
+        dropping = StalledWriter(db_manager, max_batch_size=1, max_queue_size=5, overflow='drop')
+        fill(dropping, 'Dropped on overflow')
+        assert dropping.metrics()['dropped'] == 3
+        assert failed_rows(db_manager) == 131
+        
+        spill_path = os.path.join(tmp_dir, 'failures.spill.jsonl')
+        spilling = StalledWriter(db_manager, max_batch_size=1, max_queue_size=5, overflow='spill',
+                                 spill_path=spill_path)
+        fill(spilling, 'Spilled on overflow')
+        metrics = spilling.metrics()
+        print(f"✅ Spill metrics: {metrics}")
+        assert metrics['spilled'] == 3 and metrics['replayed'] == 3
+        assert failed_rows(db_manager) == 140
+        assert not os.path.exists(spill_path)
+        
+        # A record the table refuses costs only itself, in a batch and in a spill replay
+        strict = FailureLogWriter(db_manager, overflow='spill', spill_path=spill_path).start()
+        for index in range(11):
+            strict.log('ACC1001', 'NOPE' if index == 5 else 'ACC2001', 5.0, 'INR', '', 'Mixed batch')
+        assert strict.flush(timeout=5)
+        strict.stop()
+        assert strict.metrics()['written'] == 10 and strict.metrics()['rejected'] == 1
+        with open(spill_path, 'w', encoding='utf-8') as f:
+            for receiver in ('ACC2001', 'NOPE'):
+                f.write(json.dumps(['ACC1001', receiver, 500, 'INR', 'FAILED: Spilled', '2024-01-01 00:00:00']) + '\n')
+        strict.start().stop()
+        assert strict.metrics()['replayed'] == 1 and strict.metrics()['rejected'] == 2
+        assert not os.path.exists(spill_path) and not os.path.exists(spill_path + '.replay')
+        assert failed_rows(db_manager) == 151
+        db_manager.close()
+
+def test_headless_transfer_file():
+    """Test streaming a transfer file through steps 1-8 with checkpointed resume."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING HEADLESS TRANSFER FILE")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'headless.db'))
+        db_manager.seed_sample_data()
+        db = MoneyTransferDB(db_manager)
+        
+        good = {'sender': 'ACC1001', 'credential': 'pass123', 'receiver': 'ACC2001', 'amount': 10,
+                'currency': 'inr', 'contact': 'vijay@example.com', 'reason': 'rent'}
+        instructions = [good] * 25 + [
+            dict(good, credential='wrong'),
+            dict(good, receiver='NOPE'),
+            dict(good, amount='ten'),
+            dict(good, contact='other@example.com'),
+            dict(good, amount=95000),
+        ] + [good] * 5
+        input_path = os.path.join(tmp_dir, 'transfers.jsonl')
+        with open(input_path, 'w') as f:
+            f.writelines(json.dumps(instruction) + '\n' for instruction in instructions)
+            f.write('{not json\n')
+        output_path = os.path.join(tmp_dir, 'results.jsonl')
+        
+        def crash(report):
+            if report['lines_done'] >= 20:
+                raise KeyboardInterrupt
+        
+        try:
+            process_transfer_file(input_path, output_path, db, chunk_size=10, progress=crash)
+            assert False, "Run should have been interrupted"
+        except KeyboardInterrupt:
+            pass
+        assert db.get_account_balance('ACC1001') == 90000.0 - 200
+        
+        report = process_transfer_file(input_path, output_path, db, chunk_size=10)
+        print(f"✅ Resumed run: {report}")
+        assert report['resumed_from'] == 20 and report['completed']
+        assert report['succeeded'] == 30 and report['failed'] == 6
+        with open(output_path) as f:
+            results = [json.loads(line) for line in f]
+        assert [r['line'] for r in results] == list(range(1, 37))
+        errors = [r['error'] for r in results if r['status'] == 'FAILED']
+        assert errors[0] == "Invalid authentication credentials"
+        assert "Insufficient balance" in errors[4] and errors[-1].startswith("Expecting property name")
+        assert db.get_account_balance('ACC1001') == 90000.0 - 300
+        
+        again = process_transfer_file(input_path, output_path, db, chunk_size=10)
+        assert again['already_completed'] and again['lines_done'] == 36
+        assert db.get_account_balance('ACC1001') == 90000.0 - 300
+        print("✅ Completed file is not settled twice")
+        db_manager.close()
+
+def test_idempotency_keys():
+    """Test that retried transfers with the same key replay instead of moving money twice."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING IDEMPOTENCY KEYS")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'idempotency.db'))
+        db_manager.seed_sample_data()
+        db = MoneyTransferDB(db_manager)
+        
+        first = db.process_transfer('ACC1001', 'ACC2001', 250.0, 'INR', 'vijay@example.com', 'Rent', 'req-1')
+        retry = db.process_transfer('ACC1001', 'ACC2001', 250.0, 'INR', 'vijay@example.com', 'Rent', 'req-1')
+        print(f"✅ Retry replayed transaction {retry['transaction_id']}")
+        assert retry == first
+        assert db.get_account_balance('ACC1001') == 90000.0 - 250
+        try:
+            db.process_transfer('ACC1001', 'ACC2001', 999.0, 'INR', 'vijay@example.com', None, 'req-1')
+            assert False, "Reusing a key for another transfer should fail"
+        except ValueError as e:
+            assert "already used for a different transfer" in str(e)
+        
+        batch = [
+            {'sender_account': 'ACC1001', 'receiver_account': 'ACC2001', 'amount': 250.0,
+             'currency': 'INR', 'idempotency_key': 'req-1'},
+            {'sender_account': 'ACC1001', 'receiver_account': 'ACC2002', 'amount': 100.0,
+             'currency': 'INR', 'idempotency_key': 'req-2'},
+            {'sender_account': 'ACC1001', 'receiver_account': 'ACC2002', 'amount': 100.0,
+             'currency': 'INR', 'idempotency_key': 'req-2'},
+            {'sender_account': 'ACC1001', 'receiver_account': 'ACC2002', 'amount': 5.0,
+             'currency': 'INR', 'idempotency_key': 'req-2'},
+        ]
+        results = db.process_transfers_batch(batch, mode='savepoint')
+        print(f"✅ Batch statuses: {[r['status'] for r in results]}")
+        assert [r['status'] for r in results] == ['SUCCESS', 'SUCCESS', 'SUCCESS', 'FAILED']
+        assert results[0]['transaction_id'] == first['transaction_id']
+        assert results[2]['transaction_id'] == results[1]['transaction_id']
+        assert db.get_account_balance('ACC1001') == 90000.0 - 350
+        
+        with GroupCommitWriter(db, max_wait_ms=20) as writer:
+            futures = [writer.submit('ACC1001', 'ACC2002', 100.0, 'INR', 'vijay@example.com', None, 'req-2'),
+                       writer.submit('ACC1001', 'ACC2001', 40.0, 'INR', 'vijay@example.com', None, 'req-3'),
+                       writer.submit('ACC1001', 'ACC2001', 40.0, 'INR', 'vijay@example.com', None, 'req-3')]
+            replayed, once, twice = [future.result(timeout=10) for future in futures]
+        assert replayed['transaction_id'] == results[1]['transaction_id']
+        assert once == twice
+        assert db.get_account_balance('ACC1001') == 90000.0 - 390
+        
+        with db_manager.transaction() as conn:
+            conn.execute("UPDATE idempotency_keys SET created_at = DATETIME('now', '-2 days') "
+                         "WHERE idempotency_key = 'req-1'")
+        DailyRolloverJob(db).run_once()
+        with db_manager.read() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM idempotency_keys').fetchone()[0] == 3
+        assert IdempotencyKeyPurgeJob(db).run_once() == 1
+        db.process_transfer('ACC1001', 'ACC2001', 250.0, 'INR', 'vijay@example.com', 'Rent', 'req-1')
+        assert db.get_account_balance('ACC1001') == 90000.0 - 640
+        print("✅ Expired keys are purged and no longer replay")
+        db_manager.close()
+
+def test_ledger_engine_matches_sqlite_path():
+    """Test that the journaled in-memory ledger gives the same results and recovers after a crash."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING LEDGER ENGINE")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        transfers = [('ACC1001', 'ACC2001', 500.0), ('ACC1002', 'ACC2001', 600.0),
+                     ('ACC1001', 'ACC2009', 1.0), ('ACC1001', 'ACC2002', 95000.0),
+                     ('ACC1002', 'ACC2002', 0.25)]
+        
+        def run(db):
+            outcomes = []
+            for sender, receiver, amount in transfers:
+                try:
+                    outcomes.append(db.process_transfer(sender, receiver, amount, 'INR', '', 'Rent'))
+                except ValueError as e:
+                    outcomes.append(str(e))
+                    db.log_failed_transaction(sender, receiver, amount, 'INR', 'Rent', str(e))
+            outcomes.append(db.process_transfers_batch([t + ('INR',) for t in transfers], mode='savepoint'))
+            return outcomes
+        
+        plain_manager = DatabaseManager(os.path.join(tmp_dir, 'plain.db'))
+        plain_manager.seed_sample_data()
+        expected = run(MoneyTransferDB(plain_manager))
+        
+        ledger_manager = DatabaseManager(os.path.join(tmp_dir, 'ledger.db'))
+        ledger_manager.seed_sample_data()
+        journal_dir = os.path.join(tmp_dir, 'journal')
+        ledger = LedgerMoneyTransferDB(ledger_manager, journal_dir, checkpoint_interval=3600)
+        assert run(ledger) == expected
+        assert ledger.get_account_balance('ACC1001') == 90000.0 - 1000
+        assert ledger.get_transaction_by_id(expected[0]['transaction_id'])['amount'] == 500.0
+        print(f"✅ Ledger results match process_transfer: {ledger.ledger_stats()['journal']}")
+        
+        # Simulate a crash: nothing was checkpointed, and the last line is torn
+        ledger.close(checkpoint=False)
+        with open(ledger._journal.path, 'a') as f:
+            f.write('[99,"ACC10')
+        recovered = LedgerMoneyTransferDB(ledger_manager, journal_dir)
+        print(f"✅ Replayed {recovered.recovered} journal record(s)")
+        assert recovered.recovered == 7
+        recovered.close()
+        
+        queries = [
+            '''SELECT transaction_id, sender_account, receiver_account, amount, status, transaction_reason,
+                      sender_balance_before, sender_balance_after, receiver_daily_before, receiver_daily_after
+               FROM transactions ORDER BY transaction_id''',
+            'SELECT account_number, balance FROM sender_accounts ORDER BY account_number',
+            'SELECT account_number, daily_received, last_reset_date FROM receiver_accounts ORDER BY account_number',
+            'SELECT * FROM daily_transaction_rollups ORDER BY summary_date, currency, status',
+        ]
+        with plain_manager.read() as plain, ledger_manager.read() as replayed:
+            for query in queries:
+                assert [tuple(r) for r in plain.execute(query)] == [tuple(r) for r in replayed.execute(query)]
+        print("✅ Checkpointed tables match the SQLite path")
+        plain_manager.close()
+        ledger_manager.close()
+
+def test_ledger_publishes_only_durable_transfers():
+    """Test that ledger lookups wait for the fsync, a failed fsync rolls back and clean accounts are evicted."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING LEDGER DURABILITY")
+    print("=" * 60)
+    
+    class StalledFile:
+        """Journal file whose writes wait for ``release`` and then fail if ``fail`` is set."""
+        
+        def __init__(self, f):
+            self.f, self.release, self.fail = f, threading.Event(), False
+        
+        def write(self, data):
+            self.release.wait(10)
+            if self.fail:
+                raise OSError("No space left on device")
+            return self.f.write(data)
+        
+        def __getattr__(self, name):
+            return getattr(self.f, name)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'durable.db'))
+        db_manager.seed_sample_data()
+        journal_dir = os.path.join(tmp_dir, 'journal')
+        ledger = LedgerMoneyTransferDB(db_manager, journal_dir, checkpoint_interval=3600)
+        ledger.process_transfer('ACC1001', 'ACC2001', 100.0, 'INR', '', None, 'key-1')
+        assert ledger.checkpoint() == 1
+        assert ledger.ledger_stats()['accounts_in_memory'] == 0
+        assert ledger.get_account_balance('ACC1001') == 89900.0
+        daily_received = ledger.get_receiver_account('ACC2001')['daily_received']
+        
+        stalled = StalledFile(ledger._journal._file)
+        ledger._journal._file = stalled
+        worker = threading.Thread(target=ledger.process_transfer, args=('ACC1001', 'ACC2001', 200.0, 'INR', ''))
+        worker.start()
+        while ledger.ledger_stats()['journal']['pending'] == 0:
+            time.sleep(0.001)
+        assert ledger.get_account_balance('ACC1001') == 89900.0
+        assert ledger.get_receiver_account('ACC2001')['daily_received'] == daily_received
+        stalled.release.set()
+        worker.join()
+        assert ledger.get_account_balance('ACC1001') == 89700.0
+        print("✅ Lookups see a transfer only once its journal line is fsynced")
+        
+        stalled.fail = True
+        try:
+            ledger.process_transfer('ACC1001', 'ACC2001', 300.0, 'INR', '', None, 'key-2')
+            assert False, "a failed fsync must fail the transfer"
+        except RuntimeError:
+            pass
+        assert ledger.get_account_balance('ACC1001') == 89700.0
+        assert ledger._balances['ACC1001'] == to_minor_units(89700.0, 'INR')
+        assert ledger.ledger_stats()['pending'] == 1
+        ledger.close(checkpoint=False)
+        
+        recovered = LedgerMoneyTransferDB(db_manager, journal_dir)
+        assert recovered.recovered == 1
+        assert recovered.get_account_balance('ACC1001') == 89700.0
+        print("✅ A failed fsync rolls the transfer back and recovery replays only synced ones")
+        recovered.close()
+        db_manager.close()
+
+def test_ledger_reconciliation():
+    """Test that reconciliation finds broken balance chains and stale stored balances."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING LEDGER RECONCILIATION")
+    print("=" * 60)
+    
+    try:
+        import numpy
+    except ImportError:
+        print("⚠️  NumPy is not installed; skipping reconciliation test")
+        return
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'reconcile.db')
+        db_manager = DatabaseManager(db_path)
+        db_manager.seed_sample_data()
+        db = MoneyTransferDB(db_manager)
+        db.process_transfers_batch([('ACC1001', 'ACC2001', 10.0 + i, 'INR') for i in range(30)]
+                                   + [('ACC1002', 'ACC2002', 5.0, 'INR')] * 30, mode='savepoint')
+        
+        clean = reconcile(db_path, workers=1, partitions=2, chunk_size=7)
+        print(f"✅ Clean ledger: {clean['rows']} rows, {clean['total_breaks']} breaks")
+        assert clean['rows'] == 120 and clean['total_breaks'] == 0
+        
+        db.update_sender_balance('ACC1002', 1.0)
+        with db_manager.transaction() as conn:
+            conn.execute('UPDATE transactions SET sender_balance_after = sender_balance_after - 1 '
+                         'WHERE transaction_id = 12')
+        report = reconcile(db_path, workers=2, partitions=2, chunk_size=7)
+        found = [(b['transaction_id'], b['account_number'], b['check']) for b in report['breaks']]
+        print(f"✅ Breaks found: {found}")
+        assert found == [(12, 'ACC1001', 'arithmetic'), (13, 'ACC1001', 'chain'), (60, 'ACC1002', 'current')]
+        arithmetic = report['breaks'][0]
+        assert arithmetic['expected'] - arithmetic['actual'] == 1 and isinstance(arithmetic['actual'], int)
+        db_manager.close()
+
+def test_velocity_limits():
+    """Test rolling-window velocity limits per account class, rebuild and eviction."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING VELOCITY LIMITS")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(os.path.join(tmp_dir, 'velocity.db'))
+        db_manager.seed_sample_data()
+        now = [time.time()]
+        limits = {
+            'default': {'window_seconds': 60, 'buckets': 6, 'max_count': 3, 'max_amount': 1000.0},
+            'business': {'window_seconds': 60, 'buckets': 6, 'max_count': None, 'max_amount': 5000.0},
+        }
+        
+        def limiter(max_accounts=100):
+            return VelocityLimiter(limits, lambda account: 'business' if account == 'ACC1002' else 'default',
+                                   max_accounts, clock=lambda: now[0])
+        
+        db = MoneyTransferDB(db_manager, velocity=limiter())
+        for _ in range(3):
+            db.process_transfer('ACC1001', 'ACC2001', 100.0, 'INR', 'vijay@example.com')
+        try:
+            db.process_transfer('ACC1001', 'ACC2001', 100.0, 'INR', 'vijay@example.com')
+            assert False, "Fourth transfer in the window should be refused"
+        except ValueError as e:
+            print(f"✅ Count limit: {e}")
+            assert str(e).startswith("Velocity limit exceeded")
+        results = db.process_transfers_batch([('ACC1002', 'ACC2002', 2000.0, 'INR')] * 3, mode='savepoint')
+        print(f"✅ Business class batch: {[r['status'] for r in results]}")
+        assert [r['status'] for r in results] == ['SUCCESS', 'SUCCESS', 'FAILED']
+        assert "Remaining: 1000.0" in results[2]['error']
+        assert db.velocity.usage('ACC1002', 'INR') == {'account_class': 'business', 'count': 2, 'amount': 4000.0}
+        
+        # A transfer that fails for another reason does not use up the window
+        try:
+            db.process_transfer('ACC1002', 'NOPE', 10.0, 'INR', 'rahul@example.com')
+        except ValueError:
+            pass
+        assert db.velocity.usage('ACC1002', 'INR')['count'] == 2
+        
+        rebuilt = MoneyTransferDB(db_manager, velocity=limiter(max_accounts=1))
+        assert rebuilt.velocity.usage('ACC1001', 'INR')['count'] == 3
+        assert rebuilt.velocity.usage('ACC1002', 'INR')['amount'] == 4000.0
+        assert rebuilt.velocity.usage('ACC1001', 'INR')['count'] == 3
+        stats = rebuilt.velocity.stats()
+        print(f"✅ Rebuilt from transactions with one window kept: {stats}")
+        assert stats['accounts'] == 1 and stats['reloads'] >= 1
+        
+        now[0] += 61
+        db.process_transfer('ACC1001', 'ACC2001', 100.0, 'INR', 'vijay@example.com')
+        assert db.velocity.usage('ACC1001', 'INR')['count'] == 1
+        print("✅ Window slides forward")
+        
+        # Amounts are counted exactly, in minor units per currency, against per-currency caps
+        exact = VelocityLimiter({'default': {'window_seconds': 60, 'buckets': 6, 'max_count': None,
+                                             'max_amount': 1.0}})
+        for _ in range(10):
+            exact.reserve('ACC1001', 10, 'INR')
+        assert exact.usage('ACC1001', 'INR')['amount'] == 1.0
+        mixed = VelocityLimiter({'default': {'window_seconds': 60, 'buckets': 6, 'max_count': None,
+                                             'max_amount': {'INR': 1000.0, 'JPY': 150000.0}}})
+        mixed.reserve('ACC1001', 90000, 'INR')
+        mixed.reserve('ACC1001', 100000, 'JPY')
+        assert mixed.usage('ACC1001', 'INR')['amount'] == 900.0
+        try:
+            mixed.reserve('ACC1001', 20000, 'INR')
+            assert False, "INR cap should apply to INR amounts only"
+        except ValueError as e:
+            print(f"✅ Per-currency cap: {e}")
+            assert str(e).endswith("at most 1000.0 INR per 60s. Remaining: 100.0")
+        db_manager.close()
+
+def test_multiprocess_dispatcher():
+    """Test per-sender ordering across worker processes and the headless file entry point."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING MULTI-PROCESS TRANSFER DISPATCHER")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'dispatch.db')
+        db_manager = DatabaseManager(db_path)
+        db_manager.seed_sample_data()
+        
+        # Each sender's outcomes depend on its transfers settling in order
+        with TransferDispatcher(db_path, workers=2, max_batch_size=2) as dispatcher:
+            futures = []
+            for first, second in zip([80000.0, 20000.0, 10000.0], [15000.0, 40000.0, 20000.0]):
+                futures.append(dispatcher.submit('ACC1001', 'ACC2001', first, 'INR', 'vijay@example.com'))
+                futures.append(dispatcher.submit('ACC1002', 'ACC2002', second, 'INR', 'rahul@example.com'))
+            assert dispatcher.drain(timeout=60)
+            results = [future.result() for future in futures]
+            metrics = dispatcher.metrics()
+        print(f"✅ Dispatcher metrics: {metrics}")
+        assert [r['status'] for r in results[0::2]] == ['SUCCESS', 'FAILED', 'SUCCESS']
+        assert [r['status'] for r in results[1::2]] == ['SUCCESS', 'FAILED', 'SUCCESS']
+        assert "Insufficient balance" in results[2]['error']
+        assert metrics['succeeded'] == 4 and metrics['in_flight'] == 0
+        db = MoneyTransferDB(db_manager)
+        assert db.get_account_balance('ACC1001') == 0.0
+        assert db.get_account_balance('ACC1002') == 15000.5
+        
+        db.update_sender_balance('ACC1001', 1000.0)
+        good = {'sender': 'ACC1001', 'credential': 'pass123', 'receiver': 'ACC2001', 'amount': 10,
+                'currency': 'INR', 'contact': 'vijay@example.com'}
+        instructions = [good] * 10 + [dict(good, credential='wrong'), dict(good, sender='ACC1002',
+                                       credential='secure456', contact='rahul@example.com', amount=5)]
+        input_path = os.path.join(tmp_dir, 'transfers.jsonl')
+        with open(input_path, 'w') as f:
+            f.writelines(json.dumps(instruction) + '\n' for instruction in instructions)
+            f.write('{not json\n')
+        output_path = os.path.join(tmp_dir, 'results.jsonl')
+        report = dispatch_transfer_file(input_path, output_path, db_path, workers=2)
+        print(f"✅ Headless dispatch: {report}")
+        assert report['lines_done'] == 13 and report['succeeded'] == 11 and report['failed'] == 2
+        with open(output_path) as f:
+            lines = [json.loads(line) for line in f]
+        assert [line['line'] for line in lines] == list(range(1, 14))
+        assert lines[10]['error'] == "Invalid authentication credentials"
+        assert db.get_account_balance('ACC1001') == 900.0
+        
+        # A batch that finds the database locked is retried; one that never gets
+        # the lock raises instead of turning into FAILED transfers
+        locked = [2]
+        settle = db.process_transfers_batch
+        
+        def contended_batch(*args, **kwargs):
+            if locked[0]:
+                locked[0] -= 1
+                raise sqlite3.OperationalError("database is locked")
+            return settle(*args, **kwargs)
+        
+        db.process_transfers_batch = contended_batch
+        transfer = {'sender_account': 'ACC1001', 'receiver_account': 'ACC2001', 'amount': 10.0, 'currency': 'INR'}
+        assert _settle_items(db, [(1, 'transfer', transfer)], False)[0][1]['status'] == 'SUCCESS'
+        locked[0] = LOCK_RETRIES + 1
+        outcome = _settle_items(db, [(2, 'transfer', transfer)], False)[0][1]
+        assert isinstance(outcome, sqlite3.OperationalError)
+        assert db.get_account_balance('ACC1001') == 890.0
+        del db.process_transfers_batch
+        
+        # Requests for a worker that has died fail their futures instead of leaking
+        dispatcher = TransferDispatcher(db_path, workers=1, max_batch_size=1).start()
+        dispatcher._processes[0].kill()
+        dispatcher._processes[0].join()
+        future = dispatcher.submit('ACC1001', 'ACC2001', 10.0, 'INR', 'vijay@example.com')
+        try:
+            future.result(timeout=30)
+            assert False, "A request to a dead worker should fail"
+        except RuntimeError as e:
+            print(f"✅ Dead worker: {e}")
+        assert dispatcher.metrics()['in_flight'] == 0
+        dispatcher.stop()
+        db_manager.close()
+
+def test_schema_versioning():
+    """Test that startup only reads the schema version and that old files are migrated in order."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING SCHEMA VERSIONING")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'schema.db')
+        db_manager = DatabaseManager(db_path)
+        assert db_manager.schema_version() == len(DatabaseManager.MIGRATIONS)
+        assert db_manager.migrate() == []
+        db_manager.seed_sample_data()
+        db_manager.close()
+        
+        # A current file opens while another process holds the write lock
+        writer = sqlite3.connect(db_path, isolation_level=None)
+        writer.execute('BEGIN IMMEDIATE')
+        start = time.perf_counter()
+        reopened = DatabaseManager(db_path)
+        print(f"✅ Opened a current file in {(time.perf_counter() - start) * 1000:.2f} ms under a held write lock")
+        assert time.perf_counter() - start < 1.0
+        writer.rollback()
+        writer.close()
+        
+        # A file from before versioning replays every step and keeps its rows
+        with reopened.transaction() as conn:
+            conn.execute('DROP TABLE ledger_checkpoint')
+            conn.execute('DROP INDEX idx_transactions_timestamp')
+            conn.execute('PRAGMA user_version = 0')
+        reopened.close()
+        upgraded = DatabaseManager(db_path)
+        with upgraded.read() as conn:
+            names = {row[0] for row in conn.execute('SELECT name FROM sqlite_master')}
+        assert {'ledger_checkpoint', 'idx_transactions_timestamp'} <= names
+        assert upgraded.schema_version() == len(DatabaseManager.MIGRATIONS)
+        assert MoneyTransferDB(upgraded).get_account_balance('ACC1001') == 90000.0
+        print(f"✅ Unversioned file upgraded to version {upgraded.schema_version()}")
+        upgraded.close()
+        
+        sharded = ShardedMoneyTransferDB(os.path.join(tmp_dir, 'shards'), shard_count=2)
+        assert sharded.shards[0].db_manager.schema_version() == len(DatabaseManager.MIGRATIONS) + 2
+        assert sharded.coordinator.schema_version() == 1
+        sharded.close()
+
+def test_integer_minor_units():
+    """Test exact minor-unit money, per-currency exponents and the in-place migration of REAL databases."""
+    
+    print("\n" + "=" * 60)
+    print("TESTING INTEGER MINOR UNITS")
+    print("=" * 60)
+    
+    assert to_minor_units(0.1, 'INR') == 10
+    assert to_minor_units('50000.50', 'INR') == 5000050
+    assert to_minor_units(1000, 'JPY') == 1000
+    assert to_minor_units('10.125', 'KWD') == 10125
+    for amount, currency in ((0.001, 'INR'), ('1.5', 'JPY'), ('nan', 'INR'), ('abc', 'INR')):
+        try:
+            to_minor_units(amount, currency)
+            assert False, f"{amount!r} {currency} should be rejected"
+        except ValueError:
+            pass
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'legacy.db')
+        
+        # A database from before the minor-units step, with one archived partition
+        legacy = create_real_money_database(db_path, senders=20, receivers=20, history_rows=3000)
+        archive_path = os.path.join(tmp_dir, 'legacy_archive.db')
+        with legacy.transaction() as conn:
+            conn.execute("UPDATE sender_accounts SET balance = 50000.5 WHERE account_number = 'S00000000'")
+            conn.execute('ATTACH DATABASE ? AS old', (archive_path,))
+            conn.execute('CREATE TABLE old.transactions AS SELECT * FROM transactions WHERE transaction_id <= 400')
+            conn.execute('DELETE FROM transactions WHERE transaction_id <= 400')
+            conn.execute(
+                '''INSERT INTO archive_partitions (partition_month, file_path, row_count, min_transaction_id,
+                       max_transaction_id, min_timestamp, max_timestamp)
+                   SELECT '2000-01', 'legacy_archive.db', COUNT(*), MIN(transaction_id), MAX(transaction_id),
+                          MIN(transaction_timestamp), MAX(transaction_timestamp) FROM old.transactions'''
+            )
+        legacy.close()
+        
+        # The first upgrade dies after copying the hot rows in chunks
+        class InterruptedManager(DatabaseManager):
+            MIGRATION_BATCH_SIZE = 500
+            
+            def archive_file_path(self, file_path):
+                raise OSError("simulated crash")
+        
+        try:
+            InterruptedManager(db_path)
+            assert False, "The interrupted upgrade should fail"
+        except OSError:
+            pass
+        raw = sqlite3.connect(db_path)
+        assert raw.execute('PRAGMA user_version').fetchone()[0] == 8
+        assert raw.execute('SELECT COUNT(*) FROM transactions_minor').fetchone()[0] == 2600
+        # Writes between the attempts: a new row and a removed one
+        raw.execute('''INSERT INTO transactions (sender_account, receiver_account, amount, currency, status,
+                          sender_balance_before, sender_balance_after, receiver_daily_before, receiver_daily_after)
+                       VALUES ('S00000001', 'R00000001', 0.3, 'INR', 'SUCCESS', 0, 0, 0, 0)''')
+        raw.execute('DELETE FROM transactions WHERE transaction_id = 401')
+        raw.commit()
+        raw.execute('ATTACH DATABASE ? AS old', (archive_path,))
+        real_total, expected_total, last_id = raw.execute(
+            '''SELECT SUM(amount), SUM(ROUND(amount * 100)), MAX(transaction_id)
+               FROM (SELECT amount, transaction_id FROM transactions
+                     UNION ALL SELECT amount, transaction_id FROM old.transactions)'''
+        ).fetchone()
+        expected_rollup = raw.execute('SELECT SUM(ROUND(total_amount * 100)) FROM daily_transaction_rollups'
+                                      ).fetchone()[0]
+        raw.close()
+        
+        upgraded = DatabaseManager(db_path)
+        assert upgraded.schema_version() == len(DatabaseManager.MIGRATIONS)
+        with upgraded.read(snapshot=False) as conn:
+            types = {row[1]: row[2] for row in conn.execute('PRAGMA table_info(transactions)')}
+            assert types['amount'] == types['sender_balance_after'] == 'INTEGER'
+            assert conn.execute('SELECT COUNT(*) FROM transactions').fetchone()[0] == 2600
+            assert conn.execute('SELECT 1 FROM transactions WHERE transaction_id = 401').fetchone() is None
+            hot_total = conn.execute('SELECT SUM(amount) FROM transactions').fetchone()[0]
+            names = {row[0] for row in conn.execute('SELECT name FROM sqlite_master')}
+            assert {'idx_transactions_sender_history', 'trg_transactions_rollup'} <= names
+            assert not any(name.endswith('_minor') for name in names)
+            rollup_total = conn.execute('SELECT SUM(total_amount) FROM daily_transaction_rollups').fetchone()[0]
+        archive = sqlite3.connect(archive_path)
+        archived_total = archive.execute('SELECT SUM(amount) FROM transactions').fetchone()[0]
+        archive.close()
+        assert hot_total + archived_total == int(expected_total)
+        assert rollup_total == int(expected_rollup)
+        print(f"✅ Upgraded after an interrupted backfill: REAL sum {real_total!r}, "
+              f"exact sum {(hot_total + archived_total) / 100}")
+        
+        # Balances move in exact steps; ids continue after the migrated ones
+        db = MoneyTransferDB(upgraded, cache_capacity=0)
+        assert db.get_account_balance('S00000000') == 50000.5
+        for _ in range(10):
+            result = db.process_transfer('S00000000', 'R00000000', 0.1, 'INR', '')
+        assert result['transaction_id'] > last_id
+        assert db.get_account_balance('S00000000') == 49999.5
+        with upgraded.read() as conn:
+            assert conn.execute("SELECT balance FROM sender_accounts WHERE account_number = 'S00000000'"
+                                ).fetchone()[0] == 4999950
+        try:
+            db.process_transfer('S00000000', 'R00000000', 0.005, 'INR', '')
+            assert False, "Sub-paisa amounts should be rejected"
+        except ValueError as e:
+            print(f"✅ Rejected: {e}")
+        
+        # Currencies with no minor unit and with three decimals
+        upgraded.upsert_accounts(
+            [('JP1', 'pw', 1000, 'jp@example.com', 'JPY'), ('KW1', 'pw', 10.125, 'kw@example.com', 'KWD')],
+            [('JP2', 'Yuki', 'yuki@example.com', 'JPY', 5000, 0), ('KW2', 'Omar', 'omar@example.com', 'KWD', 100, 0)]
+        )
+        assert db.process_transfer('JP1', 'JP2', 250, 'JPY', '')['sender_balance_after'] == 750.0
+        assert db.process_transfers_batch([('KW1', 'KW2', 0.125, 'KWD'), ('JP1', 'JP2', 1.5, 'JPY')],
+                                          mode='savepoint')[0]['sender_balance_after'] == 10.0
+        with upgraded.read() as conn:
+            stored = dict(conn.execute("SELECT account_number, balance FROM sender_accounts "
+                                       "WHERE currency IN ('JPY', 'KWD')").fetchall())
+        assert stored == {'JP1': 750, 'KW1': 10000}
+        print(f"✅ JPY and KWD stored in their own minor units: {stored}")
+        
+        # A request in another currency than the accounts' is rejected, not rescaled
+        ledger = LedgerMoneyTransferDB(upgraded, journal_dir=os.path.join(tmp_dir, 'journal'))
+        for transfer_db in (db, ledger):
+            for request in (('JP1', 'JP2', 250, 'INR'), ('JP1', 'KW2', 1, 'JPY')):
+                try:
+                    transfer_db.process_transfer(*request, '')
+                    assert False, f"{request} should be rejected"
+                except ValueError as e:
+                    assert str(e).startswith("Currency mismatch"), e
+            results = transfer_db.process_transfers_batch([('KW1', 'KW2', 0.25, 'INR')], mode='savepoint')
+            assert results[0]['error'] == "Currency mismatch. Account KW1 holds KWD, not INR"
+        ledger.close()
+        assert db.get_account_balance('JP1') == 750.0
+        assert db.get_account_balance('KW1') == 10.0
+        print("✅ Mismatched currencies rejected")
+        upgraded.close()
+
 if __name__ == "__main__":
     test_database_operations()
+    test_connection_pool()
+    test_read_only_lane()
+    test_batch_transfers()
+    test_concurrent_transfers_no_lost_updates()
+    test_group_commit_writer()
+    test_async_facade_keeps_event_loop_responsive()
+    test_account_cache()
+    test_daily_limit_rollover_is_write_free()
+    test_daily_rollups()
+    test_keyset_paginated_history()
+    test_streaming_export()
+    test_benchmark_harness_smoke()
+    test_query_instrumentation()
+    test_sharded_transfers_and_recovery()
+    test_transaction_archive()
+    test_bulk_account_loader()
+    test_failure_log_writer()
+    test_headless_transfer_file()
+    test_idempotency_keys()
+    test_ledger_engine_matches_sqlite_path()
+    test_ledger_publishes_only_durable_transfers()
+    test_ledger_reconciliation()
+    test_velocity_limits()
+    test_multiprocess_dispatcher()
+    test_schema_versioning()
+    test_integer_minor_units()
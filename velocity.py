@@ -0,0 +1,252 @@
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, Tuple
+from database import to_minor_units, from_minor_units
+
+# Per account class: rolling window length, how many slots it is split into,
+# and the most transfers / amount allowed in it. max_amount is in major units
+# of the transfer's currency, either one cap for every currency or a dict of
+# caps by currency. A limit of None (or a currency missing from the dict) is
+# not enforced.
+DEFAULT_VELOCITY_LIMITS = {
+    'default': {'window_seconds': 3600, 'buckets': 60, 'max_count': 20, 'max_amount': 50000.0},
+}
+
+
+class _Window:
+    """Ring of per-slot counts and amounts (in minor units) for one account, with running totals."""
+
+    __slots__ = ('account_class', 'counts', 'amounts', 'slot', 'count', 'amount')
+
+    def __init__(self, account_class: str, buckets: int, slot: int):
+        self.account_class = account_class
+        self.counts = array('l', [0] * buckets)
+        self.amounts = array('q', [0] * buckets)
+        self.slot = slot
+        self.count = 0
+        self.amount = 0
+
+    def advance(self, slot: int) -> None:
+        """Expire the slots that fell out of the window since the last update."""
+        buckets = len(self.counts)
+        for step in range(min(slot - self.slot, buckets)):
+            index = (self.slot + 1 + step) % buckets
+            self.count -= self.counts[index]
+            self.amount -= self.amounts[index]
+            self.counts[index] = 0
+            self.amounts[index] = 0
+        if slot > self.slot:
+            self.slot = slot
+
+
+class VelocityLimiter:
+    """
+    Per-sender rolling-window limits on transfer count and amount.
+
+    Windows are kept per sender and currency, so amounts in different
+    currencies are never added up. Each has a ring of ``buckets`` slots
+    covering its class's ``window_seconds``, plus running totals, so a check
+    is O(1) (expired slots are cleared as time moves on). The window slides
+    one slot at a time, so it covers between ``window - slot`` and ``window``
+    seconds.
+
+    ``reserve()`` checks and counts a transfer under one lock, so concurrent
+    transfers from one sender cannot both slip under a limit; ``release()``
+    takes a reservation back when the transfer does not commit.
+
+    At most ``max_accounts`` windows are kept. Idle accounts (nothing in their
+    window) are evicted first and need no state. If an active account has to
+    be evicted, it is reloaded from ``transactions`` when it is next seen.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, Any]]] = None,
+                 classify: Optional[Callable[[str], str]] = None, max_accounts: int = 100000,
+                 clock: Callable[[], float] = time.time):
+        self.limits = limits or DEFAULT_VELOCITY_LIMITS
+        for name, limit in self.limits.items():
+            if limit['window_seconds'] <= 0 or limit['buckets'] < 1:
+                raise ValueError(f"Velocity class '{name}' needs a positive window and at least one bucket")
+        self.classify = classify or (lambda account_number: 'default')
+        self.max_accounts = max_accounts
+        self.clock = clock
+        # (account_number, currency) -> window
+        self._windows: "OrderedDict[Tuple[str, str], _Window]" = OrderedDict()
+        self._forced_out: set = set()
+        self._loader: Optional[Callable[[str, str, float], list]] = None
+        self._lock = threading.Lock()
+        self._stats = {'checks': 0, 'rejected': 0, 'released': 0, 'evictions': 0, 'forced_evictions': 0,
+                       'reloads': 0}
+
+    def _limit(self, account_class: str) -> Dict[str, Any]:
+        try:
+            return self.limits[account_class]
+        except KeyError:
+            raise ValueError(f"No velocity limits configured for account class '{account_class}'") from None
+
+    @staticmethod
+    def _max_amount(limit: Dict[str, Any], currency: str) -> Optional[float]:
+        """The class's cap for ``currency`` in major units, as configured."""
+        max_amount = limit['max_amount']
+        return max_amount.get(currency) if isinstance(max_amount, dict) else max_amount
+
+    def _slot(self, limit: Dict[str, Any], now: float) -> int:
+        return int(now // (limit['window_seconds'] / limit['buckets']))
+
+    def _window(self, key: Tuple[str, str], now: float) -> _Window:
+        window = self._windows.get(key)
+        if window is None:
+            account_class = self.classify(key[0])
+            limit = self._limit(account_class)
+            window = _Window(account_class, limit['buckets'], self._slot(limit, now))
+            if key in self._forced_out and self._loader is not None:
+                self._forced_out.discard(key)
+                self._stats['reloads'] += 1
+                for timestamp, amount in self._loader(*key, now - limit['window_seconds']):
+                    self._add(window, limit, timestamp, amount, now)
+            self._windows[key] = window
+            self._evict()
+        else:
+            self._windows.move_to_end(key)
+            window.advance(self._slot(self._limit(window.account_class), now))
+        return window
+
+    def _add(self, window: _Window, limit: Dict[str, Any], timestamp: float, amount: int, now: float) -> None:
+        """Count a past transfer, if it is still inside the window."""
+        slot = self._slot(limit, timestamp)
+        current = self._slot(limit, now)
+        if current - slot >= limit['buckets'] or slot > current:
+            return
+        index = slot % limit['buckets']
+        window.counts[index] += 1
+        window.amounts[index] += amount
+        window.count += 1
+        window.amount += amount
+
+    def _evict(self) -> None:
+        if len(self._windows) <= self.max_accounts:
+            return
+        # Least recently used first: evict idle windows until one is still active
+        now = self.clock()
+        while len(self._windows) > self.max_accounts:
+            key, window = next(iter(self._windows.items()))
+            window.advance(self._slot(self._limit(window.account_class), now))
+            if window.count:
+                break
+            del self._windows[key]
+            self._stats['evictions'] += 1
+        while len(self._windows) > self.max_accounts:
+            key, _ = self._windows.popitem(last=False)
+            self._forced_out.add(key)
+            self._stats['forced_evictions'] += 1
+
+    def reserve(self, account_number: str, amount: int, currency: str) -> Tuple[str, str, int, int]:
+        """
+        Count a transfer against the sender's window, or raise ValueError if it would exceed a limit.
+
+        ``amount`` is in minor units of ``currency``, as stored.
+        """
+        now = self.clock()
+        with self._lock:
+            self._stats['checks'] += 1
+            window = self._window((account_number, currency), now)
+            limit = self._limit(window.account_class)
+            window_seconds = limit['window_seconds']
+            if limit['max_count'] is not None and window.count + 1 > limit['max_count']:
+                self._stats['rejected'] += 1
+                raise ValueError(f"Velocity limit exceeded: at most {limit['max_count']} transfers "
+                                 f"per {window_seconds}s")
+            max_amount = self._max_amount(limit, currency)
+            if max_amount is not None and window.amount + amount > to_minor_units(max_amount, currency):
+                self._stats['rejected'] += 1
+                remaining = max(to_minor_units(max_amount, currency) - window.amount, 0)
+                raise ValueError(f"Velocity limit exceeded: at most {max_amount} {currency} per "
+                                 f"{window_seconds}s. Remaining: {from_minor_units(remaining, currency)}")
+            index = window.slot % limit['buckets']
+            window.counts[index] += 1
+            window.amounts[index] += amount
+            window.count += 1
+            window.amount += amount
+            return account_number, currency, window.slot, amount
+
+    def release(self, reservation: Tuple[str, str, int, int]) -> None:
+        """Undo a reservation whose transfer did not commit."""
+        account_number, currency, slot, amount = reservation
+        with self._lock:
+            window = self._windows.get((account_number, currency))
+            if window is None:
+                return
+            limit = self._limit(window.account_class)
+            if window.slot - slot >= limit['buckets']:
+                return  # already expired
+            index = slot % limit['buckets']
+            window.counts[index] -= 1
+            window.amounts[index] -= amount
+            window.count -= 1
+            window.amount -= amount
+            self._stats['released'] += 1
+
+    def rebuild(self, *db_managers) -> int:
+        """
+        Load the windows from recent successful transactions; returns rows counted.
+
+        Uses the timestamp index to read only the longest configured window,
+        and keeps ``db_managers`` to reload accounts evicted while active.
+        Pass every shard of a sharded set; a sender's rows are all on one.
+        """
+        longest = max(limit['window_seconds'] for limit in self.limits.values())
+
+        def load(account_number: str, currency: str, since: float) -> list:
+            rows = []
+            for db_manager in db_managers:
+                with db_manager.read() as conn:
+                    rows.extend(conn.execute(
+                        '''SELECT CAST(STRFTIME('%s', transaction_timestamp) AS INTEGER), amount
+                           FROM transactions
+                           WHERE sender_account = ? AND currency = ? AND status = 'SUCCESS'
+                             AND transaction_timestamp >= DATETIME(?, 'unixepoch')''',
+                        (account_number, currency, since)
+                    ).fetchall())
+            return rows
+
+        now = self.clock()
+        rows = 0
+        with self._lock:
+            self._windows.clear()
+            self._forced_out.clear()
+            self._loader = None
+            for db_manager in db_managers:
+                with db_manager.read() as conn:
+                    cursor = conn.execute(
+                        '''SELECT sender_account, currency, CAST(STRFTIME('%s', transaction_timestamp) AS INTEGER),
+                                 amount
+                           FROM transactions
+                           WHERE status = 'SUCCESS' AND transaction_timestamp >= DATETIME(?, 'unixepoch')
+                           ORDER BY transaction_timestamp''',
+                        (now - longest,)
+                    )
+                    for account_number, currency, timestamp, amount in cursor:
+                        window = self._window((account_number, currency), now)
+                        self._add(window, self._limit(window.account_class), timestamp, amount, now)
+                        rows += 1
+            # An account pushed out mid-rebuild holds only its later rows;
+            # drop it so it is reloaded in full when next seen
+            for key in self._forced_out:
+                self._windows.pop(key, None)
+            self._loader = load
+        return rows
+
+    def usage(self, account_number: str, currency: str) -> Dict[str, Any]:
+        """Return the sender's count and amount in ``currency`` (major units) in the current window."""
+        now = self.clock()
+        with self._lock:
+            window = self._window((account_number, currency), now)
+            return {'account_class': window.account_class, 'count': window.count,
+                    'amount': from_minor_units(window.amount, currency)}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['accounts'] = len(self._windows)
+        return stats